@@ -0,0 +1,151 @@
+
+import json
+import urllib.parse
+
+import httpx
+
+from pyVTFirebase.services.firestore.evaluator import evaluate
+from pyVTFirebase.services.firestore.types.value import encode
+from typing import Dict, List
+
+
+class Emulator(object):
+    """
+    In-memory stand-in for the Auth and Firestore REST endpoints, served through httpx.MockTransport
+
+    Firestore documents are held in a dict by full resource name. get, list, batchGet, runQuery, commit, patch and
+    delete behave like the real endpoints for the requests this package sends, runQuery through
+    evaluator.evaluate. Auth endpoints answer with fixed tokens. Nothing goes over the network, so benchmarks measure
+    the client side of a request, building it, httpx and decoding the response, plus the emulator's own work.
+
+    Example:
+        emulator = Emulator(project_id="bench")
+        emulator.seed(collectionId="Devices", count=1000)
+
+        client = httpx.Client(transport=emulator.transport())
+    """
+
+    def __init__(self, project_id: str = "bench") -> None:
+        self.project_id = project_id
+        self.database = f"projects/{project_id}/databases/(default)"
+        self.documents: Dict[str, dict] = {}
+        self.requests = 0
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def name(self, path: str) -> str:
+        return f"{self.database}/documents/{path.strip('/')}"
+
+    def seed(self, collectionId: str, count: int, parent: str = None) -> List[str]:
+        """
+        Adds documents with a mix of field types to a collection
+
+        :param collectionId: The collection to add the documents to
+        :param count: The number of documents
+        :param parent: Optional, the parent document path of the collection
+        :return: List of the document paths
+        """
+
+        prefix = f"{parent.strip('/')}/{collectionId}" if parent else collectionId
+        paths = []
+
+        for index in range(count):
+            path = f"{prefix}/doc{index:06d}"
+            fields = {
+                "Index": index,
+                "Name": f"Device {index}",
+                "Online": index % 3 == 0,
+                "Battery": (index * 37) % 100 + 0.5,
+                "Tags": [f"tag{index % 7}", f"tag{index % 11}"],
+                "Location": {"Site": f"Site {index % 13}", "Floor": index % 5}
+            }
+            self.documents[self.name(path)] = {
+                "name": self.name(path),
+                "fields": {key: encode(value) for key, value in fields.items()},
+                "createTime": "2021-07-02T15:01:23.052142Z",
+                "updateTime": "2021-07-02T15:01:23.052142Z"
+            }
+            paths.append(path)
+
+        return paths
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        host = request.url.host
+        path = urllib.parse.unquote(request.url.path)
+
+        if host == "identitytoolkit.googleapis.com" or host == "securetoken.googleapis.com":
+            return self._auth(path=path)
+
+        resource, _, method = path[len("/v1/"):].partition(":")
+        body = json.loads(request.content) if request.content else {}
+
+        if method == "batchGet":
+            return _json([{"found": self.documents[name]} if name in self.documents else {"missing": name}
+                          for name in body.get("documents", [])])
+        if method == "runQuery":
+            return self._run_query(parent=resource, body=body)
+        if method == "commit":
+            return self._commit(writes=body.get("writes", []))
+
+        segments = resource[len(self.database) + len("/documents"):].strip("/").split("/")
+        if request.method == "GET" and len(segments) % 2 == 1:
+            return self._list(collection=resource, params=request.url.params)
+        if request.method == "GET":
+            document = self.documents.get(resource)
+            if document is None:
+                return _json({"error": {"code": 404, "message": f"Document {resource} not found",
+                                        "status": "NOT_FOUND"}}, status=404)
+            return _json(document)
+        if request.method == "PATCH":
+            self.documents[resource] = dict(body, name=resource)
+            return _json(self.documents[resource])
+        if request.method == "DELETE":
+            self.documents.pop(resource, None)
+            return _json({})
+
+        return _json({"error": {"code": 400, "message": "Unsupported request", "status": "INVALID_ARGUMENT"}},
+                     status=400)
+
+    def _auth(self, path: str) -> httpx.Response:
+        if path.endswith("/token"):
+            return _json({"id_token": "emulated-id-token", "refresh_token": "emulated-refresh-token",
+                          "expires_in": "3600", "user_id": "emulated-user"})
+
+        return _json({"idToken": "emulated-id-token", "refreshToken": "emulated-refresh-token", "expiresIn": "3600",
+                      "localId": "emulated-user", "email": "bench@example.com"})
+
+    def _list(self, collection: str, params: httpx.QueryParams) -> httpx.Response:
+        pageSize = int(params.get("pageSize", 20))
+        start = int(params.get("pageToken", 0))
+        names = sorted(name for name in self.documents if name.rpartition("/")[0] == collection)
+
+        page = {"documents": [self.documents[name] for name in names[start:start + pageSize]]}
+        if start + pageSize < len(names):
+            page["nextPageToken"] = str(start + pageSize)
+
+        return _json(page)
+
+    def _run_query(self, parent: str, body: dict) -> httpx.Response:
+        documents = evaluate(query=body["structuredQuery"], documents=self.documents.values(), parent=parent)
+        readTime = "2021-07-02T15:01:23.052142Z"
+
+        if not documents:
+            return _json([{"readTime": readTime}])
+        return _json([{"document": document, "readTime": readTime} for document in documents])
+
+    def _commit(self, writes: List[dict]) -> httpx.Response:
+        for write in writes:
+            if "delete" in write:
+                self.documents.pop(write["delete"], None)
+            elif "update" in write:
+                self.documents[write["update"]["name"]] = write["update"]
+
+        return _json({"writeResults": [{"updateTime": "2021-07-02T15:01:23.052142Z"} for _ in writes],
+                      "commitTime": "2021-07-02T15:01:23.052142Z"})
+
+
+def _json(content, status: int = 200) -> httpx.Response:
+    return httpx.Response(status, content=json.dumps(content).encode("utf-8"),
+                          headers={"Content-Type": "application/json; charset=UTF-8"})
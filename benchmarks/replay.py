@@ -0,0 +1,64 @@
+
+"""
+Replays a traffic log written by pyVTFirebase.Recorder against the in-memory emulator of the REST endpoints
+
+The emulator is seeded with generated documents in the given collections, so reads of recorded document paths of
+the same form find documents. Pass --speedup to send the traffic at a multiple of its recorded rate. The report of
+latency percentiles and throughput is written as JSON.
+
+Usage:
+    python benchmarks/replay.py traffic.jsonl.gz --seed Devices:1000 --speedup 4
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+
+import httpx
+
+from emulator import Emulator
+from pyVTFirebase.replay import Replayer, load
+from typing import List
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="Traffic log written by a Recorder")
+    parser.add_argument("--speedup", type=float, default=1.0, help="How many times faster than recorded to replay")
+    parser.add_argument("--seed", action="append", default=[], metavar="COLLECTION:COUNT",
+                        help="Collection to seed with generated documents, may be repeated")
+    parser.add_argument("--output", default=None, help="File to write the JSON report to, stdout if not set")
+    args = parser.parse_args(argv)
+
+    records = load(args.log)
+    project_id = next((segment for record in records for segment in _projects(record["u"])), "bench")
+
+    emulator = Emulator(project_id=project_id)
+    for seed in args.seed:
+        collectionId, _, count = seed.rpartition(":")
+        emulator.seed(collectionId=collectionId, count=int(count))
+
+    replayer = Replayer(client=httpx.Client(transport=emulator.transport()), api_key="bench-key",
+                        id_token="emulated-id-token")
+    output = json.dumps(replayer.run(args.log, speedup=args.speedup), indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    return 0
+
+
+def _projects(url: str) -> List[str]:
+    segments = httpx.URL(url).path.split("/")
+    return [segments[index + 1] for index, segment in enumerate(segments[:-1]) if segment == "projects"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
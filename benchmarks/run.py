@@ -0,0 +1,221 @@
+
+"""
+Benchmarks of the request path of Auth and Firestore against an in-memory emulator of the REST endpoints
+
+Every benchmark is timed call by call after a warm up, then run again under tracemalloc to measure memory. Results
+are written as JSON so runs can be compared over time, and a previous result file can be passed to --compare to
+report the change of every benchmark.
+
+Usage:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --filter runQuery --iterations 500 --compare results.json
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import httpx
+
+from concurrent.futures import ThreadPoolExecutor
+from emulator import Emulator
+from pyVTFirebase.services import Auth, Firestore, Query
+from pyVTFirebase.services.firestore.types.value import Value, decode, encode
+from typing import Callable, Dict, List
+
+
+COLLECTION = "Devices"
+DOCUMENTS = 1000
+
+
+def benchmarks(emulator: Emulator, paths: List[str]) -> Dict[str, Callable[[], object]]:
+    """
+    Builds the benchmarked calls, each a function without arguments making one call
+
+    :param emulator: Emulator seeded with the benchmark documents
+    :param paths: Paths of the seeded documents
+    :return: The calls by benchmark name
+    """
+
+    client = httpx.Client(transport=emulator.transport())
+    auth = Auth(api_key="bench-key", client=client)
+    firestore = Firestore(api_key="bench-key", project_id=emulator.project_id, client=client,
+                          id_token="emulated-id-token")
+
+    names = [firestore.document_name(path) for path in paths[:100]]
+    query = Query().fromCollection((COLLECTION, False)).where("Online", "==", "bool", True) \
+        .orderBy("Battery", "DESCENDING").limit(50)
+    query_json = query.to_json()
+    document = emulator.documents[names[0]]
+    native = {key: decode(value) for key, value in document["fields"].items()}
+
+    def build_query():
+        return Query().fromCollection((COLLECTION, False)).where("Online", "==", "bool", True) \
+            .where("Battery", ">", "double", 20.0).orderBy("Battery", "DESCENDING").limit(50)
+
+    return {
+        "Auth.signIn_with_email_and_password":
+            lambda: auth.signIn_with_email_and_password(email="bench@example.com", password="password"),
+        "Auth.exchange_refresh_token_for_ID_token":
+            lambda: auth.exchange_refresh_token_for_ID_token(refresh_token="emulated-refresh-token"),
+        "Firestore.get": lambda: firestore.get(path=paths[0]).json(),
+        "Firestore.list[100]": lambda: firestore.list(collectionId=COLLECTION, pageSize=100).json(),
+        "Firestore.batch_get[100]": lambda: firestore.batch_get(json_kwargs={"documents": names}).json(),
+        "Firestore.runQuery[Query]": lambda: firestore.runQuery(json_kwargs=query).json(),
+        "Firestore.runQuery[dict]": lambda: firestore.runQuery(json_kwargs=query_json).json(),
+        "Query.build": build_query,
+        "Query.body": lambda: build_query().body(),
+        "Value.data": lambda: [value.data() for value in (Value(key="string", value="Device"), Value(key="int", value=42),
+                                                          Value(key="double", value=0.5), Value(key="bool", value=True))],
+        "value.encode[document]": lambda: {key: encode(value) for key, value in native.items()},
+        "value.decode[document]": lambda: {key: decode(value) for key, value in document["fields"].items()}
+    }
+
+
+def measure(call: Callable[[], object], iterations: int, warmup: int) -> dict:
+    """
+    Times a call one run at a time and measures its memory use
+
+    :param call: The call to measure
+    :param iterations: The number of timed runs
+    :param warmup: The number of runs before timing starts
+    :return: Latency percentiles in microseconds, calls per second and memory use in bytes
+    """
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    started = time.perf_counter_ns()
+
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        call()
+        timings.append(time.perf_counter_ns() - start)
+
+    elapsed = time.perf_counter_ns() - started
+    timings.sort()
+
+    runs = min(iterations, 100)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(runs):
+        call()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "meanUs": statistics.fmean(timings) / 1000,
+        "p50Us": percentile(timings, 50) / 1000,
+        "p95Us": percentile(timings, 95) / 1000,
+        "p99Us": percentile(timings, 99) / 1000,
+        "callsPerSecond": iterations / (elapsed / 1e9),
+        "peakBytes": peak - before,
+        "retainedBytesPerCall": max(0, after - before) / runs
+    }
+
+
+def throughput(call: Callable[[], object], calls: int, threads: int) -> float:
+    """
+    :return: Calls per second made by a number of threads sharing the client
+    """
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(call) for _ in range(calls)]:
+            future.result()
+
+    return calls / (time.perf_counter() - started)
+
+
+def percentile(ordered: List[int], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def compare(results: dict, baseline: dict) -> List[str]:
+    """
+    :return: Lines reporting the change of the mean latency of every benchmark present in both runs
+    """
+
+    previous = baseline.get("results", {})
+    lines = []
+
+    for name, result in results["results"].items():
+        if name not in previous:
+            continue
+
+        change = (result["meanUs"] - previous[name]["meanUs"]) / previous[name]["meanUs"] * 100
+        lines.append(f"{name:<45} {previous[name]['meanUs']:>10.2f}us -> {result['meanUs']:>10.2f}us "
+                     f"({change:+.1f}%)")
+
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000, help="Timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=50, help="Runs before timing starts")
+    parser.add_argument("--threads", type=int, default=8, help="Threads for the throughput benchmarks")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--output", default=None, help="File to write the JSON results to, stdout if not set")
+    parser.add_argument("--compare", default=None, help="Previous JSON results to compare the mean latencies to")
+    args = parser.parse_args(argv)
+
+    emulator = Emulator()
+    paths = emulator.seed(collectionId=COLLECTION, count=DOCUMENTS)
+    calls = benchmarks(emulator=emulator, paths=paths)
+
+    results = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "httpx": httpx.__version__,
+        "documents": DOCUMENTS,
+        "results": {},
+        "throughput": {}
+    }
+
+    for name, call in calls.items():
+        if args.filter and args.filter not in name:
+            continue
+
+        results["results"][name] = measure(call=call, iterations=args.iterations, warmup=args.warmup)
+        print(f"{name:<45} {results['results'][name]['meanUs']:>10.2f}us", file=sys.stderr)
+
+        if name.startswith("Firestore."):
+            results["throughput"][name] = {
+                "threads": args.threads,
+                "callsPerSecond": throughput(call=call, calls=args.iterations, threads=args.threads)
+            }
+
+    output = json.dumps(results, indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            for line in compare(results=results, baseline=json.load(file)):
+                print(line, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
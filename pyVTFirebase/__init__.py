@@ -1 +1,4 @@
 from .connection import setup
+from .instrumentation import Observer, RequestEvent, HistogramAggregator, prometheus_text
+from .tracing import Tracer, NoOpTracer, OpenTelemetryTracer, set_tracer
+from .replay import Recorder, Replayer
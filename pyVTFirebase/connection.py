@@ -1,6 +1,7 @@
 import httpx
 
 
+from .instrumentation import Instrumentation, Observer, instrument_client
 from .services import Auth, Firestore
 
 
@@ -13,7 +14,33 @@ class Connection:
     def __init__(self, config: dict):
         self.api_key = config["apiKey"]
         self.project_id = config["projectID"]
-        self.client = httpx.Client()
+        self.instrumentation = Instrumentation()
+        self.client = instrument_client(client=httpx.Client(), instrumentation=self.instrumentation)
+
+    def instrument(self, observer: Observer) -> Observer:
+        """
+        Reports every request sent by the services of this connection to an observer
+
+        Requests are only timed while at least one observer is registered.
+
+        :param observer: The observer, such as a HistogramAggregator
+        :return: The observer
+
+        Example:
+            metrics = connection.instrument(HistogramAggregator())
+            prometheus_text(metrics)
+        """
+
+        return self.instrumentation.add(observer)
+
+    def uninstrument(self, observer: Observer) -> None:
+        """
+        Stops reporting requests to an observer
+
+        :param observer: An observer passed to Connection.instrument
+        """
+
+        self.instrumentation.remove(observer)
 
     def auth(self):
         return Auth(api_key=self.api_key, client=self.client)
@@ -1,16 +1,82 @@
 import json
 from httpx import Response
 from httpx import HTTPStatusError, RequestError
+from typing import Tuple
+
+
+# google.rpc.Code values, by the status name returned in error responses of the Firebase REST API
+STATUS_CODES = {
+    "OK": 0,
+    "CANCELLED": 1,
+    "UNKNOWN": 2,
+    "INVALID_ARGUMENT": 3,
+    "DEADLINE_EXCEEDED": 4,
+    "NOT_FOUND": 5,
+    "ALREADY_EXISTS": 6,
+    "PERMISSION_DENIED": 7,
+    "RESOURCE_EXHAUSTED": 8,
+    "FAILED_PRECONDITION": 9,
+    "ABORTED": 10,
+    "OUT_OF_RANGE": 11,
+    "UNIMPLEMENTED": 12,
+    "INTERNAL": 13,
+    "UNAVAILABLE": 14,
+    "DATA_LOSS": 15,
+    "UNAUTHENTICATED": 16
+}
 
 
 def check_response(response: Response):
     try:
         response.raise_for_status()
     except HTTPStatusError as exc:
+        try:
+            returned = json.dumps(exc.response.json(), indent=4, sort_keys=True)
+        except ValueError:
+            returned = exc.response.text
+
         raise HTTPStatusError(
             message=f'Error response {exc.response.status_code} while requesting {exc.request.url!r}.\n'
                     f'Returned Response:\n'
-                    f'{json.dumps(exc.response.json(), indent=4, sort_keys=True)}',
+                    f'{returned}',
             request=exc.request, response=exc.response)
     except RequestError as exc:
         raise RequestError(message=f'An error occurred while requesting {exc.request.url!r}.')
+
+
+def error_status(response: Response) -> Tuple[int, str]:
+    """
+    Gets the google.rpc.Code and message of an error response from the Firebase REST API
+
+    :param response: Error response
+    :return: Tuple of the code and message of the error
+    """
+
+    try:
+        error = response.json()["error"]
+        return STATUS_CODES.get(error.get("status"), STATUS_CODES["UNKNOWN"]), error.get("message", "")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        if response.status_code == 429:
+            return STATUS_CODES["RESOURCE_EXHAUSTED"], response.text
+        elif response.status_code >= 500:
+            return STATUS_CODES["UNAVAILABLE"], response.text
+        return STATUS_CODES["UNKNOWN"], response.text
+
+
+class BulkWriteError(Exception):
+    """
+    Raised for a write that failed as part of a batchWrite request
+
+    Attributes:
+        code: The google.rpc.Code of the failure, Example: 9 (FAILED_PRECONDITION)
+        message: The error message returned by the Firebase REST API
+        write: The Write message that failed
+        attempts: The number of times the write was attempted
+    """
+
+    def __init__(self, code: int, message: str, write: dict, attempts: int):
+        super().__init__(f"Write failed with code {code} after {attempts} attempt(s): {message}")
+        self.code = code
+        self.message = message
+        self.write = write
+        self.attempts = attempts
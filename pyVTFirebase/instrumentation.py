@@ -0,0 +1,530 @@
+
+import abc
+import bisect
+import contextlib
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import warnings
+
+import httpx
+
+from pyVTFirebase import tracing
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+# Name of the service method sending the current request and the attempt it is of, set by @instrumented methods
+_operation: contextvars.ContextVar = contextvars.ContextVar("pyVTFirebase_operation", default=None)
+_attempt: contextvars.ContextVar = contextvars.ContextVar("pyVTFirebase_attempt", default=1)
+
+# Largest response body whose documents are counted for its span, larger ones would be decoded a second time
+MAX_COUNTED_BYTES = 16384
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestEvent(object):
+    """
+    Describes one HTTP request sent by a service method, passed to the observers of a Connection
+
+    Attributes:
+        operation: The service method that sent the request, Example: "Firestore.runQuery"
+        method: The HTTP method
+        url: The URL template of the request, with the document path and query string left out,
+             Example: "https://firestore.googleapis.com/v1/projects/{project}/databases/{database}/documents/{path}:runQuery"
+        status: The HTTP status code, None if no response was received
+        attempt: The attempt of the operation the request belongs to, above 1 for retries
+        queue: Seconds spent waiting for a pooled connection, None if the HTTP transport doesn't report it
+        connect: Seconds spent opening a new connection, 0.0 for a reused connection, None if not reported
+        ttfb: Seconds from sending the request until its response headers were received
+        body: Seconds spent reading the response body
+        duration: Seconds from sending the request until its response body was read
+        requestBytes: The size of the request body
+        responseBytes: The size of the response body as received
+        error: The exception the request failed with, None if a response was received
+        request: The sent httpx.Request
+        started: The time.perf_counter value when the request was sent
+    """
+
+    __slots__ = ("operation", "method", "url", "status", "attempt", "queue", "connect", "ttfb", "body", "duration",
+                 "requestBytes", "responseBytes", "error", "request", "started")
+
+    def __init__(self, operation: str, method: str, url: str, attempt: int, requestBytes: int,
+                 request: httpx.Request = None) -> None:
+        self.operation = operation
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        self.requestBytes = requestBytes
+        self.request = request
+        self.started = 0.0
+        self.status: Optional[int] = None
+        self.queue: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.body: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.responseBytes = 0
+        self.error: Optional[BaseException] = None
+
+    def __repr__(self):
+        return f"RequestEvent(operation={self.operation!r}, status={self.status}, duration={self.duration})"
+
+
+class Observer(abc.ABC):
+    """
+    Receives an event for every request sent through an instrumented Connection
+
+    Observers are called on the thread that sent the request, once its response body has been read or it failed,
+    so they should be quick. Exceptions raised by an observer are turned into warnings and never fail the request.
+    """
+
+    @abc.abstractmethod
+    def on_request(self, event: RequestEvent) -> None:
+        pass
+
+
+class Instrumentation(object):
+    """
+    The observers of a Connection, see Connection.instrument
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.observers: Tuple[Observer, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.observers)
+
+    def add(self, observer: Observer) -> Observer:
+        with self._lock:
+            self.observers = self.observers + (observer,)
+        return observer
+
+    def remove(self, observer: Observer) -> None:
+        with self._lock:
+            self.observers = tuple(existing for existing in self.observers if existing is not observer)
+
+    def emit(self, event: RequestEvent) -> None:
+        for observer in self.observers:
+            try:
+                observer.on_request(event)
+            except Exception as exc:
+                warnings.warn(f"Observer {observer!r} failed on {event!r}: {exc!r}", RuntimeWarning)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """
+    Wraps the HTTP transport of a client to time its requests and report them to the observers of a Connection
+
+    Without observers requests are passed straight through. The time to the response headers and the time to read
+    the body are always measured, the time spent waiting for a pooled connection and connecting are reported when
+    the installed httpcore supports the trace extension.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, instrumentation: Instrumentation) -> None:
+        self.transport = transport
+        self.instrumentation = instrumentation
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tracing.inject(request.headers)
+
+        if not self.instrumentation:
+            return self.transport.handle_request(request)
+
+        event = RequestEvent(operation=_operation.get() or "unknown", method=request.method,
+                             url=url_template(request.url), attempt=_attempt.get(),
+                             requestBytes=int(request.headers.get("Content-Length", 0)), request=request)
+        trace: Dict[str, float] = {}
+
+        def record(name: str, info: dict) -> None:
+            trace.setdefault(name, time.perf_counter())
+
+        request.extensions = dict(request.extensions, trace=record)
+        start = event.started = time.perf_counter()
+
+        try:
+            response = self.transport.handle_request(request)
+        except Exception as exc:
+            event.error = exc
+            event.duration = time.perf_counter() - start
+            self.instrumentation.emit(event)
+            raise
+
+        headers = time.perf_counter()
+        event.status = response.status_code
+        event.ttfb = headers - start
+        _phases(event=event, trace=trace, start=start)
+
+        # Responses built in memory, such as by a MockTransport, arrive with their body already read
+        if response.is_closed:
+            event.body = 0.0
+            event.duration = event.ttfb
+            event.responseBytes = len(response.content)
+            self.instrumentation.emit(event)
+            return response
+
+        response.stream = _ObservedStream(stream=response.stream, event=event, started=headers,
+                                          instrumentation=self.instrumentation)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+def instrument_client(client: httpx.Client, instrumentation: Instrumentation) -> httpx.Client:
+    """
+    Wraps the transports of a client in InstrumentedTransport, in place
+
+    The client is built as usual, so it keeps the proxies it mounts from HTTP_PROXY, HTTPS_PROXY and ALL_PROXY,
+    which httpx leaves out for clients given a transport. Proxied requests are instrumented too.
+
+    :param client: The client to instrument
+    :param instrumentation: The observers to report the requests of the client to
+    :return: The client
+    """
+
+    client._transport = InstrumentedTransport(transport=client._transport, instrumentation=instrumentation)
+    client._mounts = {pattern: InstrumentedTransport(transport=transport, instrumentation=instrumentation)
+                      if transport is not None else None for pattern, transport in client._mounts.items()}
+
+    return client
+
+
+class _ObservedStream(httpx.SyncByteStream):
+    """ Response stream that counts the bytes read and reports the request once it is closed """
+
+    def __init__(self, stream: httpx.SyncByteStream, event: RequestEvent, started: float,
+                 instrumentation: Instrumentation) -> None:
+        self._stream = stream
+        self._event = event
+        self._started = started
+        self._instrumentation = instrumentation
+        self._reported = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._stream:
+            self._event.responseBytes += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._reported:
+                self._reported = True
+                self._event.body = time.perf_counter() - self._started
+                self._event.duration = self._event.ttfb + self._event.body
+                self._instrumentation.emit(self._event)
+
+
+class HistogramAggregator(Observer):
+    """
+    Aggregates request events in memory into latency histograms and byte, retry and error counters per operation
+    and status
+
+    Example:
+        metrics = connection.instrument(HistogramAggregator())
+        ...
+        metrics.percentile("Firestore.runQuery", 95)
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: Upper bounds in seconds of the latency buckets, in increasing order
+        """
+
+        if list(buckets) != sorted(buckets):
+            raise ValueError("Buckets must be in increasing order")
+
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], dict] = {}
+
+    def on_request(self, event: RequestEvent) -> None:
+        key = (event.operation, str(event.status) if event.status is not None else "error")
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "count": 0, "sum": 0.0, "buckets": [0] * (len(self.buckets) + 1), "requestBytes": 0,
+                    "responseBytes": 0, "retries": 0, "ttfb": 0.0, "body": 0.0, "queue": 0.0, "connect": 0.0
+                }
+
+            duration = event.duration or 0.0
+            series["count"] += 1
+            series["sum"] += duration
+            series["buckets"][bisect.bisect_left(self.buckets, duration)] += 1
+            series["requestBytes"] += event.requestBytes
+            series["responseBytes"] += event.responseBytes
+            series["retries"] += 1 if event.attempt > 1 else 0
+
+            for phase in ("ttfb", "body", "queue", "connect"):
+                series[phase] += getattr(event, phase) or 0.0
+
+    def snapshot(self) -> Dict[Tuple[str, str], dict]:
+        """
+        :return: Copy of the aggregated series by operation and status. Bucket counts aren't cumulative, the last
+                 one counts the requests slower than every bucket bound.
+        """
+
+        with self._lock:
+            return {key: dict(series, buckets=list(series["buckets"])) for key, series in self._series.items()}
+
+    def percentile(self, operation: str, percent: float) -> Optional[float]:
+        """
+        Estimates a latency percentile of an operation from its histogram, over every status
+
+        :param operation: The operation, Example: "Firestore.get"
+        :param percent: The percentile, between 0 and 100
+        :return: The upper bound of the bucket holding the percentile, or None if the operation wasn't seen or the
+                 percentile is slower than every bucket bound
+        """
+
+        counts = [0] * (len(self.buckets) + 1)
+        for (name, _), series in self.snapshot().items():
+            if name == operation:
+                counts = [total + count for total, count in zip(counts, series["buckets"])]
+
+        total = sum(counts)
+        if not total:
+            return None
+
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= total * percent / 100:
+                return bound
+
+        return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def prometheus_text(aggregator: HistogramAggregator, prefix: str = "pyvtfirebase") -> str:
+    """
+    Renders the metrics of a HistogramAggregator in the Prometheus text exposition format
+
+    :param aggregator: The aggregator to export
+    :param prefix: Prefix of the metric names
+    :return: The metrics, to be served with the content type "text/plain; version=0.0.4"
+
+    Links: ->
+        https://prometheus.io/docs/instrumenting/exposition_formats/#text-based-format
+    """
+
+    snapshot = sorted(aggregator.snapshot().items())
+    lines = [f"# HELP {prefix}_request_duration_seconds Time from sending a request until its response was read",
+             f"# TYPE {prefix}_request_duration_seconds histogram"]
+
+    for (operation, status), series in snapshot:
+        labels = f'operation="{_escape(operation)}",status="{status}"'
+        cumulative = 0
+
+        for bound, count in zip(aggregator.buckets, series["buckets"]):
+            cumulative += count
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+
+        lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+        lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {series['sum']}")
+        lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {series['count']}")
+
+    counters = (
+        ("request_bytes_total", "requestBytes", "Bytes sent in request bodies"),
+        ("response_bytes_total", "responseBytes", "Bytes received in response bodies"),
+        ("retries_total", "retries", "Requests sent as a retry of an earlier attempt")
+    )
+
+    for name, key, description in counters:
+        lines.append(f"# HELP {prefix}_{name} {description}")
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        for (operation, status), series in snapshot:
+            lines.append(f'{prefix}_{name}{{operation="{_escape(operation)}",status="{status}"}} {series[key]}')
+
+    lines.append(f"# HELP {prefix}_request_phase_seconds_total Time spent in each phase of requests")
+    lines.append(f"# TYPE {prefix}_request_phase_seconds_total counter")
+    for (operation, status), series in snapshot:
+        for phase in ("queue", "connect", "ttfb", "body"):
+            lines.append(f'{prefix}_request_phase_seconds_total{{operation="{_escape(operation)}",status="{status}",'
+                         f'phase="{phase}"}} {series[phase]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def instrumented(cls: type) -> type:
+    """
+    Class decorator naming the requests sent by the service methods of a class after the method
+
+    Methods annotated to return an httpx.Response are wrapped to set the operation name, "<Class>.<method>", seen
+    by the observers of the requests they send. The innermost wrapped method names the request.
+    """
+
+    for name, method in list(vars(cls).items()):
+        if not name.startswith("_") and callable(method) and \
+                getattr(method, "__annotations__", {}).get("return") in (httpx.Response, "httpx.Response"):
+            setattr(cls, name, operation(f"{cls.__name__}.{name}")(method))
+
+    return cls
+
+
+def operation(name: str) -> Callable:
+    """
+    Decorator naming the requests sent by a function, and tracing it in a span of that name while a tracer is set
+
+    :param name: The operation name, Example: "Firestore.runQuery"
+    """
+
+    def decorator(function: Callable) -> Callable:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            token = _operation.set(name)
+            try:
+                if tracing.get_tracer() is None:
+                    return function(*args, **kwargs)
+
+                with tracing.span(name, **_call_attributes(signature, args, kwargs)) as span:
+                    try:
+                        result = function(*args, **kwargs)
+                    except httpx.HTTPStatusError as exc:
+                        span.set_attribute("http.status_code", exc.response.status_code)
+                        raise
+
+                    if isinstance(result, httpx.Response):
+                        _response_attributes(span=span, response=result)
+                    return result
+            finally:
+                _operation.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def attempt(number: int) -> Iterator[None]:
+    """
+    Marks the requests sent inside the block as an attempt of a retried operation, traced as a child span
+
+    :param number: The attempt, 1 for the first
+    """
+
+    token = _attempt.set(number)
+    try:
+        with tracing.span("attempt", attempt=number):
+            yield
+    finally:
+        _attempt.reset(token)
+
+
+def url_template(url: httpx.URL) -> str:
+    """
+    :param url: URL of a request to the Firebase REST API
+    :return: The URL without its query string, with the project, database and document path replaced by placeholders
+    """
+
+    path = url.path
+    base, separator, rest = path.partition("/documents")
+
+    if separator and base.startswith("/v1/projects/"):
+        document, _, method = rest.partition(":")
+        path = "/v1/projects/{project}/databases/{database}/documents"
+
+        if document.strip("/"):
+            path += "/{path}"
+        if method:
+            path += f":{method}"
+
+    return f"{url.scheme}://{url.host}{path}"
+
+
+def _phases(event: RequestEvent, trace: Dict[str, float], start: float) -> None:
+    """ Fills in the queue and connect times of an event from the httpcore trace events of its request """
+
+    sent = trace.get("http11.send_request_headers.started") or trace.get("http2.send_request_headers.started")
+    if sent is None:
+        return
+
+    connect = 0.0
+    opened = trace.get("connection.connect_tcp.started")
+
+    if opened is not None:
+        connected = trace.get("connection.start_tls.complete") or trace.get("connection.connect_tcp.complete", opened)
+        connect = connected - opened
+        event.queue = max(0.0, opened - start)
+    else:
+        event.queue = max(0.0, sent - start)
+
+    event.connect = connect
+
+
+def _call_attributes(signature: inspect.Signature, args: tuple, kwargs: dict) -> dict:
+    """
+    Picks the span attributes of a service method call from its arguments
+
+    :return: The collection, parent and number of requested documents or writes, where the call has them
+    """
+
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return {}
+
+    attributes = {"firestore.collection": arguments.get("collectionId"), "firestore.parent": arguments.get("parent")}
+
+    path = arguments.get("path")
+    if isinstance(path, str) and "/" in path.strip("/"):
+        segments = path.strip("/").split("/")
+        attributes["firestore.collection"] = segments[-2] if len(segments) % 2 == 0 else segments[-1]
+
+    body = arguments.get("json_kwargs")
+    if hasattr(body, "to_json"):
+        body = body.to_json()
+
+    if isinstance(body, dict):
+        structuredQuery = body.get("structuredQuery") or body.get("structuredAggregationQuery", {}).get("structuredQuery")
+        if structuredQuery:
+            collectionIds = [selector.get("collectionId") for selector in structuredQuery.get("from", [])]
+            attributes["firestore.collection"] = ",".join(filter(None, collectionIds)) or None
+        if "documents" in body:
+            attributes["firestore.documents.requested"] = len(body["documents"])
+        if "writes" in body:
+            attributes["firestore.writes"] = len(body["writes"])
+
+    return attributes
+
+
+def _response_attributes(span: "tracing.Span", response: httpx.Response) -> None:
+    """
+    Sets the status and size of a response on the span of its operation, and the number of returned documents if the
+    body is small enough to decode again cheaply
+    """
+
+    span.set_attribute("http.status_code", response.status_code)
+    span.set_attribute("http.response_content_length", len(response.content))
+
+    if len(response.content) > MAX_COUNTED_BYTES:
+        return
+
+    try:
+        data = response.json()
+    except ValueError:
+        return
+
+    if isinstance(data, list):
+        span.set_attribute("firestore.documents", sum(1 for result in data if "document" in result or "found" in result))
+    elif isinstance(data, dict) and isinstance(data.get("documents"), list):
+        span.set_attribute("firestore.documents", len(data["documents"]))
+    elif isinstance(data, dict) and "fields" in data:
+        span.set_attribute("firestore.documents", 1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,315 @@
+
+import gzip
+import json
+import threading
+import time
+import urllib.parse
+
+import httpx
+
+from concurrent.futures import ThreadPoolExecutor
+from pyVTFirebase.instrumentation import Observer, RequestEvent
+from typing import Dict, IO, List, Optional
+
+
+# Hosts of the Auth REST API, whose request bodies hold passwords and tokens
+AUTH_HOSTS = ("identitytoolkit.googleapis.com", "securetoken.googleapis.com")
+
+# Request body fields holding credentials, left out of recordings
+REDACTED_FIELDS = ("password", "newPassword", "idToken", "refreshToken", "refresh_token", "token", "oobCode")
+REDACTED = "<redacted>"
+
+
+class Recorder(Observer):
+    """
+    Records the requests sent by the services of a Connection to a log file, to be replayed by a Replayer
+
+    Every request is written as one JSON line with the operation, the method, the URL, the request body, the time it
+    was sent relative to the first request, its status, duration and request and response sizes. Credentials are
+    never written: the Authorization header and the API key are left out and the passwords, tokens and codes of Auth
+    requests are replaced with "<redacted>". Log files ending in .gz are gzip compressed.
+
+    Each request is tagged with the thread that sent it, so a replay sends the same requests from as many threads.
+    Retries are recorded as the separate requests they are, so a replay sends the same load the original traffic did.
+
+    Example:
+        recorder = connection.instrument(Recorder("traffic.jsonl.gz"))
+        ...
+        connection.uninstrument(recorder)
+        recorder.close()
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: The log file to write, replaced if it exists
+        """
+
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._origin: Optional[float] = None
+        self._threads: Dict[int, int] = {}
+        self._file: IO[bytes] = gzip.open(path, "wb") if path.endswith(".gz") else open(path, "wb")
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def on_request(self, event: RequestEvent) -> None:
+        record = _record(event)
+
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._origin is None:
+                self._origin = event.started
+
+            record["t"] = round(max(0.0, event.started - self._origin), 6)
+            record["w"] = self._threads.setdefault(threading.get_ident(), len(self._threads))
+            self._file.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Replayer(object):
+    """
+    Replays the requests of a Recorder log against a target, a Firebase project or a local stand-in, and reports
+    their latency and throughput
+
+    Requests are sent at their recorded times divided by the speed-up, each from a thread standing in for the thread
+    that sent it originally, so bursts and concurrency are reproduced at a multiple of the original rate. Like the
+    original threads, a replay thread sends its requests one at a time: when the target is slower than the original
+    it falls behind schedule, reported as the lag.
+
+    Requests are sent with the API key and ID token of the replayer. Requests of the recorded project are sent to
+    project_id if given. Redacted Auth fields are filled from credentials, an idToken defaults to the replayer's ID
+    token, others are sent as "<redacted>" and fail at a real Auth API.
+
+    Example:
+        replayer = Replayer(client=httpx.Client(), api_key="...", id_token=user["idToken"], project_id="staging")
+        report = replayer.run("traffic.jsonl.gz", speedup=4.0)
+
+        report["operations"]["Firestore.runQuery"]["p99Ms"]
+    """
+
+    def __init__(self, client: httpx.Client, api_key: str, id_token: str = None, project_id: str = None,
+                 credentials: Dict[str, str] = None) -> None:
+        """
+        :param client: Client sending the requests, Example: httpx.Client(transport=Emulator().transport())
+        :param api_key: Web API key of the target project
+        :param id_token: Optional, ID token sent with the Firestore requests
+        :param project_id: Optional, the project to send the Firestore requests to instead of the recorded one
+        :param credentials: Optional, values for the redacted fields of Auth requests by field name
+        """
+
+        if not isinstance(client, httpx.Client):
+            raise TypeError(f"Client is required to be of type httpx.Client not {type(client)}")
+
+        self.client = client
+        self.api_key = api_key
+        self.id_token = id_token
+        self.project_id = project_id
+        self.credentials = dict(credentials or {})
+
+        if id_token is not None:
+            self.credentials.setdefault("idToken", id_token)
+
+    def run(self, path: str, speedup: float = 1.0) -> dict:
+        """
+        Replays a log and reports the latency percentiles and throughput of the replay
+
+        :param path: The log file written by a Recorder
+        :param speedup: How many times faster than recorded to send the requests
+        :return: Report with the totals and, per operation, the number of requests and errors, the latency
+                 percentiles in milliseconds and the requests per second
+
+        Example:
+            {"requests": 1200, "errors": 0, "recordedSeconds": 60.0, "elapsedSeconds": 15.1, "requestsPerSecond": 79.5,
+             "p50Ms": 4.1, "p95Ms": 12.0, "p99Ms": 20.3, "maxLagMs": 1.2, "threads": 8,
+             "operations": {"Firestore.get": {...}}}
+        """
+
+        if isinstance(speedup, bool) or not isinstance(speedup, (int, float)):
+            raise TypeError(f"Speedup is required to be of type float not {type(speedup)}")
+        if speedup <= 0:
+            raise ValueError("Speedup must be greater than 0")
+
+        records = load(path)
+        threads: Dict[int, List[dict]] = {}
+        for record in records:
+            threads.setdefault(record.get("w", 0), []).append(record)
+
+        results: List[tuple] = []
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        def replay(sequence: List[dict]) -> None:
+            for record in sequence:
+                due = started + record["t"] / speedup
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                start = time.perf_counter()
+                try:
+                    response = self.client.send(self.request(record))
+                    response.read()
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+
+                with lock:
+                    results.append((record.get("op", "unknown"), status, time.perf_counter() - start, start - due))
+
+        if threads:
+            with ThreadPoolExecutor(max_workers=len(threads)) as executor:
+                for future in [executor.submit(replay, sequence) for sequence in threads.values()]:
+                    future.result()
+
+        elapsed = time.perf_counter() - started
+        report = _summary(results=results, elapsed=elapsed)
+        report.update({
+            "recordedSeconds": records[-1]["t"] + (records[-1].get("d") or 0.0) if records else 0.0,
+            "elapsedSeconds": elapsed,
+            "speedup": speedup,
+            "threads": len(threads),
+            "operations": {operation: _summary(results=[result for result in results if result[0] == operation],
+                                               elapsed=elapsed)
+                           for operation in sorted({result[0] for result in results})}
+        })
+
+        return report
+
+    def request(self, record: dict) -> httpx.Request:
+        """
+        Builds the request replaying a record for the target
+
+        :param record: A line of a Recorder log
+        :return: The request, with the replayer's API key, ID token, project and credentials
+        """
+
+        url = httpx.URL(record["u"])
+        body = record.get("b")
+        headers = {}
+
+        if self.project_id is not None:
+            project = _project(url.path)
+            if project is not None and project != self.project_id:
+                url = httpx.URL(str(url).replace(f"projects/{project}/", f"projects/{self.project_id}/"))
+                if body is not None:
+                    body = body.replace(f"projects/{project}/", f"projects/{self.project_id}/")
+
+        if url.host in AUTH_HOSTS and body is not None:
+            body = _fill(body=body, values=self.credentials)
+        elif self.id_token is not None:
+            headers["Authorization"] = f"Bearer {self.id_token}"
+
+        if body is not None:
+            headers["Content-Type"] = record.get("c", "application/json; charset=UTF-8")
+
+        return self.client.build_request(method=record["m"], url=url, params={"key": self.api_key}, headers=headers,
+                                         content=body.encode("utf-8") if body is not None else None)
+
+
+def load(path: str) -> List[dict]:
+    """
+    :param path: The log file written by a Recorder
+    :return: The recorded requests in the order they were sent
+    """
+
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def _record(event: RequestEvent) -> dict:
+    """ Turns a request event into a log record without its credentials """
+
+    request = event.request
+    url = request.url
+    params = [(key, value) for key, value in url.params.multi_items() if key != "key"]
+    record = {"op": event.operation, "m": event.method,
+              "u": str(url.copy_with(query=urllib.parse.urlencode(params).encode("ascii") or None))}
+
+    try:
+        content = request.content
+    except httpx.RequestNotRead:
+        content = b""
+
+    if content:
+        body = content.decode("utf-8", errors="replace")
+        record["b"] = _redact(body) if url.host in AUTH_HOSTS else body
+
+        contentType = request.headers.get("Content-Type")
+        if contentType is not None and not contentType.startswith("application/json"):
+            record["c"] = contentType
+
+    if event.attempt > 1:
+        record["a"] = event.attempt
+
+    record.update({"s": event.status, "d": round(event.duration or 0.0, 6), "rq": event.requestBytes,
+                   "rs": event.responseBytes})
+    return record
+
+
+def _redact(body: str) -> str:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return REDACTED
+
+    if isinstance(data, dict):
+        data = {key: REDACTED if key in REDACTED_FIELDS else value for key, value in data.items()}
+
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _fill(body: str, values: Dict[str, str]) -> str:
+    data = json.loads(body)
+
+    if isinstance(data, dict):
+        data = {key: values.get(key, value) if value == REDACTED else value for key, value in data.items()}
+
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _project(path: str) -> Optional[str]:
+    segments = path.split("/")
+    if "projects" in segments:
+        index = segments.index("projects")
+        if index + 1 < len(segments):
+            return segments[index + 1]
+
+    return None
+
+
+def _summary(results: List[tuple], elapsed: float) -> dict:
+    """ Counts, latency percentiles in milliseconds and throughput of replayed requests """
+
+    latencies = sorted(result[2] * 1000 for result in results)
+    lags = [result[3] * 1000 for result in results]
+
+    def percentile(percent: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))]
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for result in results if result[1] is None or result[1] >= 400),
+        "requestsPerSecond": len(results) / elapsed if elapsed > 0 else 0.0,
+        "meanMs": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50Ms": percentile(50),
+        "p95Ms": percentile(95),
+        "p99Ms": percentile(99),
+        "maxMs": latencies[-1] if latencies else 0.0,
+        "meanLagMs": sum(lags) / len(lags) if lags else 0.0,
+        "maxLagMs": max(lags) if lags else 0.0
+    }
@@ -1,3 +1,20 @@
 from .auth import Auth
 from .firestore.firestore import Firestore
 from .firestore.types.query import Query
+from .firestore.types.aggregationQuery import AggregationQuery, AggregationResult
+from .firestore.sync import CollectionSync, WatermarkStore, FileWatermarkStore
+from .firestore.batch import WriteBatch
+from .firestore.bulkWriter import BulkWriter
+from .firestore.transaction import Transaction
+from .firestore.types.write import Transforms
+from .firestore.writeBuffer import WriteBuffer
+from .firestore.diff import diff
+from .firestore.importer import Importer
+from .firestore.exporter import Exporter
+from .firestore.types.preparedQuery import Param, PreparedQuery, BoundQuery
+from .firestore.planner import QueryPlanner
+from .firestore.evaluator import evaluate
+from .firestore.localStore import LocalStore
+from .firestore.queryCache import QueryCache
+from .firestore.loader import DocumentLoader
+from .firestore.resolver import ReferenceResolver
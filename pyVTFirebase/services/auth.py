@@ -1,9 +1,11 @@
 import httpx
 
 from pyVTFirebase.exceptions import check_response
+from pyVTFirebase.instrumentation import instrumented
 from pyVTFirebase.services.helpers import build_url, build_params
 
 
+@instrumented
 class Auth:
     """ Authentication and User Management Service """
 
@@ -25,8 +27,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'token': token, 'returnSecureToken': True}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -55,8 +56,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'grant_type': 'refresh_token', 'refresh_token': refresh_token}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -74,8 +74,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'email': email, 'password': password, 'returnSecureToken': True}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -98,8 +97,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {"email": email, "password": password, "returnSecureToken": True}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -116,8 +114,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'returnSecureToken': True}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -135,8 +132,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'identifier': email, 'continueUri': continueUri}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -153,8 +149,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {"requestType": "PASSWORD_RESET", "email": email}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -171,8 +166,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'oobCode': oobCode}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -198,8 +192,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'oobCode': oobCode, 'newPassword': newPassword}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -217,8 +210,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'idToken': idToken, 'email': email, 'returnSecureToken': True}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -236,8 +228,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'idToken': idToken, 'password': password, 'returnSecureToken': True}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -261,8 +252,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'idToken': idToken} | {x: kwargs[x] for x in kwargs}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -279,8 +269,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'idToken': idToken}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -297,8 +286,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {"requestType": "VERIFY_EMAIL", "idToken": idToken}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -322,8 +310,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'oobCode': oobCode}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -340,8 +327,7 @@ class Auth:
         params = build_params(key=self.api_key)
         data = {'idToken': idToken}
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
 
         check_response(response=req)
         return req
@@ -0,0 +1,211 @@
+
+import abc
+
+import httpx
+
+from pyVTFirebase.services.helpers import validate_json
+from pyVTFirebase.services.firestore.types.write import Write, DocumentMask, Precondition, DocumentTransform, \
+    Transforms
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+MAX_BATCH_WRITES = 500
+
+
+class WriteBuilder(abc.ABC):
+    """
+    Builds Write messages for document paths in the same form as the Firestore create, patch and delete methods
+
+    Subclasses decide what happens to each built write by implementing add.
+    """
+
+    firestore: "Firestore"
+
+    @abc.abstractmethod
+    def add(self, write: Write):
+        pass
+
+    def _document(self, path: str, json_kwargs: dict = None) -> dict:
+        document = validate_json(json_kwargs if json_kwargs is not None else {})
+        document.pop("createTime", None)
+        document.pop("updateTime", None)
+        document["name"] = self.firestore.document_name(path)
+        return document
+
+    def create(self, path: str, json_kwargs: dict = None, transforms: Transforms = None):
+        """
+        Queues the creation of a document. The write fails if the document already exists.
+
+        :param path: Document path
+        :param json_kwargs: Document instance to create, see Firestore.create for details
+        :param transforms: Optional, server-side field transforms applied after the document is written
+        :return: The value returned by add for the queued write
+        """
+
+        return self.add(Write(update=self._document(path, json_kwargs), updateTransforms=_transforms(transforms),
+                              currentDocument=Precondition(False)))
+
+    def set(self, path: str, json_kwargs: dict = None, transforms: Transforms = None):
+        """
+        Queues the creation of a document or the replacement of all of its fields
+
+        :param path: Document path
+        :param json_kwargs: Document instance to write, see Firestore.create for details
+        :param transforms: Optional, server-side field transforms applied after the document is written
+        :return: The value returned by add for the queued write
+        """
+
+        return self.add(Write(update=self._document(path, json_kwargs), updateTransforms=_transforms(transforms)))
+
+    def update(self, path: str, updateMask: list = None, precondition: dict = None, json_kwargs: dict = None,
+               transforms: Transforms = None):
+        """
+        Queues an update of a document, the equivalent of Firestore.patch
+
+        :param path: Document path
+        :param updateMask: Optional, list of document fields to update. Fields referenced in the mask, but not present
+                           in the input document, are deleted from the document on the server.
+        :param precondition: Optional, precondition on the document, see Firestore.patch for details
+        :param json_kwargs: Document instance to write, see Firestore.patch for details
+        :param transforms: Optional, server-side field transforms applied after the document is updated
+        :return: The value returned by add for the queued write
+        """
+
+        return self.add(Write(
+            update=self._document(path, json_kwargs),
+            updateMask=DocumentMask(updateMask) if updateMask is not None else None,
+            updateTransforms=_transforms(transforms),
+            currentDocument=_precondition(precondition)
+        ))
+
+    def transform(self, path: str, transforms: Transforms, precondition: dict = None):
+        """
+        Queues server-side field transforms of a document on their own, without writing any other fields
+
+        :param path: Document path
+        :param transforms: The field transforms to apply
+        :param precondition: Optional, precondition on the document, see Firestore.patch for details
+        :return: The value returned by add for the queued write
+        """
+
+        if transforms is None or not len(transforms):
+            raise ValueError("A transform write requires at least one field transform")
+
+        return self.add(Write(
+            transform=DocumentTransform(document=self.firestore.document_name(path),
+                                        fieldTransforms=_transforms(transforms)),
+            currentDocument=_precondition(precondition)
+        ))
+
+    def delete(self, path: str, precondition: dict = None):
+        """
+        Queues the deletion of a document
+
+        :param path: Document path
+        :param precondition: Optional, precondition on the document, see Firestore.delete for details
+        :return: The value returned by add for the queued write
+        """
+
+        return self.add(Write(delete=self.firestore.document_name(path), currentDocument=_precondition(precondition)))
+
+
+class WriteBatch(WriteBuilder):
+    """
+    Queues writes to several documents and applies them atomically with a single commit request
+
+    Either all of the writes of a batch succeed or none of them are applied. The create, set, update and delete
+    methods return the batch itself, allowing calls to be chained.
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/commit
+    """
+
+    def __init__(self, firestore: "Firestore") -> None:
+        self.firestore = firestore
+        self._writes = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    @property
+    def writes(self) -> List[Write]:
+        return list(self._writes)
+
+    def add(self, write: Write) -> "WriteBatch":
+        """
+        Queues a write to the batch
+
+        :param write: Write to queue
+        :return: The same instance of the WriteBatch class, allowing calls to be chained
+        """
+
+        if not isinstance(write, Write):
+            raise TypeError(f"Write is required to be of type Write not {type(write)}")
+        if len(self._writes) >= MAX_BATCH_WRITES:
+            raise ValueError(f"A batch can contain at most {MAX_BATCH_WRITES} writes")
+
+        self._writes.append(write)
+        return self
+
+    def to_json(self, transaction: str = None) -> dict:
+        """
+        Converts the queued writes to serializable JSON for the request body of a commit request
+
+        :param transaction: Optional, a base64-encoded transaction string the writes are committed as part of
+        :return: Request body for the commit endpoint
+        """
+
+        data = {"writes": [write.data() for write in self._writes]}
+
+        if transaction is not None:
+            data["transaction"] = transaction
+
+        return data
+
+    def commit(self) -> httpx.Response:
+        """
+        Applies all queued writes atomically and empties the batch
+
+        :return: Request response form the Firebase REST API
+        """
+
+        req = self.firestore.commit(json_kwargs=self.to_json())
+        self._writes = []
+        return req
+
+
+def _precondition(precondition: dict = None):
+    """
+    Converts a precondition in the dict form accepted by Firestore.patch and Firestore.delete to a Precondition
+
+    :param precondition: Precondition instance, Examples: {"exists": True}, {"updateTime": "2021-07-02T15:01:23Z"}
+    :return: The equivalent Precondition or None
+    """
+
+    if precondition is None:
+        return None
+
+    if len(precondition) != 1 or not ({"exists", "updateTime"} & precondition.keys()):
+        raise ValueError(f"Precondition must contain exactly one of exists or updateTime not {precondition!r}")
+
+    return Precondition(next(iter(precondition.values())))
+
+
+def _transforms(transforms: Transforms = None):
+    """
+    Gets the field transforms to attach to a write
+
+    :param transforms: Transforms built for the write
+    :return: List of FieldTransform or None when there are none
+    """
+
+    if transforms is None:
+        return None
+
+    if not isinstance(transforms, Transforms):
+        raise TypeError(f"Transforms is required to be of type Transforms not {type(transforms)}")
+
+    return list(transforms.fieldTransforms) or None
@@ -0,0 +1,301 @@
+
+import time
+import random
+import functools
+import threading
+
+import httpx
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pyVTFirebase import tracing
+from pyVTFirebase.exceptions import BulkWriteError, STATUS_CODES, error_status
+from pyVTFirebase.instrumentation import attempt
+from pyVTFirebase.services.firestore.batch import WriteBuilder, MAX_BATCH_WRITES
+from pyVTFirebase.services.firestore.types.write import Write
+from typing import TYPE_CHECKING, Callable, List
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+RETRYABLE_CODES = frozenset(STATUS_CODES[name] for name in (
+    "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "ABORTED", "INTERNAL", "UNAVAILABLE"
+))
+
+
+class _Operation(object):
+    """ A write queued to a BulkWriter along with the future its result is reported through """
+
+    __slots__ = ("write", "future", "attempts")
+
+    def __init__(self, write: Write, future: Future) -> None:
+        self.write = write
+        self.future = future
+        self.attempts = 0
+
+
+class BulkWriter(WriteBuilder):
+    """
+    Applies large volumes of independent writes by packing them into batchWrite requests and keeping several
+    requests in flight at once
+
+    Writes aren't applied atomically or in order, and each one succeeds or fails on its own. Writes that fail with
+    a retryable code are retried with exponential backoff, while the others in their request are reported
+    straight away. The create, set, update, delete and add methods return a Future that resolves to the
+    WriteResult of the write or raises a BulkWriteError.
+
+    Queueing a write blocks while the maximum number of requests are already queued or in flight, so a producer
+    can't run ahead of the server. Writes queued by on_success and on_error, which run on the writer's worker
+    threads, never block. The callbacks must not call flush or close, which wait for the worker calling them.
+
+    Example:
+        with firestore.bulk_writer(maxConcurrency=8) as writer:
+            for order in orders:
+                writer.set(path=f"Orders/{order['id']}", json_kwargs=order["document"])
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/batchWrite
+    """
+
+    def __init__(self, firestore: "Firestore", batchSize: int = 20, maxConcurrency: int = 4, maxAttempts: int = 5,
+                 initialBackoff: float = 1.0, maxBackoff: float = 60.0,
+                 on_success: Callable[[dict, dict], None] = None,
+                 on_error: Callable[[BulkWriteError], None] = None) -> None:
+        """
+        :param firestore: Firestore service used to send the batchWrite requests
+        :param batchSize: The number of writes to send per request, at most 500
+        :param maxConcurrency: The maximum number of requests in flight at once
+        :param maxAttempts: The maximum number of times a write is attempted before it is reported as failed
+        :param initialBackoff: Seconds to wait before the first retry. Doubles with every further retry.
+        :param maxBackoff: The maximum number of seconds to wait before a retry
+        :param on_success: Optional, called with the Write message and WriteResult of each successful write
+        :param on_error: Optional, called with the BulkWriteError of each failed write
+        """
+
+        for name, value in (("BatchSize", batchSize), ("MaxConcurrency", maxConcurrency),
+                            ("MaxAttempts", maxAttempts)):
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise TypeError(f"{name} is required to be of type int not {type(value)}")
+            if value <= 0:
+                raise ValueError(f"{name} must be greater than 0")
+        if batchSize > MAX_BATCH_WRITES:
+            raise ValueError(f"BatchSize can be at most {MAX_BATCH_WRITES}")
+
+        self.firestore = firestore
+        self.batchSize = batchSize
+        self.maxConcurrency = maxConcurrency
+        self.maxAttempts = maxAttempts
+        self.initialBackoff = initialBackoff
+        self.maxBackoff = maxBackoff
+        self.on_success = on_success
+        self.on_error = on_error
+
+        self._executor = ThreadPoolExecutor(max_workers=maxConcurrency)
+        self._slots = threading.BoundedSemaphore(maxConcurrency * 2)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_documents = set()
+        self._inflight = set()
+        self._dispatching = 0
+        self._idle = threading.Condition(self._lock)
+        self._worker = threading.local()
+        self._closed = False
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def add(self, write: Write) -> Future:
+        """
+        Queues a write, sending a request once enough writes are queued to fill one
+
+        :param write: Write to queue
+        :return: Future resolving to the WriteResult of the write
+        """
+
+        if not isinstance(write, Write):
+            raise TypeError(f"Write is required to be of type Write not {type(write)}")
+
+        operation = _Operation(write=write, future=Future())
+        document = _document_of(write)
+        batches = []
+
+        with self._lock:
+            # The callbacks of requests still in flight while closing may queue writes
+            if self._closed and not getattr(self._worker, "active", False):
+                raise RuntimeError("Cannot queue a write to a BulkWriter once it has been closed")
+
+            # A batchWrite request may only contain one write per document
+            if document in self._pending_documents:
+                batches.append(self._take())
+
+            self._pending.append(operation)
+            self._pending_documents.add(document)
+
+            if len(self._pending) >= self.batchSize:
+                batches.append(self._take())
+
+            # Counted until submitted, so a concurrent flush or close waits for them
+            self._dispatching += len(batches)
+
+        for batch in batches:
+            self._dispatch(batch)
+
+        return operation.future
+
+    def flush(self) -> None:
+        """
+        Sends all queued writes and waits until every write queued so far has succeeded or failed
+        """
+
+        self._drain(close=False)
+
+    def close(self) -> None:
+        """
+        Flushes the writer and stops it from accepting further writes
+        """
+
+        self._drain(close=True)
+        self._executor.shutdown(wait=True)
+
+    def _drain(self, close: bool) -> None:
+        with self._lock:
+            self._closed = self._closed or close
+
+        # Callbacks may queue writes until the last request is done, so the queue is emptied until nothing is left
+        while True:
+            with self._idle:
+                batch = self._take()
+                if batch:
+                    self._dispatching += 1
+                elif self._dispatching or self._inflight:
+                    self._idle.wait()
+                    continue
+                else:
+                    return
+
+            self._dispatch(batch)
+
+    def _take(self) -> List[_Operation]:
+        batch = self._pending
+        self._pending = []
+        self._pending_documents = set()
+        return batch
+
+    def _dispatch(self, operations: List[_Operation]) -> None:
+        # Worker threads, running the callbacks, never wait for a slot, as it may take their own request to free one
+        acquired = self._slots.acquire(blocking=not getattr(self._worker, "active", False))
+
+        try:
+            task = self._executor.submit(self._send, operations, tracing.current())
+        except RuntimeError as exc:
+            if acquired:
+                self._slots.release()
+
+            for operation in operations:
+                operation.future.set_exception(exc)
+
+            with self._idle:
+                self._dispatching -= 1
+                self._idle.notify_all()
+            return
+
+        with self._idle:
+            self._dispatching -= 1
+            self._inflight.add(task)
+
+        task.add_done_callback(functools.partial(self._finished, acquired=acquired))
+
+    def _finished(self, task: Future, acquired: bool = True) -> None:
+        with self._idle:
+            self._inflight.discard(task)
+            self._idle.notify_all()
+
+        if acquired:
+            self._slots.release()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.maxBackoff, self.initialBackoff * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _send(self, operations: List[_Operation], parent: tracing.Span = None) -> None:
+        self._worker.active = True
+        try:
+            with tracing.span("BulkWriter.batch", parent=parent, **{"firestore.writes": len(operations)}):
+                self._attempt(operations=operations)
+        except Exception as exc:
+            # Never leave a caller waiting on a future that can no longer be resolved
+            for operation in operations:
+                if not operation.future.done():
+                    operation.future.set_exception(exc)
+            raise
+
+    def _attempt(self, operations: List[_Operation]) -> None:
+        number = 0
+
+        while operations:
+            number += 1
+            retry = []
+
+            for operation in operations:
+                operation.attempts += 1
+
+            try:
+                with attempt(number):
+                    response = self.firestore.batchWrite(
+                        json_kwargs={"writes": [operation.write.data() for operation in operations]}
+                    ).json()
+            except httpx.HTTPStatusError as exc:
+                code, message = error_status(exc.response)
+                for operation in operations:
+                    self._resolve(operation=operation, code=code, message=message, retry=retry)
+            except httpx.RequestError as exc:
+                for operation in operations:
+                    self._resolve(operation=operation, code=STATUS_CODES["UNAVAILABLE"], message=str(exc),
+                                  retry=retry)
+            else:
+                statuses = response.get("status", [])
+                results = response.get("writeResults", [])
+
+                for index, operation in enumerate(operations):
+                    status = statuses[index] if index < len(statuses) else {}
+                    result = results[index] if index < len(results) else {}
+                    self._resolve(operation=operation, code=status.get("code", 0), message=status.get("message", ""),
+                                  result=result, retry=retry)
+
+            if retry:
+                time.sleep(self._backoff(number))
+
+            operations = retry
+
+    def _resolve(self, operation: _Operation, code: int, message: str, retry: list, result: dict = None) -> None:
+        if code == 0:
+            operation.future.set_result(result)
+            if self.on_success is not None:
+                self.on_success(operation.write.data(), result)
+        elif code in RETRYABLE_CODES and operation.attempts < self.maxAttempts:
+            retry.append(operation)
+        else:
+            error = BulkWriteError(code=code, message=message, write=operation.write.data(),
+                                   attempts=operation.attempts)
+            operation.future.set_exception(error)
+            if self.on_error is not None:
+                self.on_error(error)
+
+
+def _document_of(write: Write) -> str:
+    """
+    Gets the full resource name of the document a write applies to
+
+    :param write: Write to get the document of
+    :return: Full resource name of the document
+    """
+
+    if write.update is not None:
+        return write.update["name"]
+    elif write.delete is not None:
+        return write.delete
+    else:
+        return write.transform.document
@@ -0,0 +1,88 @@
+
+import math
+
+from pyVTFirebase.services.firestore.types import fieldPath
+from pyVTFirebase.services.firestore.types.value import encode
+from typing import Any, List
+
+
+def diff(old: dict, new: dict) -> dict:
+    """
+    Computes the smallest patch that turns one version of a document into another
+
+    Both versions are native python dicts, as returned by value.decode for a document's fields. Nested maps are
+    compared field by field so only the fields that changed are written, and fields missing from the new version
+    are deleted by listing them in the update mask without a value. Field names are escaped in the mask as needed.
+    New references are given as value.Reference, a plain str is written as a string.
+
+    :param old: The fields of the document as they currently are
+    :param new: The fields the document should have
+    :return: Keyword arguments for Firestore.patch or WriteBuilder.update, or an empty dict when nothing changed.
+             Never patch with an empty result, a patch without an update mask replaces the whole document.
+
+    Example:
+        changes = diff(old={"Name": "Ann", "Address": {"zip code": 1000}}, new={"Name": "Ann", "Address": {}})
+            -> {"updateMask": ["Address.`zip code`"], "json_kwargs": {"fields": {}}}
+
+        if changes:
+            firestore.patch(path="Customers/<CustomerID>", **changes)
+    """
+
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        raise TypeError(f"Old and new are required to be of type dict not {type(old)} and {type(new)}")
+
+    updateMask = []
+    fields = {}
+
+    _compare(old=old, new=new, segments=[], updateMask=updateMask, fields=fields)
+
+    if not updateMask:
+        return {}
+
+    return {"updateMask": updateMask, "json_kwargs": {"fields": fields}}
+
+
+def _compare(old: dict, new: dict, segments: List[str], updateMask: list, fields: dict) -> None:
+    for key, value in new.items():
+        path = segments + [key]
+
+        if key not in old:
+            _set(path=path, value=value, updateMask=updateMask, fields=fields)
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            _compare(old=old[key], new=value, segments=path, updateMask=updateMask, fields=fields)
+        elif not _equal(old[key], value):
+            _set(path=path, value=value, updateMask=updateMask, fields=fields)
+
+    for key in old:
+        if key not in new:
+            updateMask.append(fieldPath.join(segments + [key]))
+
+
+def _set(path: List[str], value: Any, updateMask: list, fields: dict) -> None:
+    updateMask.append(fieldPath.join(path))
+
+    for segment in path[:-1]:
+        fields = fields.setdefault(segment, {"mapValue": {"fields": {}}})["mapValue"]["fields"]
+
+    fields[path[-1]] = encode(value)
+
+
+def _equal(first: Any, second: Any) -> bool:
+    """
+    Compares two native values the way they would be stored. Values of different types are never equal, so
+    changing 1 to 1.0 or True is still written.
+
+    :return: If the values are equal
+    """
+
+    if type(first) is not type(second):
+        return False
+
+    if isinstance(first, float):
+        return first == second or (math.isnan(first) and math.isnan(second))
+    elif isinstance(first, (list, tuple)):
+        return len(first) == len(second) and all(_equal(a, b) for a, b in zip(first, second))
+    elif isinstance(first, dict):
+        return first.keys() == second.keys() and all(_equal(first[key], second[key]) for key in first)
+
+    return first == second
@@ -0,0 +1,291 @@
+
+import math
+
+from pyVTFirebase.services.firestore.types import fieldPath
+from pyVTFirebase.services.firestore.types.ordering import Descending, complete_order, document_key, sort_key, \
+    type_rank
+from pyVTFirebase.services.firestore.types.query import Query
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+
+_RANGE_OPERATORS = {
+    "LESS_THAN": lambda key, other: key < other,
+    "LESS_THAN_OR_EQUAL": lambda key, other: key <= other,
+    "GREATER_THAN": lambda key, other: key > other,
+    "GREATER_THAN_OR_EQUAL": lambda key, other: key >= other
+}
+
+
+def evaluate(query: Union[dict, Query], documents: Iterable[dict], parent: str = None) -> List[dict]:
+    """
+    Runs a query against a local set of documents, the way the server would run it against a collection
+
+    Filters, orders and cursors follow Firestore's semantics: values compare in Firestore's type order, range
+    filters only match values of the filtered type, equality treats integers and doubles alike and documents
+    missing an ordered field are left out. The complete order includes the implicit orders on inequality fields and
+    __name__, so results come back in the same order as from runQuery.
+
+    :param query: The query as a Query object or structured request parameters, see Firestore.runQuery
+    :param documents: Documents as returned by the Firebase REST API, from any collections
+    :param parent: The parent document of the queried collection, as passed to Firestore.runQuery
+    :return: List of the matching documents, projected to the selected fields
+
+    Example:
+        documents = firestore.list(collectionId="Devices", pageSize=1000).json()["documents"]
+        online = evaluate(Query().fromCollection(("Devices", False)).where("Online", "==", "bool", True), documents)
+    """
+
+    structuredQuery = _structured_query(query)
+    test = matcher(query=structuredQuery, parent=parent)
+
+    return _finish(structuredQuery=structuredQuery, documents=(document for document in documents if test(document)))
+
+
+def matcher(query: Union[dict, Query], parent: str = None) -> Callable[[dict], bool]:
+    """
+    Compiles the collection selector and filters of a query into a single test of a document
+
+    :param query: The query as a Query object or structured request parameters, see Firestore.runQuery
+    :param parent: The parent document of the queried collection, as passed to Firestore.runQuery
+    :return: Function returning if a document as returned by the Firebase REST API is selected by the query
+    """
+
+    structuredQuery = _structured_query(query)
+
+    selected = _collection_predicate(selectors=structuredQuery.get("from", []), parent=parent)
+    predicate = _predicate(structuredQuery["where"]) if "where" in structuredQuery else None
+
+    if predicate is None:
+        return lambda document: selected(document["name"])
+
+    return lambda document: selected(document["name"]) and predicate(document)
+
+
+def matches(where: dict, document: dict) -> bool:
+    """
+    Tests a document against the filter of a structured query
+
+    :param where: Filter of a structured query
+    :param document: Document as returned by the Firebase REST API
+    :return: If the document matches the filter
+    """
+
+    return _predicate(where)(document)
+
+
+def _structured_query(query: Union[dict, Query]) -> dict:
+    if isinstance(query, Query):
+        return query.to_json()["structuredQuery"]
+    return query["structuredQuery"] if "structuredQuery" in query else query
+
+
+def _finish(structuredQuery: dict, documents: Iterator[dict]) -> List[dict]:
+    """
+    Orders the documents that matched a query's filters and applies its cursors, offset, limit and projection
+
+    :param structuredQuery: Structured query
+    :param documents: The documents matching the query's collection and filters
+    :return: The query results
+    """
+
+    orders = complete_order(structuredQuery)
+    paths = [order["field"]["fieldPath"] for order in orders if order["field"]["fieldPath"] != "__name__"]
+
+    keyed = [(document_key(document, orders), document) for document in documents
+             if all(fieldPath.lookup(document.get("fields", {}), path) is not None for path in paths)]
+
+    startAt = structuredQuery.get("startAt")
+    endAt = structuredQuery.get("endAt")
+
+    if startAt is not None:
+        start = _cursor_key(cursor=startAt, orders=orders)
+        keyed = [(key, document) for key, document in keyed
+                 if (key[:len(start)] >= start if startAt.get("before") else key[:len(start)] > start)]
+    if endAt is not None:
+        end = _cursor_key(cursor=endAt, orders=orders)
+        keyed = [(key, document) for key, document in keyed
+                 if (key[:len(end)] < end if endAt.get("before") else key[:len(end)] <= end)]
+
+    keyed.sort(key=lambda item: item[0])
+
+    offset = structuredQuery.get("offset") or 0
+    limit = structuredQuery.get("limit")
+    results = [document for _, document in keyed[offset:offset + limit if limit is not None else None]]
+
+    if "select" in structuredQuery:
+        fields = [field["fieldPath"] for field in structuredQuery["select"].get("fields", [])]
+        results = [_project(document=document, paths=fields) for document in results]
+
+    return results
+
+
+def _cursor_key(cursor: dict, orders: List[dict]) -> tuple:
+    return tuple(Descending(sort_key(value)) if order.get("direction") == "DESCENDING" else sort_key(value)
+                 for value, order in zip(cursor.get("values", []), orders))
+
+
+def _project(document: dict, paths: List[str]) -> dict:
+    """
+    Copies a document with only the selected fields
+
+    :param document: Document as returned by the Firebase REST API
+    :param paths: The selected field paths
+    :return: The projected document
+    """
+
+    projected = {key: value for key, value in document.items() if key != "fields"}
+    fields = {}
+
+    for path in paths:
+        if path == "__name__":
+            continue
+        value = fieldPath.lookup(document.get("fields", {}), path)
+        if value is not None:
+            fieldPath.assign(fields, path, value)
+
+    projected["fields"] = fields
+    return projected
+
+
+def _collection_predicate(selectors: List[dict], parent: Optional[str]) -> Callable[[str], bool]:
+    """
+    Builds a test of whether a document belongs to the collections a query selects
+
+    :param selectors: The from clause of a structured query
+    :param parent: The parent document of the queried collections, relative or as a full resource name
+    :return: Function testing a document's full resource name
+    """
+
+    parent = (parent or "").strip("/")
+    if "/documents/" in parent + "/":
+        parent = (parent + "/").partition("/documents/")[2].strip("/")
+
+    def selected(name: str) -> bool:
+        segments = name.partition("/documents/")[2].split("/")
+        collectionId = segments[-2]
+        document_parent = "/".join(segments[:-2])
+
+        for selector in selectors:
+            if selector.get("collectionId") is not None and selector["collectionId"] != collectionId:
+                continue
+
+            if selector.get("allDescendants"):
+                if not parent or document_parent == parent or document_parent.startswith(parent + "/"):
+                    return True
+            elif document_parent == parent:
+                return True
+
+        return not selectors
+
+    return selected
+
+
+def _predicate(where: dict) -> Callable[[dict], bool]:
+    """
+    Compiles a filter into a function testing a document, encoding the compared values once
+
+    :param where: Filter of a structured query
+    :return: Function testing a document as returned by the Firebase REST API
+    """
+
+    if "compositeFilter" in where:
+        composite = where["compositeFilter"]
+        predicates = [_predicate(child) for child in composite.get("filters", [])]
+
+        if composite["op"] == "OR":
+            return lambda document: any(predicate(document) for predicate in predicates)
+        return lambda document: all(predicate(document) for predicate in predicates)
+
+    if "unaryFilter" in where:
+        return _unary_predicate(where["unaryFilter"])
+
+    if "fieldFilter" in where:
+        return _field_predicate(where["fieldFilter"])
+
+    raise ValueError(f"Filter {where!r} isn't a known filter type")
+
+
+def _unary_predicate(unaryFilter: dict) -> Callable[[dict], bool]:
+    path = unaryFilter["field"]["fieldPath"]
+    op = unaryFilter["op"]
+
+    def test(document: dict) -> bool:
+        value = fieldPath.lookup(document.get("fields", {}), path)
+
+        if value is None:
+            return False
+        if op == "IS_NULL":
+            return "nullValue" in value
+        if op == "IS_NAN":
+            return _isnan(value)
+        if op == "IS_NOT_NULL":
+            return "nullValue" not in value
+        if op == "IS_NOT_NAN":
+            return "nullValue" not in value and not _isnan(value)
+
+        raise ValueError(f"Unary filter operator {op} isn't supported")
+
+    return test
+
+
+def _field_predicate(fieldFilter: dict) -> Callable[[dict], bool]:
+    path = fieldFilter["field"]["fieldPath"]
+    op = fieldFilter["op"]
+    other = fieldFilter["value"]
+
+    def field(document: dict) -> Optional[dict]:
+        if path == "__name__":
+            return {"referenceValue": document["name"]}
+        return fieldPath.lookup(document.get("fields", {}), path)
+
+    if op == "EQUAL":
+        expected = sort_key(other)
+        return lambda document: _compare(field(document), lambda value: sort_key(value) == expected)
+
+    if op in _RANGE_OPERATORS:
+        # Range filters only match values of the same type as the compared value
+        compare = _RANGE_OPERATORS[op]
+        expected, rank = sort_key(other), type_rank(other)
+        return lambda document: _compare(field(document), lambda value: type_rank(value) == rank
+                                         and compare(sort_key(value), expected))
+
+    if op == "NOT_EQUAL":
+        expected = sort_key(other)
+        return lambda document: _compare(field(document), lambda value: "nullValue" not in value
+                                         and sort_key(value) != expected)
+
+    if op == "ARRAY_CONTAINS":
+        expected = sort_key(other)
+        return lambda document: _compare(field(document), lambda value: "arrayValue" in value and any(
+            sort_key(element) == expected for element in value["arrayValue"].get("values", [])))
+
+    elements = other.get("arrayValue", {}).get("values", [])
+    keys = {sort_key(element) for element in elements}
+
+    if op == "IN":
+        return lambda document: _compare(field(document), lambda value: sort_key(value) in keys)
+
+    if op == "ARRAY_CONTAINS_ANY":
+        return lambda document: _compare(field(document), lambda value: "arrayValue" in value and any(
+            sort_key(element) in keys for element in value["arrayValue"].get("values", [])))
+
+    if op == "NOT_IN":
+        if any("nullValue" in element for element in elements):
+            return lambda document: False
+        return lambda document: _compare(field(document), lambda value: "nullValue" not in value
+                                         and sort_key(value) not in keys)
+
+    raise ValueError(f"Field filter operator {op} isn't supported")
+
+
+def _compare(value: Optional[dict], test: Callable[[dict], bool]) -> bool:
+    # Documents without the filtered field never match a field filter
+    return value is not None and test(value)
+
+
+def _isnan(value: dict) -> bool:
+    if "doubleValue" not in value:
+        return False
+
+    number = float(value["doubleValue"])
+    return math.isnan(number)
@@ -0,0 +1,307 @@
+
+import os
+import copy
+import gzip
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+from pyVTFirebase import tracing
+from pyVTFirebase.services.firestore.types import fieldPath
+from pyVTFirebase.services.firestore.types.query import Query
+from typing import TYPE_CHECKING, List, Optional, Union
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+class Exporter(object):
+    """
+    Streams the documents of a query or collection to JSON Lines files page by page, saving a resume cursor in a
+    checkpoint file next to each output so an interrupted export continues where it stopped
+
+    Only one page of documents is held in memory at a time. Every page is appended to the output, flushed and then
+    recorded in the checkpoint with the cursor of its last document, so on a restart the output is truncated back
+    to the last recorded page and the export continues after it without duplicating or skipping documents. With
+    compression each page is written as its own gzip member, which gzip readers decode as one stream.
+
+    Pages are read with separate queries, so documents written during an export may or may not be included unless
+    a readTime is given to read every page at the same point in time.
+
+    Example:
+        exporter = Exporter(firestore, compress=True)
+        exporter.export_collection("Orders", "orders.jsonl.gz")
+
+        query = Query().fromCollection(("Orders", False)).where("Status", "==", key="string", value="open")
+        exporter.export(query, "open-orders.jsonl")
+    """
+
+    def __init__(self, firestore: "Firestore", pageSize: int = 500, compress: bool = False,
+                 readTime: str = None) -> None:
+        """
+        :param firestore: Firestore service to read the documents with
+        :param pageSize: The number of documents to request per query
+        :param compress: If the outputs are gzip compressed
+        :param readTime: Optional, reads every page as the documents were at the given time, Example:
+                         "2021-07-02T15:01:23.052142Z". Must be within the database's version retention period.
+        """
+
+        if isinstance(pageSize, bool) or not isinstance(pageSize, int):
+            raise TypeError(f"PageSize is required to be of type int not {type(pageSize)}")
+        if pageSize <= 0:
+            raise ValueError("PageSize must be greater than 0")
+
+        self.firestore = firestore
+        self.pageSize = pageSize
+        self.compress = compress
+        self.readTime = readTime
+
+    def export(self, query: Union[dict, Query], path: str, parent: str = None) -> dict:
+        """
+        Exports the documents of a query, resuming from the checkpoint of the output if there is one
+
+        The query is additionally ordered by __name__ so every document has a unique position to resume from. Its
+        own offset, limit and cursors are honoured.
+
+        :param query: The query as a Query object or structured request parameters, see Firestore.runQuery
+        :param path: Path of the output file. The checkpoint is saved to the same path with a .checkpoint suffix.
+        :param parent: The parent resource of the collection to query
+        :return: Statistics of the export
+        """
+
+        structuredQuery = (query.to_json() if isinstance(query, Query) else query)["structuredQuery"]
+
+        return self._export(structuredQuery=structuredQuery, path=path, parent=parent)
+
+    def export_collection(self, collectionId: str, path: str, parent: str = None) -> dict:
+        """
+        Exports every document of a collection, resuming from the checkpoint of the output if there is one
+
+        :param collectionId: The name of the collection relative to parent to export
+        :param path: Path of the output file
+        :param parent: The parent resource of the collection
+        :return: Statistics of the export
+        """
+
+        return self.export(query=Query().fromCollection((collectionId, False)), path=path, parent=parent)
+
+    def export_partitioned(self, collectionId: str, path: str, partitions: int, parent: str = None,
+                           maxConcurrency: int = 4) -> dict:
+        """
+        Exports every document of a collection group in parallel, each partition to its own output shard
+
+        The partition boundaries are requested with partitionQuery and saved in a manifest next to the output, so
+        a resumed export reuses the same boundaries and every shard continues from its own checkpoint. Shards are
+        named after the output path with the shard number inserted before the file extension.
+
+        :param collectionId: Collection ID of the group. Every collection with this ID under parent is exported,
+                             at any depth.
+        :param path: Path of the output, Example: "orders.jsonl.gz" -> "orders-00000.jsonl.gz", ...
+        :param partitions: The desired number of partitions. The server may return fewer.
+        :param parent: The parent resource of the collection group
+        :param maxConcurrency: The maximum number of shards exported at once
+        :return: Statistics of the export, with the paths of the shards
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/partitionQuery
+        """
+
+        if isinstance(partitions, bool) or not isinstance(partitions, int):
+            raise TypeError(f"Partitions is required to be of type int not {type(partitions)}")
+        if partitions <= 0:
+            raise ValueError("Partitions must be greater than 0")
+
+        structuredQuery = Query().fromCollection((collectionId, True)).orderBy("__name__").to_json()["structuredQuery"]
+        cursors = self._partitions(structuredQuery=structuredQuery, path=path, partitions=partitions, parent=parent)
+
+        bounds = list(zip([None] + cursors, cursors + [None]))
+        shards = [_shard_path(path=path, index=index) for index in range(len(bounds))]
+
+        span = tracing.current()
+
+        def run(index: int) -> dict:
+            startAt, endAt = bounds[index]
+            shard = copy.deepcopy(structuredQuery)
+
+            if startAt is not None:
+                shard["startAt"] = {"values": startAt["values"], "before": True}
+            if endAt is not None:
+                shard["endAt"] = {"values": endAt["values"], "before": True}
+
+            with tracing.span("Exporter.partition", parent=span, **{"exporter.partition": index}):
+                return self._export(structuredQuery=shard, path=shards[index], parent=parent)
+
+        with ThreadPoolExecutor(max_workers=maxConcurrency) as executor:
+            results = list(executor.map(run, range(len(bounds))))
+
+        return {"documents": sum(result["documents"] for result in results),
+                "bytes": sum(result["bytes"] for result in results),
+                "done": all(result["done"] for result in results), "shards": shards}
+
+    def _partitions(self, structuredQuery: dict, path: str, partitions: int, parent: Optional[str]) -> List[dict]:
+        manifest = f"{path}.partitions.json"
+
+        if os.path.exists(manifest):
+            with open(manifest, "r") as file:
+                return json.load(file)["cursors"]
+
+        cursors = []
+        pageToken = None
+
+        while True:
+            json_kwargs = {"structuredQuery": structuredQuery, "partitionCount": str(partitions)}
+            if pageToken:
+                json_kwargs["pageToken"] = pageToken
+            if self.readTime is not None:
+                json_kwargs["readTime"] = self.readTime
+
+            response = self.firestore.partitionQuery(parent=parent, json_kwargs=json_kwargs).json()
+            cursors.extend(response.get("partitions", []))
+
+            pageToken = response.get("nextPageToken")
+            if not pageToken:
+                break
+
+        _write_json(path=manifest, data={"cursors": cursors})
+        return cursors
+
+    def _export(self, structuredQuery: dict, path: str, parent: Optional[str]) -> dict:
+        structuredQuery = copy.deepcopy(structuredQuery)
+        orders = _resumable_order(structuredQuery.get("orderBy", []))
+        structuredQuery["orderBy"] = orders
+
+        limit = structuredQuery.pop("limit", None)
+        offset = structuredQuery.pop("offset", None)
+        startAt = structuredQuery.pop("startAt", None)
+
+        checkpoint = f"{path}.checkpoint"
+        state = {"cursor": None, "name": None, "documents": 0, "bytes": 0, "done": False}
+
+        if os.path.exists(checkpoint):
+            with open(checkpoint, "r") as file:
+                state = json.load(file)
+
+        if state["done"]:
+            return _statistics(state)
+
+        # Anything after the last recorded page was written by an interrupted run and is read again
+        with open(path, "ab") as output:
+            output.truncate(state["bytes"])
+
+        with open(path, "ab") as output:
+            while not state["done"]:
+                page = copy.deepcopy(structuredQuery)
+                size = self.pageSize if limit is None else min(self.pageSize, limit - state["documents"])
+
+                if state["cursor"] is not None:
+                    page["startAt"] = {"values": state["cursor"], "before": False}
+                else:
+                    if startAt is not None:
+                        page["startAt"] = startAt
+                    if offset:
+                        page["offset"] = offset
+
+                with tracing.span("Exporter.page", **{"firestore.documents.offset": state["documents"]}) as span:
+                    if size > 0:
+                        page["limit"] = size
+                        documents = self._page(structuredQuery=page, parent=parent)
+                    else:
+                        documents = []
+
+                    if documents:
+                        data = b"".join(json.dumps(document, separators=(",", ":")).encode("utf-8") + b"\n"
+                                        for document in documents)
+                        if self.compress:
+                            data = gzip.compress(data)
+
+                        output.write(data)
+                        output.flush()
+                        os.fsync(output.fileno())
+
+                        state["cursor"] = [_order_value(document=documents[-1], order=order) for order in orders]
+                        state["name"] = documents[-1]["name"]
+                        state["documents"] += len(documents)
+                        state["bytes"] += len(data)
+
+                    if span is not None:
+                        span.set_attribute("firestore.documents", len(documents))
+                        span.set_attribute("exporter.bytes", len(data) if documents else 0)
+
+                state["done"] = len(documents) < size or size <= 0
+                _write_json(path=checkpoint, data=state)
+
+        return _statistics(state)
+
+    def _page(self, structuredQuery: dict, parent: Optional[str]) -> List[dict]:
+        json_kwargs = {"structuredQuery": structuredQuery}
+        if self.readTime is not None:
+            json_kwargs["readTime"] = self.readTime
+
+        results = self.firestore.runQuery(parent=parent, json_kwargs=json_kwargs).json()
+
+        return [result["document"] for result in results if "document" in result]
+
+
+def _resumable_order(orders: List[dict]) -> List[dict]:
+    """
+    Ends an order by clause with __name__ so every document has a unique position, in the direction of the last
+    explicit order like Firestore orders queries implicitly
+
+    :param orders: Orders of a structured query
+    :return: The orders ending with __name__
+    """
+
+    orders = list(orders)
+
+    if orders and orders[-1]["field"]["fieldPath"] == "__name__":
+        return orders
+
+    direction = orders[-1].get("direction", "ASCENDING") if orders else "ASCENDING"
+    return orders + [{"field": {"fieldPath": "__name__"}, "direction": direction}]
+
+
+def _order_value(document: dict, order: dict) -> dict:
+    """
+    Gets the Value of a document for one order of a query, to build a cursor positioned at the document
+
+    :param document: Document as returned by the Firebase REST API
+    :param order: Order of a structured query
+    :return: The Value of the ordered field
+    """
+
+    path = order["field"]["fieldPath"]
+
+    if path == "__name__":
+        return {"referenceValue": document["name"]}
+
+    value = fieldPath.lookup(document.get("fields", {}), path)
+    if value is None:
+        raise ValueError(f"Document {document['name']} has no value for ordered field {path}")
+
+    return value
+
+
+def _shard_path(path: str, index: int) -> str:
+    """
+    Inserts a shard number before the extension of a file path
+
+    :param path: Path of the output, Example: "backups/orders.jsonl.gz"
+    :param index: Number of the shard
+    :return: Path of the shard, Example: "backups/orders-00003.jsonl.gz"
+    """
+
+    directory, filename = os.path.split(path)
+    stem, dot, extension = filename.partition(".")
+
+    return os.path.join(directory, f"{stem}-{index:05d}{dot}{extension}")
+
+
+def _statistics(state: dict) -> dict:
+    return {"documents": state["documents"], "bytes": state["bytes"], "done": state["done"], "name": state["name"]}
+
+
+def _write_json(path: str, data: dict) -> None:
+    # Write to a temporary file first so a crash can't leave a truncated file behind
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
@@ -2,11 +2,27 @@ import httpx
 
 from pyVTFirebase.services.helpers import build_url, build_params, validate_json
 from pyVTFirebase.exceptions import check_response
+from pyVTFirebase.instrumentation import instrumented
 from pyVTFirebase.services.auth import Auth
 from pyVTFirebase.services.firestore.types.query import Query
-from typing import Union
-
-
+from pyVTFirebase.services.firestore.types.preparedQuery import BoundQuery
+from pyVTFirebase.services.firestore.types.aggregationQuery import AggregationQuery
+from pyVTFirebase.services.firestore.types.write import Transforms
+from pyVTFirebase.services.firestore.batch import WriteBatch
+from pyVTFirebase.services.firestore.bulkWriter import BulkWriter
+from pyVTFirebase.services.firestore.writeBuffer import WriteBuffer
+from pyVTFirebase.services.firestore.recursiveDelete import recursive_delete
+from pyVTFirebase.services.firestore.transaction import Transaction, run_transaction
+from pyVTFirebase.services.firestore.exporter import Exporter
+from pyVTFirebase.services.firestore.planner import QueryPlanner
+from pyVTFirebase.services.firestore.loader import DocumentLoader
+from pyVTFirebase.services.firestore.resolver import ReferenceResolver
+from pyVTFirebase.services.firestore.queryCache import QueryCache, canonical_body, collection_of, read_collections, \
+    written_collections
+from typing import Any, Callable, Iterable, Optional, Union
+
+
+@instrumented
 class Firestore:
     """ Firestore Management Service """
 
@@ -15,8 +31,10 @@ class Firestore:
         self.project_id = project_id
         self.client = client
         self.id_token = id_token
-        self.base_url = f"https://firestore.googleapis.com/v1/projects/{self.project_id}/databases/(default)/documents"
+        self.database = f"projects/{self.project_id}/databases/(default)"
+        self.base_url = f"https://firestore.googleapis.com/v1/{self.database}/documents"
         self.header = {"Content-Type": "application/json; charset=UTF-8", "Authorization": f"Bearer {self.id_token}"}
+        self.query_cache: Optional[QueryCache] = None
 
     def refresh_id_token(self, refresh_token: str):
         """
@@ -28,13 +46,200 @@ class Firestore:
         auth = Auth(api_key=self.api_key, client=self.client)
         access = auth.exchange_refresh_token_for_ID_token(refresh_token=refresh_token).json()
         self.id_token = access["id_token"]
+        self.header["Authorization"] = f"Bearer {self.id_token}"
+
+    def document_name(self, path: str) -> str:
+        """
+        Converts a document path into the full resource name used to reference the document in request bodies
+
+        :param path: Document path
+        :return: Full resource name of the document
+
+        Example:
+            path ->
+                "Credentials/Team/<UserID>"
+            return ->
+                "projects/<ProjectID>/databases/(default)/documents/Credentials/Team/<UserID>"
+        """
+
+        if path.startswith(f"{self.database}/documents/"):
+            return path
+
+        return build_url(self.database, "documents", path.strip("/"))
+
+    def batch(self) -> WriteBatch:
+        """
+        Creates a batch of writes that are applied atomically with a single commit request
+
+        :return: New instance of the WriteBatch class
+        """
+
+        return WriteBatch(firestore=self)
+
+    def transform(self, path: str, transforms: Transforms, precondition: dict = None) -> httpx.Response:
+        """
+        Applies server-side field transforms to a document in a single request, without reading it first
+
+        Transforms such as increment are applied atomically by the server, so concurrent updates of hot counters
+        don't need a transaction or contention retries.
+
+        :param path: Document path
+        :param transforms: The field transforms to apply
+        :param precondition: Optional, precondition on the document, see Firestore.patch for details
+        :return: Request response form the Firebase REST API. The new values of the transformed fields are returned
+                 in writeResults[0].transformResults.
+
+        Example:
+            firestore.transform("Counters/PageViews", Transforms().increment("Count", 1).serverTimestamp("Updated"))
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/Write#DocumentTransform
+        """
+
+        return self.batch().transform(path=path, transforms=transforms, precondition=precondition).commit()
+
+    def bulk_writer(self, **kwargs) -> BulkWriter:
+        """
+        Creates a writer that applies large volumes of independent writes with batched, concurrent batchWrite requests
+
+        :keyword kwargs: Options of the BulkWriter, see bulkWriter.py in package for details
+        :return: New instance of the BulkWriter class
+        """
+
+        return BulkWriter(firestore=self, **kwargs)
+
+    def recursive_delete(self, path: str, maxConcurrency: int = 4, pageSize: int = 300,
+                         progress: Callable[[int], None] = None) -> int:
+        """
+        Deletes a document or collection along with every document in its subcollections, at any depth
+
+        Documents are discovered page by page, requesting only their names, and deleted with a BulkWriter so the
+        deletes are batched and run concurrently. Documents that are missing but have subcollections are included.
+
+        :param path: Document or collection path
+        :param maxConcurrency: The maximum number of requests in flight at once
+        :param pageSize: The number of documents to list per request
+        :param progress: Optional, called with the total number of documents deleted so far after each delete
+        :return: The number of documents deleted
+
+        Examples:
+            path ->
+                'Tenants/<TenantID>'
+                'Tenants/<TenantID>/Orders'
+        """
+
+        return recursive_delete(firestore=self, path=path, maxConcurrency=maxConcurrency, pageSize=pageSize,
+                                progress=progress)
+
+    def write_buffer(self, **kwargs) -> WriteBuffer:
+        """
+        Creates a buffer that merges patches of the same document and writes them with periodic batched commits
+
+        :keyword kwargs: Options of the WriteBuffer, see writeBuffer.py in package for details
+        :return: New instance of the WriteBuffer class
+        """
+
+        return WriteBuffer(firestore=self, **kwargs)
+
+    def exporter(self, **kwargs) -> Exporter:
+        """
+        Creates an exporter that streams documents to JSON Lines files with resumable checkpoints
+
+        :keyword kwargs: Options of the Exporter, see exporter.py in package for details
+        :return: New instance of the Exporter class
+        """
+
+        return Exporter(firestore=self, **kwargs)
+
+    def planner(self, **kwargs) -> QueryPlanner:
+        """
+        Creates a planner that runs queries with more in, array_contains_any or OR disjunctions than Firestore allows
+        by splitting them into concurrent sub-queries
+
+        :keyword kwargs: Options of the QueryPlanner, see planner.py in package for details
+        :return: New instance of the QueryPlanner class
+        """
+
+        return QueryPlanner(firestore=self, **kwargs)
+
+    def loader(self, **kwargs) -> DocumentLoader:
+        """
+        Creates a loader that batches single document reads issued close together into batchGet requests
+
+        :keyword kwargs: Options of the DocumentLoader, see loader.py in package for details
+        :return: New instance of the DocumentLoader class
+        """
+
+        return DocumentLoader(firestore=self, **kwargs)
 
-    def get(self, path: str, mask: list = None) -> httpx.Response:
+    def resolver(self, fields: list, **kwargs) -> ReferenceResolver:
+        """
+        Creates a resolver that fetches the documents referenced by query results with chunked batchGet requests
+
+        :param fields: Field paths of the reference fields to resolve
+        :keyword kwargs: Options of the ReferenceResolver, see resolver.py in package for details
+        :return: New instance of the ReferenceResolver class
+        """
+
+        return ReferenceResolver(firestore=self, fields=fields, **kwargs)
+
+    def enable_query_cache(self, **kwargs) -> QueryCache:
+        """
+        Caches the responses of runQuery calls that ask for it, invalidated when this service writes to a collection
+        the cached queries read from
+
+        :keyword kwargs: Options of the QueryCache, see queryCache.py in package for details
+        :return: New instance of the QueryCache class, holding the cache's metrics
+        """
+
+        self.query_cache = QueryCache(**kwargs)
+        return self.query_cache
+
+    def _invalidate(self, collectionIds: Iterable[str]) -> None:
+        if self.query_cache is not None:
+            self.query_cache.invalidate(collectionIds=collectionIds)
+
+    def transaction(self, fn: Callable[[Transaction], Any], max_attempts: int = 5, read_only: bool = False,
+                    readTime: str = None) -> Any:
+        """
+        Runs a function in a transaction, retrying it when the transaction is aborted by contention
+
+        The function receives a Transaction to read documents through and to queue writes on. The queued writes are
+        committed atomically once the function returns. If the commit is aborted because another client changed the
+        documents that were read, the function is run again in a new transaction with backoff.
+
+        :param fn: Function run in the transaction. Must be safe to run more than once.
+        :param max_attempts: The maximum number of times the function is run
+        :param read_only: If the transaction only reads documents. Read-only transactions take no locks and can't
+                          queue writes.
+        :param readTime: Optional, reads documents as they were at the given time. Only valid for read-only
+                         transactions.
+        :return: The value returned by the function
+
+        Example:
+            def transfer(transaction):
+                account = transaction.get("Accounts/<AccountID>").json()
+                balance = int(account["fields"]["Balance"]["integerValue"])
+                transaction.update("Accounts/<AccountID>", updateMask=["Balance"],
+                                   json_kwargs={"fields": {"Balance": {"integerValue": str(balance - 10)}}})
+
+            firestore.transaction(transfer)
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/beginTransaction
+            https://firebase.google.com/docs/firestore/reference/rest/v1/TransactionOptions
+        """
+
+        return run_transaction(firestore=self, fn=fn, max_attempts=max_attempts, read_only=read_only,
+                               readTime=readTime)
+
+    def get(self, path: str, mask: list = None, transaction: str = None) -> httpx.Response:
         """
         Gets the requested document or documents from a collection
 
         :param path: Document or Collection path
         :param mask: List of document fields to request from document
+        :param transaction: Optional, a base64-encoded transaction string to read the document in
         :return: Request response form the Firebase REST API
 
         Examples:
@@ -48,10 +253,9 @@ class Firestore:
         """
 
         url = build_url(self.base_url, path)
-        params = build_params(key=self.api_key, mask=mask)
+        params = build_params(key=self.api_key, mask=mask, transaction=transaction)
 
-        with self.client as request:
-            req = request.get(url=url, headers=self.header, params=params, timeout=3)
+        req = self.client.get(url=url, headers=self.header, params=params, timeout=3)
 
         check_response(response=req)
         return req
@@ -91,8 +295,7 @@ class Firestore:
         url = build_url(self.base_url, delimiter="batchGet")
         params = build_params(key=self.api_key)
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
 
         check_response(response=req)
         return req
@@ -141,10 +344,10 @@ class Firestore:
         url = build_url(self.base_url, parent, collectionId)
         params = build_params(key=self.api_key, documentId=documentId, mask=mask)
 
-        with self.client as request:
-            req = request.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+        req = self.client.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
 
         check_response(response=req)
+        self._invalidate([collectionId])
         return req
 
     def delete(self, path: str, precondition: dict = None) -> httpx.Response:
@@ -178,10 +381,10 @@ class Firestore:
         url = build_url(self.base_url, path)
         params = build_params(key=self.api_key, currentDocument=precondition)
 
-        with self.client as request:
-            req = request.delete(url=url, headers=self.header, params=params, timeout=3)
+        req = self.client.delete(url=url, headers=self.header, params=params, timeout=3)
 
         check_response(response=req)
+        self._invalidate([collection_of(path)])
         return req
 
     def patch(self, path: str, updateMask: list = None, mask: list = None,
@@ -235,20 +438,22 @@ class Firestore:
             https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents#Document
         """
 
-        validate_json(precondition, json_kwargs)
+        if precondition is not None:
+            validate_json(precondition)
+        validate_json(json_kwargs)
 
         url = build_url(self.base_url, path)
         params = build_params(key=self.api_key, updateMask=updateMask, mask=mask, currentDocument=precondition)
 
-        with self.client as request:
-            req = request.patch(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+        req = self.client.patch(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
 
         check_response(response=req)
+        self._invalidate([collection_of(path)])
         return req
 
     def list(self, collectionId: str, parent: str = None, pageSize: int = None, pageToken: str = None,
              orderBy: str = None, mask: list = None, showMissing: bool = False,
-             transaction: str = None, readTime: str = None):
+             transaction: str = None, readTime: str = None) -> httpx.Response:
         """
         Gets a list of documents from a collection
 
@@ -283,19 +488,23 @@ class Firestore:
         params = build_params(key=self.api_key, pageSize=pageSize, pageToken=pageToken, orderBy=orderBy, mask=mask,
                               showMissing=showMissing, transaction=transaction, readTime=readTime)
 
-        with self.client as request:
-            req = request.get(url, headers=self.header, params=params, timeout=3)
+        req = self.client.get(url, headers=self.header, params=params, timeout=3)
 
         check_response(response=req)
         return req
 
-    def runQuery(self, parent: str = None, json_kwargs: Union[dict, Query] = None) -> httpx.Response:
+    def runQuery(self, parent: str = None, json_kwargs: Union[dict, Query, BoundQuery] = None,
+                 cache: Union[None, bool, float] = None) -> httpx.Response:
         """
         Runs a custom read query
 
         :param parent: The parent resource of the collection to run a structured query against
-        :param json_kwargs: Structured request parameters for the request body or custom Query object
-        :return: Request response form the Firebase REST API
+        :param json_kwargs: Structured request parameters for the request body, custom Query object or bound prepared
+                            query
+        :param cache: Optional, True to serve the response from the query cache or store it there, a number of
+                      seconds to do so with a ttl of its own, or False to bypass the cache. By default only queries
+                      registered with the cache are cached. See Firestore.enable_query_cache.
+        :return: Request response form the Firebase REST API. Cached responses are shared between calls.
 
         Examples:
             json_kwargs[dict] ->
@@ -316,28 +525,308 @@ class Firestore:
             json_kwargs[Query] ->
                 Query object, see query.py in package for details
 
+            json_kwargs[BoundQuery] ->
+                Query.prepare().bind(**params), see preparedQuery.py in package for details
+
         Links: ->
             https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/runQuery
             https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredQuery
         """
 
-        json_data = json_kwargs
+        if cache and self.query_cache is None:
+            raise ValueError("The query cache isn't enabled, see Firestore.enable_query_cache")
 
-        if isinstance(json_data, Query):
-            json_data = json_data.to_json()
+        if not isinstance(json_kwargs, (Query, BoundQuery)):
+            validate_json(json_kwargs)
+
+        ttl = body = None
+        if self.query_cache is not None and self.query_cache.applies(cache=cache) and \
+                not (isinstance(json_kwargs, dict) and ("transaction" in json_kwargs or "newTransaction" in json_kwargs)):
+            body = canonical_body(json_kwargs)
+            ttl = self.query_cache.policy(body=body, cache=cache)
+
+        if ttl is not None:
+            cached = self.query_cache.get(parent=parent, body=body)
+            if cached is not None:
+                return cached
+
+            collectionIds = read_collections(json_kwargs)
+            generation = self.query_cache.generation(collectionIds=collectionIds)
 
-        validate_json(json_data)
         url = build_url(self.base_url, parent, delimiter="runQuery")
         params = build_params(key=self.api_key)
 
-        with self.client as request:
-            req = request.post(
+        # Queries serialize their body once and are valid by construction, so it is sent as is
+        if isinstance(json_kwargs, (Query, BoundQuery)):
+            req = self.client.post(url=url, headers=self.header, params=params, content=json_kwargs.body(), timeout=3)
+        elif body is not None:
+            req = self.client.post(url=url, headers=self.header, params=params, content=body, timeout=3)
+        else:
+            req = self.client.post(
                 url=url,
                 headers=self.header,
                 params=params,
-                json=json_data,
+                json=json_kwargs,
                 timeout=3
             )
 
+        check_response(response=req)
+
+        if ttl is not None:
+            self.query_cache.put(parent=parent, body=body, collectionIds=collectionIds, response=req, ttl=ttl,
+                                 generation=generation)
+
+        return req
+
+    def runAggregationQuery(self, parent: str = None,
+                            json_kwargs: Union[dict, AggregationQuery] = None) -> httpx.Response:
+        """
+        Runs an aggregation query, computing counts, sums and averages on the server without returning documents
+
+        :param parent: The parent resource of the collection to run a structured aggregation query against
+        :param json_kwargs: Structured request parameters for the request body or custom AggregationQuery object
+        :return: Request response form the Firebase REST API
+
+        Examples:
+            json_kwargs[dict] ->
+                {
+                  "structuredAggregationQuery": {
+                    object (StructuredAggregationQuery)
+                  },
+
+                  // Union field consistency_selector can be only one of the following:
+                  "transaction": string,
+                  "newTransaction": {
+                    object (TransactionOptions)
+                  },
+                  "readTime": string
+                  // End of list of possible types for union field consistency_selector.
+                }
+
+            json_kwargs[AggregationQuery] ->
+                AggregationQuery(Query().fromCollection(("Orders", False))).count().sum("Amount")
+
+            Results can be read with AggregationResult, see aggregationQuery.py in package for details
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/runAggregationQuery
+            https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredAggregationQuery
+        """
+
+        json_data = json_kwargs
+
+        if isinstance(json_data, AggregationQuery):
+            json_data = json_data.to_json()
+
+        validate_json(json_data)
+        url = build_url(self.base_url, parent, delimiter="runAggregationQuery")
+        params = build_params(key=self.api_key)
+
+        req = self.client.post(
+            url=url,
+            headers=self.header,
+            params=params,
+            json=json_data,
+            timeout=3
+        )
+
+        check_response(response=req)
+        return req
+
+    def commit(self, json_kwargs: dict = None) -> httpx.Response:
+        """
+        Commits a group of writes atomically, optionally as the end of a transaction
+
+        :param json_kwargs: Structured request parameters for the request body of the request
+        :return: Request response form the Firebase REST API
+
+        Example:
+            json_kwargs ->
+                {
+                  "writes": [
+                    {
+                      object (Write)
+                    }
+                  ],
+                  "transaction": string
+                }
+
+            Writes can be built and committed with a WriteBatch, see batch.py in package for details
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/commit
+            https://firebase.google.com/docs/firestore/reference/rest/v1/Write
+        """
+
+        validate_json(json_kwargs)
+
+        url = build_url(self.base_url, delimiter="commit")
+        params = build_params(key=self.api_key)
+
+        req = self.client.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+
+        check_response(response=req)
+        self._invalidate(written_collections((json_kwargs or {}).get("writes", [])))
+        return req
+
+    def batchWrite(self, json_kwargs: dict = None) -> httpx.Response:
+        """
+        Applies a group of writes non-atomically. Each write succeeds or fails independently and the status of
+        every write is returned in the response.
+
+        :param json_kwargs: Structured request parameters for the request body of the request
+        :return: Request response form the Firebase REST API
+
+        Example:
+            json_kwargs ->
+                {
+                  "writes": [
+                    {
+                      object (Write)
+                    }
+                  ],
+                  "labels": {
+                    string: string,
+                    ...
+                  }
+                }
+
+            Large volumes of writes can be batched, parallelized and retried with a BulkWriter, see bulkWriter.py
+            in package for details
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/batchWrite
+            https://firebase.google.com/docs/firestore/reference/rest/v1/Write
+        """
+
+        validate_json(json_kwargs)
+
+        url = build_url(self.base_url, delimiter="batchWrite")
+        params = build_params(key=self.api_key)
+
+        req = self.client.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+
+        check_response(response=req)
+        self._invalidate(written_collections((json_kwargs or {}).get("writes", [])))
+        return req
+
+    def beginTransaction(self, json_kwargs: dict = None) -> httpx.Response:
+        """
+        Starts a new transaction
+
+        :param json_kwargs: Structured request parameters for the request body of the request
+        :return: Request response form the Firebase REST API
+
+        Example:
+            json_kwargs ->
+                {
+                  "options": {
+                    // Union field mode can be only one of the following:
+                    "readOnly": {
+                      "readTime": string
+                    },
+                    "readWrite": {
+                      "retryTransaction": string
+                    }
+                    // End of list of possible types for union field mode.
+                  }
+                }
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/beginTransaction
+            https://firebase.google.com/docs/firestore/reference/rest/v1/TransactionOptions
+        """
+
+        json_kwargs = json_kwargs if json_kwargs is not None else {}
+        validate_json(json_kwargs)
+
+        url = build_url(self.base_url, delimiter="beginTransaction")
+        params = build_params(key=self.api_key)
+
+        req = self.client.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+
+        check_response(response=req)
+        return req
+
+    def rollback(self, transaction: str) -> httpx.Response:
+        """
+        Rolls back a transaction, releasing any locks it holds
+
+        :param transaction: The base64-encoded transaction string to roll back
+        :return: Request response form the Firebase REST API
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/rollback
+        """
+
+        url = build_url(self.base_url, delimiter="rollback")
+        params = build_params(key=self.api_key)
+        data = {"transaction": transaction}
+
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+
+        check_response(response=req)
+        return req
+
+    def listCollectionIds(self, parent: str = None, pageSize: int = None, pageToken: str = None) -> httpx.Response:
+        """
+        Lists the IDs of the collections directly under a document, or the root collections of the database
+
+        :param parent: The document path to list the collections of. Lists the root collections if not set.
+        :param pageSize: The maximum number of collection IDs to return
+        :param pageToken: The nextPageToken value returned from a previous listCollectionIds request, if any
+        :return: Request response form the Firebase REST API
+
+        Examples:
+            parent ->
+                'Accounts/Company'
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/listCollectionIds
+        """
+
+        url = build_url(self.base_url, parent, delimiter="listCollectionIds")
+        params = build_params(key=self.api_key)
+        data = {_key: _value for _key, _value in (("pageSize", pageSize), ("pageToken", pageToken))
+                if _value is not None}
+
+        req = self.client.post(url=url, headers=self.header, params=params, json=data, timeout=3)
+
+        check_response(response=req)
+        return req
+
+    def partitionQuery(self, parent: str = None, json_kwargs: dict = None) -> httpx.Response:
+        """
+        Splits a query into partitions that can be read in parallel, returning the cursors between them
+
+        :param parent: The parent resource of the collection to partition a structured query against
+        :param json_kwargs: Structured request parameters for the request body of the request
+        :return: Request response form the Firebase REST API
+
+        Example:
+            json_kwargs ->
+                {
+                  "partitionCount": string,
+                  "pageToken": string,
+                  "pageSize": integer,
+                  "structuredQuery": {
+                    object (StructuredQuery)
+                  }
+                }
+
+            The query must select a collection group, with allDescendants set to True, and may only be ordered by
+            __name__ ascending.
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/partitionQuery
+        """
+
+        validate_json(json_kwargs)
+
+        url = build_url(self.base_url, parent, delimiter="partitionQuery")
+        params = build_params(key=self.api_key)
+
+        req = self.client.post(url=url, headers=self.header, params=params, json=json_kwargs, timeout=3)
+
         check_response(response=req)
         return req
@@ -0,0 +1,263 @@
+
+import os
+import csv
+import json
+import time
+import threading
+
+from pyVTFirebase.exceptions import BulkWriteError
+from pyVTFirebase.services.firestore.bulkWriter import BulkWriter
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+def read_jsonl(path: str, start: int = 0) -> Iterator[Tuple[int, Any]]:
+    """
+    Streams the records of a JSON Lines file one line at a time
+
+    :param path: Path of the file
+    :param start: Byte offset to start reading from, as returned with an earlier record
+    :return: Iterator of tuples of the byte offset just after each record and the decoded record
+    """
+
+    with open(path, "rb") as file:
+        file.seek(start)
+
+        while True:
+            line = file.readline()
+            if not line:
+                return
+            if line.strip():
+                yield file.tell(), json.loads(line)
+
+
+def read_csv(path: str, start: int = 0, **kwargs) -> Iterator[Tuple[int, dict]]:
+    """
+    Streams the rows of a CSV file with a header row one row at a time
+
+    :param path: Path of the file
+    :param start: The number of rows to skip, as returned with an earlier row
+    :keyword kwargs: Formatting parameters passed on to csv.DictReader
+    :return: Iterator of tuples of the number of rows read so far and each row as a dict
+    """
+
+    with open(path, "r", newline="") as file:
+        for position, row in enumerate(csv.DictReader(file, **kwargs), start=1):
+            if position > start:
+                yield position, row
+
+
+def read_records(records: Iterable[Any], start: int = 0) -> Iterator[Tuple[int, Any]]:
+    """
+    Numbers the records of any iterable so an import of them can be resumed
+
+    :param records: Iterable of records, which must produce the same records in the same order when resumed
+    :param start: The number of records to skip, as returned with an earlier record
+    :return: Iterator of tuples of the number of records read so far and each record
+    """
+
+    for position, record in enumerate(records, start=1):
+        if position > start:
+            yield position, record
+
+
+class Importer(object):
+    """
+    Streams records into documents through a BulkWriter, checkpointing the input position so an interrupted
+    import resumes where it stopped
+
+    Records are read lazily and handed to the BulkWriter, which blocks the reader while its requests are
+    backed up, so memory use stays bounded however large the input is. The checkpoint only moves past a record
+    once it and every record before it have been written, so records may be written again after a resume but
+    are never skipped. A record whose write fails holds the checkpoint back, so running the import again retries
+    it. The default set mode makes repeating a write harmless.
+
+    Example:
+        def mapper(record):
+            return f"Customers/{record['id']}", {"fields": encode(record)["mapValue"]["fields"]}
+
+        Importer(firestore, mapper=mapper, checkpoint="customers.checkpoint").import_jsonl("customers.jsonl")
+    """
+
+    def __init__(self, firestore: "Firestore", mapper: Callable[[Any], Optional[Tuple[str, dict]]],
+                 checkpoint: str = None, mode: str = "set", checkpointInterval: float = 5.0,
+                 on_error: Callable[[Any, BulkWriteError], None] = None, **kwargs) -> None:
+        """
+        :param firestore: Firestore service to write the documents with
+        :param mapper: Function mapping a record to a tuple of its document path and document instance, or to None
+                       to skip the record
+        :param checkpoint: Optional, path of the file the input position is saved to and resumed from
+        :param mode: How documents are written, either "set" to create or replace them or "create" to fail for
+                     documents that already exist
+        :param checkpointInterval: The minimum number of seconds between checkpoint saves
+        :param on_error: Optional, called with the record and BulkWriteError of each failed write
+        :keyword kwargs: Options of the BulkWriter, see bulkWriter.py in package for details
+        """
+
+        if mode not in ("set", "create"):
+            raise ValueError(f"Mode must either be set or create not {mode}")
+
+        self.firestore = firestore
+        self.mapper = mapper
+        self.checkpoint = checkpoint
+        self.mode = mode
+        self.checkpointInterval = checkpointInterval
+        self.on_error = on_error
+        self.writer_options = kwargs
+
+        self.imported = 0
+        self.failed = 0
+        self.skipped = 0
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next = 0
+        self._failed = None
+        self._position = 0
+        self._saved = 0.0
+
+    def import_jsonl(self, path: str) -> dict:
+        """
+        Imports the records of a JSON Lines file, resuming from the checkpoint if there is one
+
+        :param path: Path of the file
+        :return: Statistics of the import
+        """
+
+        return self.run(lambda start: read_jsonl(path, start=start))
+
+    def import_csv(self, path: str, **kwargs) -> dict:
+        """
+        Imports the rows of a CSV file with a header row, resuming from the checkpoint if there is one
+
+        :param path: Path of the file
+        :keyword kwargs: Formatting parameters passed on to csv.DictReader
+        :return: Statistics of the import
+        """
+
+        return self.run(lambda start: read_csv(path, start=start, **kwargs))
+
+    def import_records(self, records: Iterable[Any]) -> dict:
+        """
+        Imports the records of any iterable, resuming from the checkpoint if there is one
+
+        :param records: Iterable of records, which must produce the same records in the same order when resumed
+        :return: Statistics of the import
+        """
+
+        return self.run(lambda start: read_records(records, start=start))
+
+    def run(self, source: Callable[[int], Iterator[Tuple[int, Any]]]) -> dict:
+        """
+        Imports the records of a source
+
+        :param source: Function returning an iterator of tuples of the resume position after each record and the
+                       record, starting from a given position
+        :return: Statistics of the import
+        """
+
+        self._pending = {}
+        self._next = 0
+        self._failed = None
+        self._position = self._load()
+        self._saved = time.monotonic()
+
+        with BulkWriter(firestore=self.firestore, **self.writer_options) as writer:
+            for sequence, (position, record) in enumerate(source(self._position)):
+                mapped = self.mapper(record)
+
+                with self._lock:
+                    # Records after a failure can't move the position, so they aren't tracked
+                    if self._failed is None or sequence < self._failed:
+                        self._pending[sequence] = [position, False]
+
+                if mapped is None:
+                    with self._lock:
+                        self.skipped += 1
+                    self._complete(sequence=sequence)
+                    continue
+
+                path, json_kwargs = mapped
+                if self.mode == "set":
+                    future = writer.set(path=path, json_kwargs=json_kwargs)
+                else:
+                    future = writer.create(path=path, json_kwargs=json_kwargs)
+
+                future.add_done_callback(
+                    lambda _future, _sequence=sequence, _record=record: self._written(_future, _sequence, _record))
+
+        self._save()
+        return self.statistics()
+
+    def statistics(self) -> dict:
+        """
+        Gets the statistics of the import
+
+        :return: The number of records imported, failed and skipped, and the resume position
+        """
+
+        with self._lock:
+            return {"imported": self.imported, "failed": self.failed, "skipped": self.skipped,
+                    "position": self._position}
+
+    def _written(self, future, sequence: int, record: Any) -> None:
+        error = future.exception()
+
+        with self._lock:
+            if error is None:
+                self.imported += 1
+            else:
+                self.failed += 1
+
+        if error is not None and self.on_error is not None:
+            self.on_error(record, error)
+
+        self._complete(sequence=sequence, succeeded=error is None)
+
+    def _complete(self, sequence: int, succeeded: bool = True) -> None:
+        with self._lock:
+            # A failed record holds the position back so the next run retries it. Only the records before the
+            # first failure are kept, so a failure early in a large import doesn't keep every later record.
+            if not succeeded and (self._failed is None or sequence < self._failed):
+                self._failed = sequence
+                for later in [key for key, entry in self._pending.items() if key > sequence and entry[1]]:
+                    del self._pending[later]
+
+            if self._failed is not None and sequence >= self._failed:
+                self._pending.pop(sequence, None)
+            else:
+                self._pending[sequence][1] = True
+
+            # Advance past every record that succeeded along with all records before it
+            while self._next in self._pending and self._pending[self._next][1]:
+                self._position = self._pending.pop(self._next)[0]
+                self._next += 1
+
+            due = time.monotonic() - self._saved >= self.checkpointInterval
+
+        if due:
+            self._save()
+
+    def _load(self) -> int:
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return 0
+
+        with open(self.checkpoint, "r") as file:
+            return json.load(file)["position"]
+
+    def _save(self) -> None:
+        if self.checkpoint is None:
+            return
+
+        with self._lock:
+            self._saved = time.monotonic()
+            data = {"position": self._position, "imported": self.imported, "failed": self.failed,
+                    "skipped": self.skipped}
+
+            # Write to a temporary file first so a crash can't leave a truncated checkpoint behind
+            temporary = f"{self.checkpoint}.tmp"
+            with open(temporary, "w") as file:
+                json.dump(data, file)
+            os.replace(temporary, self.checkpoint)
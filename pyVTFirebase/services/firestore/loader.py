@@ -0,0 +1,201 @@
+
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pyVTFirebase import tracing
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+# The number of documents sent per batchGet request by default
+MAX_BATCH_GET = 100
+
+
+class DocumentLoader(object):
+    """
+    Collects single document reads issued within a short window and sends them together as one batchGet request
+
+    Code reading one document at a time from many places keeps the simple single document API, while the reads
+    issued within window seconds of each other are deduplicated and fetched in as few batchGet requests as
+    maxBatchSize allows. Each caller's future resolves to its own document, or to None when the document doesn't
+    exist. A batch that fills up before the window ends is sent right away.
+
+    Loaded documents are remembered for the lifetime of the loader when cache is set, so a loader is best scoped to
+    a single unit of work such as a request, or cleared with DocumentLoader.clear after writes.
+
+    Example:
+        with firestore.loader() as loader:
+            owners = [loader.load(f"Users/{device['owner']}") for device in devices]
+            documents = [owner.result() for owner in owners]
+    """
+
+    def __init__(self, firestore: "Firestore", window: float = 0.002, maxBatchSize: int = MAX_BATCH_GET,
+                 maxConcurrency: int = 4, mask: list = None, readTime: str = None, cache: bool = True) -> None:
+        """
+        :param firestore: Firestore service used to send the batchGet requests
+        :param window: Seconds to wait for further reads after the first read of a batch is issued
+        :param maxBatchSize: The maximum number of documents requested per batchGet request
+        :param maxConcurrency: The maximum number of batchGet requests in flight at once
+        :param mask: Optional, list of document fields to request from the documents
+        :param readTime: Optional, reads the documents as they were at the given time
+        :param cache: If documents that were loaded before are returned without requesting them again
+        """
+
+        for name, value in (("MaxBatchSize", maxBatchSize), ("MaxConcurrency", maxConcurrency)):
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise TypeError(f"{name} is required to be of type int not {type(value)}")
+            if value <= 0:
+                raise ValueError(f"{name} must be greater than 0")
+
+        self.firestore = firestore
+        self.window = window
+        self.maxBatchSize = maxBatchSize
+        self.mask = mask
+        self.readTime = readTime
+        self.cache = cache
+
+        self._executor = ThreadPoolExecutor(max_workers=maxConcurrency)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._loaded: Dict[str, Future] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    def __enter__(self) -> "DocumentLoader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def load(self, path: str) -> Future:
+        """
+        Queues the read of a document, to be sent with the other reads of the current window
+
+        :param path: Document path or full resource name
+        :return: Future resolving to the document as returned by the Firebase REST API, or None if it doesn't exist
+        """
+
+        name = self.firestore.document_name(path)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot load a document once the DocumentLoader has been closed")
+
+            future = self._loaded.get(name) or self._pending.get(name)
+            if future is not None:
+                return future
+
+            future = Future()
+            self._pending[name] = future
+            if self.cache:
+                self._loaded[name] = future
+
+            if len(self._pending) >= self.maxBatchSize:
+                self._submit(self._take())
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.dispatch)
+                self._timer.daemon = True
+                self._timer.start()
+
+        return future
+
+    def load_many(self, paths: Iterable[str]) -> List[Future]:
+        """
+        Queues the reads of several documents, see DocumentLoader.load
+
+        :param paths: Document paths or full resource names
+        :return: List of futures in the order of the paths
+        """
+
+        return [self.load(path) for path in paths]
+
+    def get(self, path: str) -> Optional[dict]:
+        """
+        Reads a document through the loader and waits for it
+
+        :param path: Document path or full resource name
+        :return: The document as returned by the Firebase REST API, or None if it doesn't exist
+        """
+
+        return self.load(path).result()
+
+    def dispatch(self) -> None:
+        """
+        Sends the reads queued so far without waiting for the rest of the window
+        """
+
+        with self._lock:
+            self._submit(self._take())
+
+    def clear(self, path: str = None) -> None:
+        """
+        Forgets loaded documents so they are requested again on their next load
+
+        :param path: Optional, the document to forget. Forgets every document when not set.
+        """
+
+        with self._lock:
+            if path is None:
+                self._loaded.clear()
+            else:
+                self._loaded.pop(self.firestore.document_name(path), None)
+
+    def close(self) -> None:
+        """
+        Sends the queued reads and waits for every request to finish
+        """
+
+        # Batches are taken and submitted under the lock, so none can be submitted once this one has been
+        with self._lock:
+            self._closed = True
+            self._submit(self._take())
+
+        self._executor.shutdown(wait=True)
+
+    def _take(self) -> Dict[str, Future]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending
+        self._pending = {}
+        return batch
+
+    def _submit(self, batch: Dict[str, Future]) -> None:
+        if not batch:
+            return
+
+        try:
+            self._executor.submit(self._fetch, batch)
+        except RuntimeError as exc:
+            # Never leave a caller waiting on a batch that can no longer be sent
+            for future in batch.values():
+                future.set_exception(exc)
+
+    def _fetch(self, batch: Dict[str, Future]) -> None:
+        json_kwargs = {"documents": list(batch)}
+
+        if self.mask is not None:
+            json_kwargs["mask"] = {"fieldPaths": self.mask}
+        if self.readTime is not None:
+            json_kwargs["readTime"] = self.readTime
+
+        try:
+            with tracing.span("DocumentLoader.batch", **{"firestore.documents.requested": len(batch)}):
+                results = self.firestore.batch_get(json_kwargs=json_kwargs).json()
+        except Exception as exc:
+            with self._lock:
+                for name in batch:
+                    if self._loaded.get(name) is batch[name]:
+                        del self._loaded[name]
+
+            for future in batch.values():
+                future.set_exception(exc)
+            return
+
+        documents = {result["found"]["name"]: result["found"] for result in results if "found" in result}
+
+        for name, future in batch.items():
+            future.set_result(documents.get(name))
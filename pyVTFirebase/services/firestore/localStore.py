@@ -0,0 +1,473 @@
+
+import bisect
+import threading
+
+from pyVTFirebase.services.firestore.evaluator import evaluate, matcher
+from pyVTFirebase.services.firestore.types import fieldPath
+from pyVTFirebase.services.firestore.types.ordering import complete_order, sort_key, type_rank
+from pyVTFirebase.services.firestore.types.query import Query
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+
+_RANGE_OPERATORS = ("LESS_THAN", "LESS_THAN_OR_EQUAL", "GREATER_THAN", "GREATER_THAN_OR_EQUAL")
+
+
+class HashIndex(object):
+    """
+    Maps the values of a field to the documents holding them, for equality, in and array_contains filters
+
+    Elements of array values are indexed as well so array_contains and array_contains_any are lookups too.
+    """
+
+    kind = "hash"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._values: Dict[tuple, Set[str]] = {}
+        self._elements: Dict[tuple, Set[str]] = {}
+        self._entries: Dict[str, Tuple[tuple, List[tuple]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, name: str, value: dict) -> None:
+        key = sort_key(value)
+        elements = [sort_key(element) for element in value["arrayValue"].get("values", [])] \
+            if "arrayValue" in value else []
+
+        self._values.setdefault(key, set()).add(name)
+        for element in elements:
+            self._elements.setdefault(element, set()).add(name)
+
+        self._entries[name] = (key, elements)
+
+    def remove(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+
+        key, elements = entry
+        _discard(self._values, key, name)
+        for element in elements:
+            _discard(self._elements, element, name)
+
+    def equal(self, value: dict) -> Set[str]:
+        return self._values.get(sort_key(value), set())
+
+    def any(self, values: List[dict]) -> Set[str]:
+        return set().union(*(self._values.get(sort_key(value), ()) for value in values))
+
+    def contains(self, value: dict) -> Set[str]:
+        return self._elements.get(sort_key(value), set())
+
+    def contains_any(self, values: List[dict]) -> Set[str]:
+        return set().union(*(self._elements.get(sort_key(value), ()) for value in values))
+
+
+class SortedIndex(object):
+    """
+    Keeps the documents holding a field sorted by its value and then by name, for range filters and orders
+
+    Lookups are binary searches. The entries are kept in a sorted list, so updates shift the entries after the
+    changed position, which is a fast memory move rather than a per-entry cost.
+    """
+
+    kind = "sorted"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._keys: List[tuple] = []
+        self._entries: List[Tuple[tuple, tuple, str]] = []
+        self._by_name: Dict[str, Tuple[tuple, tuple, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, name: str, value: dict) -> None:
+        entry = (sort_key(value), sort_key({"referenceValue": name}), name)
+        position = bisect.bisect_left(self._entries, entry)
+
+        self._entries.insert(position, entry)
+        self._keys.insert(position, entry[0])
+        self._by_name[name] = entry
+
+    def remove(self, name: str) -> None:
+        entry = self._by_name.pop(name, None)
+        if entry is None:
+            return
+
+        position = bisect.bisect_left(self._entries, entry)
+        del self._entries[position]
+        del self._keys[position]
+
+    def range(self, lower: tuple = None, lowerInclusive: bool = True, upper: tuple = None,
+              upperInclusive: bool = True) -> Iterator[str]:
+        """
+        Yields the names of the documents whose value lies between two sort keys, in ascending order
+
+        :param lower: The lowest sort key or None for no lower bound
+        :param lowerInclusive: If documents with the lowest sort key are included
+        :param upper: The highest sort key or None for no upper bound
+        :param upperInclusive: If documents with the highest sort key are included
+        :return: Iterator of document names
+        """
+
+        start, end = self._bounds(lower, lowerInclusive, upper, upperInclusive)
+
+        for position in range(start, end):
+            yield self._entries[position][2]
+
+    def scan(self, descending: bool = False) -> Iterator[str]:
+        """
+        Yields the names of all indexed documents in the order of the field and then __name__
+
+        :param descending: If the order is reversed
+        :return: Iterator of document names
+        """
+
+        entries = reversed(self._entries) if descending else iter(self._entries)
+        for entry in entries:
+            yield entry[2]
+
+    def _bounds(self, lower, lowerInclusive, upper, upperInclusive) -> Tuple[int, int]:
+        if lower is None:
+            start = 0
+        elif lowerInclusive:
+            start = bisect.bisect_left(self._keys, lower)
+        else:
+            start = bisect.bisect_right(self._keys, lower)
+
+        if upper is None:
+            end = len(self._keys)
+        elif upperInclusive:
+            end = bisect.bisect_right(self._keys, upper)
+        else:
+            end = bisect.bisect_left(self._keys, upper)
+
+        return start, max(start, end)
+
+
+class LocalStore(object):
+    """
+    Holds documents in memory with secondary indexes on chosen fields and answers queries from them locally
+
+    Indexes are updated incrementally as documents are put and deleted. Queries are run with evaluator.evaluate,
+    so results match the server's, but the candidate documents are narrowed down with the indexes first: equality,
+    in and array_contains filters use hash indexes and range filters sorted indexes, intersecting the candidates of
+    every indexed filter of the top level conjunction. A query ordered by a field with a sorted index and a limit
+    reads the index in order and stops once enough documents have matched.
+
+    Example:
+        store = LocalStore(documents=firestore.list(collectionId="Devices", pageSize=1000).json()["documents"])
+        store.create_index("Owner", kind="hash")
+        store.create_index("Battery", kind="sorted")
+
+        low = store.run(Query().fromCollection(("Devices", False)).where("Owner", "==", "string", "<UserID>")
+                        .where("Battery", "<", "int", 20))
+    """
+
+    def __init__(self, documents: Iterable[dict] = ()) -> None:
+        """
+        :param documents: Optional, documents as returned by the Firebase REST API to load
+        """
+
+        self._lock = threading.RLock()
+        self._documents: Dict[str, dict] = {}
+        self._indexes: Dict[str, Union[HashIndex, SortedIndex]] = {}
+        self._sorted: Dict[str, SortedIndex] = {}
+
+        self.load(documents)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._documents
+
+    def __iter__(self) -> Iterator[dict]:
+        with self._lock:
+            return iter(list(self._documents.values()))
+
+    def create_index(self, path: str, kind: str = "hash") -> None:
+        """
+        Indexes a field of every document, now and as documents change
+
+        :param path: Field path to index
+        :param kind: "hash" for equality, in and array_contains filters, or "sorted" for range filters and orders,
+                     which also serves equality filters. A field may have one index of each kind.
+        """
+
+        if kind not in ("hash", "sorted"):
+            raise ValueError(f"Kind must either be hash or sorted not {kind}")
+
+        index = HashIndex(path=path) if kind == "hash" else SortedIndex(path=path)
+
+        with self._lock:
+            for name, document in self._documents.items():
+                value = fieldPath.lookup(document.get("fields", {}), path)
+                if value is not None:
+                    index.add(name=name, value=value)
+
+            if kind == "hash":
+                self._indexes[path] = index
+            else:
+                self._sorted[path] = index
+
+    def drop_index(self, path: str, kind: str = "hash") -> None:
+        """
+        Removes the index of a field
+
+        :param path: Field path of the index
+        :param kind: The kind of the index
+        """
+
+        with self._lock:
+            (self._indexes if kind == "hash" else self._sorted).pop(path, None)
+
+    def load(self, documents: Iterable[dict]) -> None:
+        """
+        Puts many documents into the store
+
+        :param documents: Documents as returned by the Firebase REST API
+        """
+
+        for document in documents:
+            self.put(document)
+
+    def put(self, document: dict) -> None:
+        """
+        Inserts a document or replaces the stored version of it, updating the indexes
+
+        :param document: Document as returned by the Firebase REST API, with its full resource name
+        """
+
+        name = document["name"]
+
+        with self._lock:
+            if name in self._documents:
+                self._unindex(name)
+
+            self._documents[name] = document
+
+            fields = document.get("fields", {})
+            for index in self._all_indexes():
+                value = fieldPath.lookup(fields, index.path)
+                if value is not None:
+                    index.add(name=name, value=value)
+
+    def delete(self, name: str) -> None:
+        """
+        Removes a document from the store if it's held
+
+        :param name: Full resource name of the document
+        """
+
+        with self._lock:
+            if self._documents.pop(name, None) is not None:
+                self._unindex(name)
+
+    def get(self, name: str) -> Optional[dict]:
+        """
+        :param name: Full resource name of the document
+        :return: The stored document or None
+        """
+
+        return self._documents.get(name)
+
+    def run(self, query: Union[dict, Query], parent: str = None) -> List[dict]:
+        """
+        Runs a query against the stored documents, see evaluator.evaluate for the semantics
+
+        :param query: The query as a Query object or structured request parameters, see Firestore.runQuery
+        :param parent: The parent document of the queried collection, as passed to Firestore.runQuery
+        :return: List of the matching documents
+        """
+
+        structuredQuery = (query.to_json() if isinstance(query, Query) else query)["structuredQuery"]
+
+        with self._lock:
+            candidates = self._candidates(structuredQuery.get("where"))
+            streamed = self._stream(structuredQuery=structuredQuery, candidates=candidates, parent=parent)
+
+            if streamed is not None:
+                documents = streamed
+            elif candidates is not None:
+                documents = [self._documents[name] for name in candidates]
+            else:
+                documents = list(self._documents.values())
+
+        return evaluate(query=structuredQuery, documents=documents, parent=parent)
+
+    def _all_indexes(self) -> List[Union[HashIndex, SortedIndex]]:
+        return list(self._indexes.values()) + list(self._sorted.values())
+
+    def _unindex(self, name: str) -> None:
+        for index in self._all_indexes():
+            index.remove(name)
+
+    def _candidates(self, where: Optional[dict]) -> Optional[Set[str]]:
+        """
+        Narrows down the documents that can match a filter with the indexes of its top level conjunction
+
+        :param where: Filter of a structured query
+        :return: Names of the candidate documents, or None when no filter could use an index
+        """
+
+        if where is None:
+            return None
+
+        composite = where.get("compositeFilter")
+        leaves = composite["filters"] if composite is not None and composite["op"] == "AND" else [where]
+
+        sets = []
+        bounds: Dict[str, list] = {}
+
+        for leaf in leaves:
+            fieldFilter = leaf.get("fieldFilter")
+
+            if fieldFilter is not None and fieldFilter["op"] in _RANGE_OPERATORS \
+                    and fieldFilter["field"]["fieldPath"] in self._sorted:
+                _tighten(bounds.setdefault(fieldFilter["field"]["fieldPath"], [None, True, None, True]), fieldFilter)
+                continue
+
+            found = self._lookup(leaf)
+            if found is not None:
+                sets.append(found)
+
+        # Range filters on one field are combined into a single scan of its sorted index
+        for path, (lower, lowerInclusive, upper, upperInclusive) in bounds.items():
+            sets.append(set(self._sorted[path].range(lower=lower, lowerInclusive=lowerInclusive, upper=upper,
+                                                     upperInclusive=upperInclusive)))
+
+        if not sets:
+            return None
+
+        sets.sort(key=len)
+        candidates = set(sets[0])
+        for found in sets[1:]:
+            candidates &= found
+            if not candidates:
+                break
+
+        return candidates
+
+    def _lookup(self, leaf: dict) -> Optional[Set[str]]:
+        """
+        Finds the documents that can match a single filter using an index on its field
+
+        :return: Names of the documents or None if the filter can't use an index
+        """
+
+        if "unaryFilter" in leaf:
+            unary = leaf["unaryFilter"]
+            path = unary["field"]["fieldPath"]
+
+            if unary["op"] == "IS_NULL":
+                return self._equal(path=path, value={"nullValue": None})
+            if unary["op"] == "IS_NAN":
+                return self._equal(path=path, value={"doubleValue": "NaN"})
+            return None
+
+        fieldFilter = leaf.get("fieldFilter")
+        if fieldFilter is None:
+            return None
+
+        path, op, value = fieldFilter["field"]["fieldPath"], fieldFilter["op"], fieldFilter["value"]
+        hashed = self._indexes.get(path)
+        ordered = self._sorted.get(path)
+
+        if op == "EQUAL":
+            return self._equal(path=path, value=value)
+        if op == "IN":
+            values = value.get("arrayValue", {}).get("values", [])
+            if hashed is not None:
+                return hashed.any(values)
+            if ordered is not None:
+                return set().union(*(self._equal(path=path, value=element) for element in values))
+        if op == "ARRAY_CONTAINS" and hashed is not None:
+            return hashed.contains(value)
+        if op == "ARRAY_CONTAINS_ANY" and hashed is not None:
+            return hashed.contains_any(value.get("arrayValue", {}).get("values", []))
+
+        return None
+
+    def _equal(self, path: str, value: dict) -> Optional[Set[str]]:
+        if path in self._indexes:
+            return set(self._indexes[path].equal(value))
+        if path in self._sorted:
+            key = sort_key(value)
+            return set(self._sorted[path].range(lower=key, upper=key))
+        return None
+
+    def _stream(self, structuredQuery: dict, candidates: Optional[Set[str]], parent: Optional[str]) \
+            -> Optional[List[dict]]:
+        """
+        Reads a sorted index in the order of a query until its offset and limit are filled
+
+        Only used for queries with a limit and no cursors that are ordered by a single field with a sorted index,
+        then by __name__ in the same direction.
+
+        :return: The first matching documents in order, enough to answer the query, or None if it doesn't apply
+        """
+
+        limit = structuredQuery.get("limit")
+        if limit is None or "startAt" in structuredQuery or "endAt" in structuredQuery:
+            return None
+
+        orders = complete_order(structuredQuery)
+        if len(orders) != 2 or orders[0]["field"]["fieldPath"] not in self._sorted:
+            return None
+
+        directions = {order.get("direction", "ASCENDING") for order in orders}
+        if len(directions) != 1:
+            return None
+
+        needed = (structuredQuery.get("offset") or 0) + limit
+        test = matcher(query=structuredQuery, parent=parent)
+        index = self._sorted[orders[0]["field"]["fieldPath"]]
+        documents = []
+
+        for name in index.scan(descending=directions.pop() == "DESCENDING"):
+            if candidates is not None and name not in candidates:
+                continue
+
+            document = self._documents[name]
+            if test(document):
+                documents.append(document)
+                if len(documents) >= needed:
+                    break
+
+        return documents
+
+
+def _discard(mapping: Dict[tuple, Set[str]], key: tuple, name: str) -> None:
+    names = mapping.get(key)
+    if names is not None:
+        names.discard(name)
+        if not names:
+            del mapping[key]
+
+
+def _tighten(bounds: list, fieldFilter: dict) -> None:
+    """
+    Narrows the lower and upper sort key bounds of a field by a range filter on it
+
+    Range filters only match values of the compared type, so the bounds never leave the keys of that type.
+
+    :param bounds: List of the lower bound, if it's inclusive, the upper bound and if it's inclusive
+    :param fieldFilter: Range filter on the field
+    """
+
+    op, key, rank = fieldFilter["op"], sort_key(fieldFilter["value"]), type_rank(fieldFilter["value"])
+
+    if op in ("LESS_THAN", "LESS_THAN_OR_EQUAL"):
+        lower, lowerInclusive = (rank,), True
+        upper, upperInclusive = key, op == "LESS_THAN_OR_EQUAL"
+    else:
+        lower, lowerInclusive = key, op == "GREATER_THAN_OR_EQUAL"
+        upper, upperInclusive = (rank + 1,), False
+
+    if bounds[0] is None or lower > bounds[0] or (lower == bounds[0] and not lowerInclusive):
+        bounds[0], bounds[1] = lower, lowerInclusive
+    if bounds[2] is None or upper < bounds[2] or (upper == bounds[2] and not upperInclusive):
+        bounds[2], bounds[3] = upper, upperInclusive
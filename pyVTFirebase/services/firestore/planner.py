@@ -0,0 +1,350 @@
+
+import copy
+import heapq
+
+from concurrent.futures import ThreadPoolExecutor
+from pyVTFirebase import tracing
+from pyVTFirebase.services.firestore.types import fieldPath
+from pyVTFirebase.services.firestore.evaluator import matches
+from pyVTFirebase.services.firestore.types.ordering import complete_order, document_key
+from pyVTFirebase.services.firestore.types.query import Query
+from typing import TYPE_CHECKING, List, Optional, Union
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+MAX_DISJUNCTIONS = 30
+MAX_NOT_IN_VALUES = 10
+
+_DISJUNCTIVE_OPERATORS = ("IN", "ARRAY_CONTAINS_ANY")
+
+
+class _Plan(object):
+    """ The sub-queries a query is split into and the work left to do on their merged results """
+
+    __slots__ = ("queries", "orders", "residual", "offset", "limit", "added")
+
+    def __init__(self, queries: List[dict], orders: List[dict], residual: List[dict], offset: int,
+                 limit: Optional[int], added: List[str]) -> None:
+        self.queries = queries
+        self.orders = orders
+        self.residual = residual
+        self.offset = offset
+        self.limit = limit
+        self.added = added
+
+
+class QueryPlanner(object):
+    """
+    Runs queries whose disjunctions exceed Firestore's limits by splitting them into legal sub-queries
+
+    The filter of a query is expanded into a disjunction of conjunctions, with in and array_contains_any filters
+    split into chunks wherever the product of their values in a conjunction exceeds the limit. The conjunctions are
+    packed into as few sub-queries as the disjunction limit allows, which run concurrently. Every sub-query is
+    explicitly given the query's complete order, including the implicit orders on inequality fields and __name__, so
+    their results are combined with a k-way merge that restores the order, drops documents returned by more than
+    one sub-query and then applies the offset and limit.
+
+    A not_in filter with too many values is sent with its first values, the rest are filtered out locally. It's
+    only supported where it applies to the whole query, not inside an OR filter. Queries that are within the limits
+    are run unchanged.
+
+    Example:
+        planner = QueryPlanner(firestore)
+        query = Query().fromCollection(("Orders", False)) \
+            .where("Customer", "in", key="array", value={"key": "string", "value": customerIds}) \
+            .orderBy("Created", "DESCENDING").limit(100)
+
+        documents = planner.run(query)
+    """
+
+    def __init__(self, firestore: "Firestore", maxConcurrency: int = 8, maxDisjunctions: int = MAX_DISJUNCTIONS,
+                 maxNotInValues: int = MAX_NOT_IN_VALUES, maxQueries: int = 500) -> None:
+        """
+        :param firestore: Firestore service to run the sub-queries with
+        :param maxConcurrency: The maximum number of sub-queries in flight at once
+        :param maxDisjunctions: The maximum number of disjunctions the server allows in one query
+        :param maxNotInValues: The maximum number of values the server allows in a not_in filter
+        :param maxQueries: The maximum number of sub-queries a query may be split into
+        """
+
+        self.firestore = firestore
+        self.maxConcurrency = maxConcurrency
+        self.maxDisjunctions = maxDisjunctions
+        self.maxNotInValues = maxNotInValues
+        self.maxQueries = maxQueries
+
+    def plan(self, query: Union[dict, Query]) -> List[dict]:
+        """
+        Splits a query into the sub-queries that would be run, without running them
+
+        :param query: The query as a Query object or structured request parameters, see Firestore.runQuery
+        :return: List of the structured queries of the sub-queries
+        """
+
+        return self._plan(structuredQuery=_structured_query(query)).queries
+
+    def run(self, query: Union[dict, Query], parent: str = None, readTime: str = None) -> List[dict]:
+        """
+        Runs a query, splitting it into sub-queries if it exceeds the disjunction limits
+
+        :param query: The query as a Query object or structured request parameters, see Firestore.runQuery
+        :param parent: The parent resource of the collection to query
+        :param readTime: Optional, reads every sub-query at the given time so their results are consistent
+        :return: List of the matching documents in the order of the query
+        """
+
+        structuredQuery = _structured_query(query)
+        plan = self._plan(structuredQuery=structuredQuery)
+
+        def run(subQuery: dict) -> List[dict]:
+            json_kwargs = {"structuredQuery": subQuery}
+            if readTime is not None:
+                json_kwargs["readTime"] = readTime
+
+            results = self.firestore.runQuery(parent=parent, json_kwargs=json_kwargs).json()
+            return [result["document"] for result in results if "document" in result]
+
+        if plan.queries == [structuredQuery]:
+            return run(structuredQuery)
+
+        span = tracing.current()
+
+        def run_split(subQuery: dict) -> List[dict]:
+            with tracing.span("QueryPlanner.subquery", parent=span):
+                return run(subQuery)
+
+        with ThreadPoolExecutor(max_workers=min(self.maxConcurrency, len(plan.queries))) as executor:
+            pages = list(executor.map(run_split, plan.queries))
+
+        documents = []
+        seen = set()
+        skipped = 0
+
+        for document in heapq.merge(*pages, key=lambda _document: document_key(_document, plan.orders)):
+            if document["name"] in seen:
+                continue
+            seen.add(document["name"])
+
+            if not all(matches(where={"fieldFilter": residual}, document=document) for residual in plan.residual):
+                continue
+            if skipped < plan.offset:
+                skipped += 1
+                continue
+
+            for path in plan.added:
+                fieldPath.remove(document.get("fields", {}), path)
+
+            documents.append(document)
+            if plan.limit is not None and len(documents) >= plan.limit:
+                break
+
+        return documents
+
+    def _plan(self, structuredQuery: dict) -> _Plan:
+        where = structuredQuery.get("where")
+        residual = []
+
+        if where is not None:
+            where, residual = self._residual(where=where)
+            terms = self._dnf(where=where) if where is not None else [[]]
+        else:
+            terms = [[]]
+
+        fitted = [part for term in terms for part in self._fit(term)]
+        split = len(fitted) > len(terms)
+        terms = fitted
+
+        if len(terms) > self.maxQueries * self.maxDisjunctions:
+            raise ValueError("Filter expands into too many disjunctions to be split")
+
+        weights = [_weight(term) for term in terms]
+
+        if not split and not residual and sum(weights) <= self.maxDisjunctions:
+            return _Plan(queries=[structuredQuery], orders=[], residual=[], offset=0, limit=None, added=[])
+
+        # Pack the conjunctions into sub-queries that each stay within the disjunction limit
+        groups = []
+        for term, weight in zip(terms, weights):
+            if groups and groups[-1][1] + weight <= self.maxDisjunctions:
+                groups[-1][0].append(term)
+                groups[-1][1] += weight
+            else:
+                groups.append([[term], weight])
+
+        if len(groups) > self.maxQueries:
+            raise ValueError(f"Query would be split into {len(groups)} sub-queries, more than the maximum of "
+                             f"{self.maxQueries}")
+
+        orders = complete_order(structuredQuery)
+        offset = structuredQuery.get("offset", 0)
+        limit = structuredQuery.get("limit")
+
+        base = {key: value for key, value in structuredQuery.items() if key not in ("where", "offset", "limit")}
+        base["orderBy"] = orders
+
+        added = []
+        if "select" in structuredQuery:
+            selected = [fieldPath.split(field["fieldPath"]) for field in structuredQuery["select"].get("fields", [])]
+            needed = [order["field"]["fieldPath"] for order in orders] + \
+                     [residual_filter["field"]["fieldPath"] for residual_filter in residual]
+
+            for path in dict.fromkeys(needed):
+                segments = fieldPath.split(path)
+                if path != "__name__" and not any(segments[:len(field)] == field for field in selected):
+                    added.append(path)
+
+            if added:
+                base["select"] = {"fields": structuredQuery["select"].get("fields", []) +
+                                  [{"fieldPath": path} for path in added]}
+
+        queries = []
+        for group, _ in groups:
+            subQuery = dict(base)
+
+            conjunctions = [_conjunction(term) for term in group]
+            if len(conjunctions) > 1:
+                subQuery["where"] = {"compositeFilter": {"op": "OR", "filters": conjunctions}}
+            elif conjunctions[0] is not None:
+                subQuery["where"] = conjunctions[0]
+
+            # Every sub-query might supply all of the first offset + limit documents, unless some are filtered out
+            if limit is not None and not residual:
+                subQuery["limit"] = offset + limit
+
+            queries.append(subQuery)
+
+        return _Plan(queries=queries, orders=orders, residual=residual, offset=offset, limit=limit, added=added)
+
+    def _residual(self, where: dict):
+        """
+        Trims not_in filters of the whole query to the values the server allows
+
+        :return: Tuple of the filter to send and the not_in filters of the values left over, to apply locally
+        """
+
+        conjunction = where["compositeFilter"]["filters"] if where.get("compositeFilter", {}).get("op") == "AND" \
+            else [where]
+
+        kept = []
+        residual = []
+
+        for leaf in conjunction:
+            fieldFilter = leaf.get("fieldFilter")
+
+            if fieldFilter is not None and fieldFilter["op"] == "NOT_IN":
+                values = fieldFilter["value"]["arrayValue"].get("values", [])
+
+                if len(values) > self.maxNotInValues:
+                    trimmed = copy.deepcopy(leaf)
+                    trimmed["fieldFilter"]["value"] = {"arrayValue": {"values": values[:self.maxNotInValues]}}
+                    kept.append(trimmed)
+                    residual.append({"field": fieldFilter["field"], "op": "NOT_IN",
+                                     "value": {"arrayValue": {"values": values[self.maxNotInValues:]}}})
+                    continue
+
+            kept.append(leaf)
+
+        if not residual:
+            return where, []
+
+        if len(kept) == 1:
+            return kept[0], residual
+
+        return {"compositeFilter": {"op": "AND", "filters": kept}}, residual
+
+    def _dnf(self, where: dict) -> List[List[dict]]:
+        """
+        Expands a filter into a disjunction of conjunctions of single filters
+
+        :param where: Filter of a structured query
+        :return: List of conjunctions, each a list of filters
+        """
+
+        composite = where.get("compositeFilter")
+
+        if composite is not None:
+            children = [self._dnf(where=child) for child in composite.get("filters", [])]
+
+            if composite["op"] == "OR":
+                return [term for child in children for term in child]
+
+            terms = [[]]
+            for child in children:
+                terms = [term + other for term in terms for other in child]
+                if len(terms) > self.maxQueries * self.maxDisjunctions:
+                    raise ValueError("Filter expands into too many disjunctions to be split")
+            return terms
+
+        return [[where]]
+
+    def _fit(self, term: List[dict]) -> List[List[dict]]:
+        """
+        Splits a conjunction whose in and array_contains_any filters multiply to more disjunctions than the limit
+
+        The filter with the most values is split into chunks small enough for the product with the other filters to
+        stay within the limit, repeated on the other filters while that isn't possible with chunks of one value.
+
+        :param term: Conjunction of single filters
+        :return: List of conjunctions together selecting the same documents, each within the disjunction limit
+        """
+
+        weight = _weight(term)
+        if weight <= self.maxDisjunctions:
+            return [term]
+
+        sizes = [len(leaf["fieldFilter"]["value"]["arrayValue"].get("values", []))
+                 if leaf.get("fieldFilter", {}).get("op") in _DISJUNCTIVE_OPERATORS else 0 for leaf in term]
+        index = max(range(len(term)), key=lambda position: sizes[position])
+
+        if sizes[index] <= 1:
+            raise ValueError(f"Conjunction of {weight} disjunctions can't be split within the maximum of "
+                             f"{self.maxDisjunctions}")
+
+        fieldFilter = term[index]["fieldFilter"]
+        size = max(1, self.maxDisjunctions // (weight // sizes[index]))
+        parts = []
+
+        for chunk in _chunks(fieldFilter["value"]["arrayValue"]["values"], size):
+            leaf = {"fieldFilter": dict(fieldFilter, value={"arrayValue": {"values": chunk}})}
+            parts.extend(self._fit(term[:index] + [leaf] + term[index + 1:]))
+
+            if len(parts) > self.maxQueries * self.maxDisjunctions:
+                raise ValueError("Filter expands into too many disjunctions to be split")
+
+        return parts
+
+
+def _structured_query(query: Union[dict, Query]) -> dict:
+    return (query.to_json() if isinstance(query, Query) else query)["structuredQuery"]
+
+
+def _chunks(values: list, size: int) -> List[list]:
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def _weight(term: List[dict]) -> int:
+    """
+    Counts the disjunctions a conjunction adds to a query, each value of an in or array_contains_any filter is one
+
+    :param term: Conjunction of single filters
+    :return: The number of disjunctions
+    """
+
+    weight = 1
+
+    for leaf in term:
+        fieldFilter = leaf.get("fieldFilter")
+        if fieldFilter is not None and fieldFilter["op"] in _DISJUNCTIVE_OPERATORS:
+            weight *= max(1, len(fieldFilter["value"]["arrayValue"].get("values", [])))
+
+    return weight
+
+
+def _conjunction(term: List[dict]) -> Optional[dict]:
+    if not term:
+        return None
+    if len(term) == 1:
+        return term[0]
+    return {"compositeFilter": {"op": "AND", "filters": term}}
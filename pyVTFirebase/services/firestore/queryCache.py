@@ -0,0 +1,345 @@
+
+import json
+import threading
+import time
+
+import httpx
+
+from collections import OrderedDict
+from pyVTFirebase.services.firestore.types.preparedQuery import BoundQuery
+from pyVTFirebase.services.firestore.types.query import Query
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+# Collection ID standing for every collection, read by collection group queries without a collection ID
+_ANY = "*"
+
+
+class _Entry(object):
+    """ A cached query response and what is needed to evict it """
+
+    __slots__ = ("response", "expires", "size", "collectionIds")
+
+    def __init__(self, response: httpx.Response, expires: float, size: int, collectionIds: Tuple[str, ...]) -> None:
+        self.response = response
+        self.expires = expires
+        self.size = size
+        self.collectionIds = collectionIds
+
+
+class QueryCache(object):
+    """
+    Caches runQuery responses by parent and canonical request body, see Firestore.enable_query_cache
+
+    Entries are evicted least recently used first once the cache holds more than maxEntries responses or maxBytes
+    bytes, and expire ttl seconds after they were stored. Writes through the same Firestore service invalidate every
+    entry of a query reading from a collection with the written collection ID, in any parent. Writes by other clients
+    aren't seen, so the ttl bounds how stale a cached response can be.
+
+    Queries are only cached when asked to, either per call with Firestore.runQuery(cache=True) or for every run of a
+    query registered with QueryCache.register. Queries run in a transaction are never cached.
+
+    Example:
+        cache = firestore.enable_query_cache(maxEntries=512, ttl=10.0)
+        cache.register(Query().fromCollection(("Devices", False)).where("Online", "==", "bool", True))
+
+        firestore.runQuery(json_kwargs=Query().fromCollection(("Devices", False)).where("Online", "==", "bool", True))
+        cache.hit_ratio
+    """
+
+    def __init__(self, maxEntries: int = 1024, maxBytes: int = 32 * 1024 * 1024, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param maxEntries: The maximum number of responses held
+        :param maxBytes: The maximum total size of the held response bodies
+        :param ttl: Seconds a response is served for after it was stored, unless given per query or call
+        :param clock: Function returning the current time in seconds, monotonic by default
+        """
+
+        if maxEntries < 1:
+            raise ValueError(f"maxEntries must be at least 1 not {maxEntries}")
+        if maxBytes < 1:
+            raise ValueError(f"maxBytes must be at least 1 not {maxBytes}")
+
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.ttl = ttl
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, bytes], _Entry]" = OrderedDict()
+        self._by_collection: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._registered: Dict[bytes, Optional[float]] = {}
+        self._writes = 0
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """
+        :return: The total size of the held response bodies in bytes
+        """
+
+        return self._bytes
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        :return: The share of cached lookups that were served from the cache, 0.0 before the first lookup
+        """
+
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """
+        :return: Counters of the cache, its hit ratio and current size
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hit_ratio,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+
+    def register(self, query: Union[dict, Query, BoundQuery], ttl: float = None) -> None:
+        """
+        Caches the query every time it's run, without passing cache to Firestore.runQuery
+
+        :param query: The query as a Query object, bound prepared query or structured request parameters
+        :param ttl: Optional, seconds its responses are served for instead of the cache's ttl
+        """
+
+        with self._lock:
+            self._registered[canonical_body(query)] = ttl
+
+    def unregister(self, query: Union[dict, Query, BoundQuery]) -> None:
+        """
+        Stops caching a registered query, responses already held are served until they expire
+
+        :param query: The query as passed to QueryCache.register
+        """
+
+        with self._lock:
+            self._registered.pop(canonical_body(query), None)
+
+    def applies(self, cache: Union[None, bool, float]) -> bool:
+        """
+        Decides if a query might be cached before its canonical body is computed
+
+        :param cache: The cache argument of Firestore.runQuery, None to follow the registered queries
+        :return: False if no query is cached with this argument, such as while no queries are registered
+        """
+
+        if cache is None:
+            return bool(self._registered)
+
+        return cache is not False
+
+    def policy(self, body: bytes, cache: Union[None, bool, float]) -> Optional[float]:
+        """
+        Decides if a query is cached
+
+        :param body: Canonical request body of the query
+        :param cache: The cache argument of Firestore.runQuery, None to follow the registered queries
+        :return: Seconds the response is served for, or None if the query isn't cached
+        """
+
+        if cache is None:
+            if body not in self._registered:
+                return None
+            ttl = self._registered[body]
+            return self.ttl if ttl is None else ttl
+
+        if cache is False:
+            return None
+        if cache is True:
+            return self.ttl
+
+        return float(cache)
+
+    def generation(self, collectionIds: Iterable[str]) -> tuple:
+        """
+        Snapshots the number of invalidations of collections, taken before a query is sent so a response that
+        raced with a write isn't stored
+
+        :param collectionIds: The collection IDs a query reads from
+        :return: Opaque token to pass to QueryCache.put
+        """
+
+        with self._lock:
+            return self._token(tuple(collectionIds))
+
+    def get(self, parent: Optional[str], body: bytes) -> Optional[httpx.Response]:
+        """
+        :param parent: The parent resource the query is run against
+        :param body: Canonical request body of the query
+        :return: The cached response, shared between hits, or None if there is no live entry
+        """
+
+        key = (parent or "", body)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.expires <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.response
+
+    def put(self, parent: Optional[str], body: bytes, collectionIds: Iterable[str], response: httpx.Response,
+            ttl: float, generation: tuple) -> None:
+        """
+        Stores a query response, evicting the least recently used entries to stay within the bounds
+
+        :param parent: The parent resource the query was run against
+        :param body: Canonical request body of the query
+        :param collectionIds: The collection IDs the query reads from, _ANY for all
+        :param response: The response of the query
+        :param ttl: Seconds the response is served for
+        :param generation: Token returned by QueryCache.generation before the query was sent
+        """
+
+        key = (parent or "", body)
+        collectionIds = tuple(collectionIds)
+        size = len(response.content) + len(body)
+
+        if size > self.maxBytes or ttl <= 0:
+            return
+
+        with self._lock:
+            if self._token(collectionIds) != generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = _Entry(response=response, expires=self._clock() + ttl, size=size,
+                                        collectionIds=collectionIds)
+            self._bytes += size
+            for collectionId in collectionIds:
+                self._by_collection.setdefault(collectionId, set()).add(key)
+
+            while len(self._entries) > self.maxEntries or self._bytes > self.maxBytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, collectionIds: Iterable[str] = None) -> None:
+        """
+        Drops the entries of queries reading from collections
+
+        :param collectionIds: The written collection IDs, or None to drop every entry
+        """
+
+        with self._lock:
+            self._writes += 1
+
+            if collectionIds is None:
+                self.invalidations += len(self._entries)
+                self._generations[_ANY] = self._generations.get(_ANY, 0) + 1
+                self._entries.clear()
+                self._by_collection.clear()
+                self._bytes = 0
+                return
+
+            for collectionId in set(collectionIds):
+                self._generations[collectionId] = self._generations.get(collectionId, 0) + 1
+
+                for key in list(self._by_collection.get(collectionId, ())) + list(self._by_collection.get(_ANY, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def _token(self, collectionIds: Tuple[str, ...]) -> tuple:
+        # Queries of every collection are outdated by any write, the others only by writes to their collections
+        if _ANY in collectionIds:
+            return self._writes,
+        return tuple(self._generations.get(collectionId, 0) for collectionId in (_ANY, *collectionIds))
+
+    def _remove(self, key: Tuple[str, bytes]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+        for collectionId in entry.collectionIds:
+            keys = self._by_collection.get(collectionId)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_collection[collectionId]
+
+
+def canonical_body(query: Union[dict, Query, BoundQuery]) -> bytes:
+    """
+    Serializes a query the way Query.body does, so equal queries built as dicts or Query objects share a key
+
+    :param query: The query as a Query object, bound prepared query or structured request parameters
+    :return: UTF-8 encoded JSON request body with sorted keys
+    """
+
+    if isinstance(query, (Query, BoundQuery)):
+        return query.body()
+
+    return json.dumps(query, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def read_collections(query: Union[dict, Query, BoundQuery]) -> List[str]:
+    """
+    :param query: The query as a Query object, bound prepared query or structured request parameters
+    :return: The collection IDs the query reads from, _ANY if it reads every collection
+    """
+
+    structuredQuery = (query.to_json() if isinstance(query, (Query, BoundQuery)) else query).get("structuredQuery", {})
+    selectors = structuredQuery.get("from", [])
+
+    if not selectors or any(selector.get("collectionId") is None for selector in selectors):
+        return [_ANY]
+
+    return sorted({selector["collectionId"] for selector in selectors})
+
+
+def written_collections(writes: Iterable[dict]) -> List[str]:
+    """
+    :param writes: Write messages of a commit or batchWrite request
+    :return: The collection IDs of the written documents
+    """
+
+    collectionIds = set()
+
+    for write in writes:
+        name = write.get("delete") or write.get("update", {}).get("name") or write.get("transform", {}).get("document")
+        if name:
+            collectionIds.add(collection_of(name))
+
+    return sorted(collectionIds)
+
+
+def collection_of(path: str) -> str:
+    """
+    :param path: Document path or full resource name
+    :return: The ID of the collection holding the document
+    """
+
+    segments = path.strip("/").split("/")
+    return segments[-2] if len(segments) >= 2 else segments[-1]
@@ -0,0 +1,129 @@
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from pyVTFirebase.exceptions import BulkWriteError
+from pyVTFirebase.services.firestore.bulkWriter import BulkWriter
+from typing import TYPE_CHECKING, Callable, Iterator, List
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+def recursive_delete(firestore: "Firestore", path: str, maxConcurrency: int = 4, pageSize: int = 300,
+                     progress: Callable[[int], None] = None) -> int:
+    """
+    Deletes a document or collection along with every document in its subcollections, see Firestore.recursive_delete
+
+    :param firestore: Firestore service to delete the documents with
+    :param path: Document or collection path
+    :param maxConcurrency: The maximum number of requests in flight at once, for both discovery and deletes
+    :param pageSize: The number of documents to list per request
+    :param progress: Optional, called with the total number of documents deleted so far after each delete
+    :return: The number of documents deleted
+    """
+
+    lock = threading.Lock()
+    deleted = [0]
+    errors: List[BulkWriteError] = []
+
+    def on_success(write: dict, result: dict) -> None:
+        with lock:
+            deleted[0] += 1
+            count = deleted[0]
+        if progress is not None:
+            progress(count)
+
+    def on_error(error: BulkWriteError) -> None:
+        with lock:
+            errors.append(error)
+
+    path = path.strip("/")
+    segments = path.split("/")
+
+    with BulkWriter(firestore=firestore, maxConcurrency=maxConcurrency, on_success=on_success,
+                    on_error=on_error) as writer, ThreadPoolExecutor(max_workers=maxConcurrency) as executor:
+
+        # Collections still to be emptied, by path
+        collections = []
+
+        if len(segments) % 2 == 0:
+            collections.extend(f"{path}/{collectionId}" for collectionId in _collection_ids(firestore, path))
+            writer.delete(path)
+        else:
+            collections.append(path)
+
+        while collections:
+            collection = collections.pop()
+
+            for page in _document_pages(firestore=firestore, collection=collection, pageSize=pageSize):
+                documents = [_document_path(firestore, name) for name in page]
+
+                # Subcollections of the documents of a page are discovered concurrently
+                for document, collectionIds in zip(documents, executor.map(
+                        lambda _document: list(_collection_ids(firestore, _document)), documents)):
+                    collections.extend(f"{document}/{collectionId}" for collectionId in collectionIds)
+                    writer.delete(document)
+
+    if errors:
+        raise errors[0]
+
+    return deleted[0]
+
+
+def _document_pages(firestore: "Firestore", collection: str, pageSize: int) -> Iterator[List[str]]:
+    """
+    Yields the names of the documents of a collection page by page, including missing documents with subcollections
+
+    :param firestore: Firestore service to list the documents with
+    :param collection: Collection path
+    :param pageSize: The number of documents to list per request
+    :return: Iterator of lists of full document resource names
+    """
+
+    parent, _, collectionId = collection.rpartition("/")
+    pageToken = None
+
+    while True:
+        response = firestore.list(collectionId=collectionId, parent=parent or None, pageSize=pageSize,
+                                  pageToken=pageToken, mask=["__name__"], showMissing=True).json()
+
+        page = [document["name"] for document in response.get("documents", [])]
+        if page:
+            yield page
+
+        pageToken = response.get("nextPageToken")
+        if not pageToken:
+            return
+
+
+def _collection_ids(firestore: "Firestore", document: str) -> Iterator[str]:
+    """
+    Yields the IDs of the collections directly under a document
+
+    :param firestore: Firestore service to list the collections with
+    :param document: Document path
+    :return: Iterator of collection IDs
+    """
+
+    pageToken = None
+
+    while True:
+        response = firestore.listCollectionIds(parent=document, pageToken=pageToken).json()
+        yield from response.get("collectionIds", [])
+
+        pageToken = response.get("nextPageToken")
+        if not pageToken:
+            return
+
+
+def _document_path(firestore: "Firestore", name: str) -> str:
+    """
+    Converts a full document resource name into a document path
+
+    :param firestore: Firestore service the document belongs to
+    :param name: Full resource name, Example: "projects/<ProjectID>/databases/(default)/documents/Accounts/Company"
+    :return: Document path, Example: "Accounts/Company"
+    """
+
+    return name[len(f"{firestore.database}/documents/"):]
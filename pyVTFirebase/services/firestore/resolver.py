@@ -0,0 +1,166 @@
+
+from concurrent.futures import ThreadPoolExecutor
+from pyVTFirebase import tracing
+from pyVTFirebase.services.firestore.loader import MAX_BATCH_GET
+from pyVTFirebase.services.firestore.types import fieldPath
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+class ReferenceResolver(object):
+    """
+    Loads the documents referenced by referenceValue fields of query results with a few batchGet requests
+
+    The distinct references of the chosen fields of a page of documents, including references inside array values,
+    are fetched in chunks of chunkSize with concurrent batchGet requests, instead of one get per reference. Each
+    document is given a "references" key mapping the full resource names it references to the referenced
+    documents, or to None for references to missing documents.
+
+    With a depth above 1 the same fields are followed in the referenced documents too, one round of batchGet
+    requests per level. A document referenced more than once, or again at a deeper level, is only fetched once, so
+    references between documents may form cycles.
+
+    Example:
+        resolver = firestore.resolver(fields=["Owner", "Devices"])
+        orders = resolver.resolve(result["document"] for result in firestore.runQuery(json_kwargs=query).json()
+                                  if "document" in result)
+
+        owner = orders[0]["references"][orders[0]["fields"]["Owner"]["referenceValue"]]
+    """
+
+    def __init__(self, firestore: "Firestore", fields: Iterable[str], depth: int = 1, chunkSize: int = MAX_BATCH_GET,
+                 maxConcurrency: int = 4, mask: list = None, readTime: str = None) -> None:
+        """
+        :param firestore: Firestore service used to send the batchGet requests
+        :param fields: Field paths of the reference or array of reference fields to resolve
+        :param depth: The number of levels of references to follow
+        :param chunkSize: The maximum number of documents requested per batchGet request
+        :param maxConcurrency: The maximum number of batchGet requests in flight at once
+        :param mask: Optional, list of document fields to request from the referenced documents. Must include the
+                     resolved fields for references to be followed beyond the first level.
+        :param readTime: Optional, reads the referenced documents as they were at the given time
+        """
+
+        for name, value in (("Depth", depth), ("ChunkSize", chunkSize), ("MaxConcurrency", maxConcurrency)):
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise TypeError(f"{name} is required to be of type int not {type(value)}")
+            if value <= 0:
+                raise ValueError(f"{name} must be greater than 0")
+
+        self.firestore = firestore
+        self.fields = [fieldPath.split(path) for path in fields]
+        self.depth = depth
+        self.chunkSize = chunkSize
+        self.maxConcurrency = maxConcurrency
+        self.mask = mask
+        self.readTime = readTime
+
+    def resolve(self, documents: Iterable[dict]) -> List[dict]:
+        """
+        Fetches the documents referenced by a page of documents and attaches them in place
+
+        :param documents: Documents as returned by the Firebase REST API
+        :return: List of the documents, each with a "references" key if it references any documents
+        """
+
+        documents = list(documents)
+        resolved: Dict[str, Optional[dict]] = {}
+        level = documents
+
+        for _ in range(self.depth):
+            names = {name for document in level for name in self.references(document)} - resolved.keys()
+            if not names:
+                break
+
+            fetched = self._fetch(sorted(names))
+            resolved.update(fetched)
+            level = [document for document in fetched.values() if document is not None]
+
+        for document in documents + [document for document in resolved.values() if document is not None]:
+            references = {name: resolved[name] for name in self.references(document) if name in resolved}
+            if references:
+                document["references"] = references
+
+        return documents
+
+    def resolve_pages(self, documents: Iterable[dict], pageSize: int = 300) -> Iterator[dict]:
+        """
+        Resolves a stream of documents a page at a time, so the references of each page are fetched together
+
+        :param documents: Documents as returned by the Firebase REST API, such as an export or paged query
+        :param pageSize: The number of documents to resolve together
+        :return: Iterator of the documents with their references attached, in order
+        """
+
+        page = []
+
+        for document in documents:
+            page.append(document)
+            if len(page) >= pageSize:
+                yield from self.resolve(page)
+                page = []
+
+        if page:
+            yield from self.resolve(page)
+
+    def references(self, document: dict) -> List[str]:
+        """
+        :param document: Document as returned by the Firebase REST API
+        :return: The full resource names referenced by the resolved fields of the document
+        """
+
+        names = []
+        fields = document.get("fields", {})
+
+        for segments in self.fields:
+            value = fieldPath.lookup(fields, segments)
+
+            if value is None:
+                continue
+            if "referenceValue" in value:
+                names.append(value["referenceValue"])
+            elif "arrayValue" in value:
+                names.extend(element["referenceValue"] for element in value["arrayValue"].get("values", [])
+                             if "referenceValue" in element)
+
+        return names
+
+    def _fetch(self, names: List[str]) -> Dict[str, Optional[dict]]:
+        """
+        Gets documents with chunked, concurrent batchGet requests
+
+        :param names: Full resource names of the documents
+        :return: The documents by name, None for missing documents
+        """
+
+        parent = tracing.current()
+
+        def fetch(chunk: List[str]) -> list:
+            json_kwargs = {"documents": chunk}
+
+            if self.mask is not None:
+                json_kwargs["mask"] = {"fieldPaths": self.mask}
+            if self.readTime is not None:
+                json_kwargs["readTime"] = self.readTime
+
+            with tracing.span("ReferenceResolver.chunk", parent=parent,
+                              **{"firestore.documents.requested": len(chunk)}):
+                return self.firestore.batch_get(json_kwargs=json_kwargs).json()
+
+        chunks = [names[start:start + self.chunkSize] for start in range(0, len(names), self.chunkSize)]
+
+        if len(chunks) == 1:
+            pages = [fetch(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.maxConcurrency, len(chunks))) as executor:
+                pages = list(executor.map(fetch, chunks))
+
+        documents = dict.fromkeys(names)
+        for results in pages:
+            for result in results:
+                if "found" in result:
+                    documents[result["found"]["name"]] = result["found"]
+
+        return documents
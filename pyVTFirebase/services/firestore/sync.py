@@ -0,0 +1,213 @@
+
+import os
+import json
+import time
+import threading
+
+from pyVTFirebase import tracing
+from pyVTFirebase.services.firestore.firestore import Firestore
+from pyVTFirebase.services.firestore.types.query import Query
+from typing import Callable, Iterator, Optional
+
+
+class WatermarkStore(object):
+    """ Keeps the high-water mark of each synced collection in memory """
+
+    def __init__(self) -> None:
+        self._watermarks = {}
+
+    def load(self, key: str) -> Optional[dict]:
+        """
+        Gets the stored watermark of a collection
+
+        :param key: Key the collection's watermark is stored under
+        :return: The stored watermark or None if the collection hasn't been synced yet
+        """
+
+        return self._watermarks.get(key)
+
+    def save(self, key: str, watermark: dict) -> None:
+        """
+        Stores the watermark of a collection
+
+        :param key: Key the collection's watermark is stored under
+        :param watermark: Watermark to store
+        """
+
+        self._watermarks[key] = watermark
+
+
+class FileWatermarkStore(WatermarkStore):
+    """ Keeps the high-water mark of each synced collection in a JSON file so syncing resumes after a restart """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self._watermarks = json.load(file)
+
+    def save(self, key: str, watermark: dict) -> None:
+        with self._lock:
+            super().save(key=key, watermark=watermark)
+
+            # Write to a temporary file first so a crash can't leave a truncated watermark file behind
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as file:
+                json.dump(self._watermarks, file)
+            os.replace(temporary, self.path)
+
+
+class CollectionSync(object):
+    """
+    Incrementally syncs the documents of a collection that have been created or changed since the last sync
+
+    Documents are read in order of a modification-time field which the writers of the collection must keep up to
+    date, ideally with a REQUEST_TIME server value transform. The last seen position is stored as a watermark so each
+    sync only reads documents written after it, making the cost of a sync proportional to the number of changes
+    rather than the size of the collection.
+
+    Documents are delivered at least once: a document may be delivered again if the process stops before the
+    watermark of its page is saved. Deleted documents can't be detected by a query and aren't reported.
+    """
+
+    def __init__(self, firestore: Firestore, collectionId: str, parent: str = None, field: str = "updatedAt",
+                 pageSize: int = 300, store: WatermarkStore = None, key: str = None) -> None:
+        """
+        :param firestore: Firestore service used to run the sync queries
+        :param collectionId: The name of the collection relative to parent to sync
+        :param parent: The parent resource of the collection to sync
+        :param field: Timestamp document field set to the time of each document's last modification
+        :param pageSize: The maximum number of documents to request per query
+        :param store: Store used to persist the watermark. Defaults to an in memory store.
+        :param key: Key the watermark is stored under. Defaults to the collection path.
+        """
+
+        if isinstance(pageSize, bool) or not isinstance(pageSize, int):
+            raise TypeError(f"PageSize is required to be of type int not {type(pageSize)}")
+        if pageSize <= 0:
+            raise ValueError("PageSize must be greater than 0")
+
+        self.firestore = firestore
+        self.collectionId = collectionId
+        self.parent = parent
+        self.field = field
+        self.pageSize = pageSize
+        self.store = store if store is not None else WatermarkStore()
+        self.key = key if key is not None else "/".join(_sub for _sub in (parent, collectionId) if _sub)
+
+    @property
+    def watermark(self) -> Optional[dict]:
+        """
+        The current watermark of the collection
+
+        Example:
+            {"value": "2021-07-02T15:01:23.052142Z", "names": ["projects/.../documents/Orders/<DocumentID>"]}
+        """
+
+        return self.store.load(self.key)
+
+    def _query(self, watermark: Optional[dict]) -> Query:
+        query = Query().fromCollection((self.collectionId, False)).orderBy(self.field)
+
+        if watermark is None:
+            return query.limit(self.pageSize)
+
+        # Documents sharing the watermark's timestamp, such as those written by one commit, may not all have fit
+        # in the previous page. Start at the timestamp and skip the ones already delivered, requesting enough extra
+        # documents that the page can never be filled by already delivered documents alone.
+        return query.startAt(key="time", value=watermark["value"], before=True) \
+            .limit(self.pageSize + len(watermark["names"]))
+
+    def changes(self) -> Iterator[dict]:
+        """
+        Yields the documents created or changed since the last sync, in order of modification time
+
+        The watermark is saved once all documents of a page have been consumed.
+
+        :return: Iterator of documents as returned by the Firebase REST API
+        """
+
+        watermark = self.store.load(self.key)
+
+        while True:
+            query = self._query(watermark=watermark)
+            with tracing.span("CollectionSync.page") as span:
+                results = self.firestore.runQuery(parent=self.parent, json_kwargs=query).json()
+                documents = [result["document"] for result in results if "document" in result]
+
+                if span is not None:
+                    span.set_attribute("firestore.documents", len(documents))
+
+            delivered = 0
+            for document in documents:
+                value = _timestamp_field(document=document, field=self.field)
+
+                if watermark is not None and value == watermark["value"]:
+                    if document["name"] in watermark["names"]:
+                        continue
+                    watermark = {"value": value, "names": watermark["names"] + [document["name"]]}
+                else:
+                    watermark = {"value": value, "names": [document["name"]]}
+
+                delivered += 1
+                yield document
+
+            if delivered:
+                self.store.save(key=self.key, watermark=watermark)
+
+            if len(documents) < query.to_json()["structuredQuery"]["limit"]:
+                return
+
+    def sync(self, callback: Callable[[dict], None]) -> int:
+        """
+        Passes each document created or changed since the last sync to a callback
+
+        :param callback: Function called with each changed document
+        :return: The number of documents delivered
+        """
+
+        count = 0
+        for document in self.changes():
+            callback(document)
+            count += 1
+
+        return count
+
+    def run(self, callback: Callable[[dict], None], interval: float = 60.0, stop: threading.Event = None) -> None:
+        """
+        Repeatedly syncs the collection until stopped
+
+        :param callback: Function called with each changed document
+        :param interval: Seconds to wait between syncs
+        :param stop: Event that ends the loop once set. Without one the loop runs forever.
+        """
+
+        stop = stop if stop is not None else threading.Event()
+
+        while not stop.is_set():
+            started = time.monotonic()
+            self.sync(callback=callback)
+            stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+def _timestamp_field(document: dict, field: str) -> str:
+    """
+    Gets the timestamp value of a, possibly nested, document field
+
+    :param document: Document as returned by the Firebase REST API
+    :param field: Dotted path of the field
+    :return: The timestampValue of the field
+    """
+
+    value = {"mapValue": {"fields": document.get("fields", {})}}
+
+    for segment in field.split("."):
+        value = value["mapValue"]["fields"][segment]
+
+    if "timestampValue" not in value:
+        raise ValueError(f"Field {field} of document {document['name']} isn't a timestamp: {value!r}")
+
+    return value["timestampValue"]
@@ -0,0 +1,189 @@
+
+import time
+import random
+
+import httpx
+
+from pyVTFirebase import instrumentation
+from pyVTFirebase.exceptions import STATUS_CODES, error_status
+from pyVTFirebase.services.firestore.batch import WriteBuilder, MAX_BATCH_WRITES
+from pyVTFirebase.services.firestore.types.query import Query
+from pyVTFirebase.services.firestore.types.preparedQuery import BoundQuery
+from pyVTFirebase.services.firestore.types.write import Write
+from typing import TYPE_CHECKING, Any, Callable, Union
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+class Transaction(WriteBuilder):
+    """
+    Reads documents consistently and queues writes that are committed atomically at the end of the transaction
+
+    Reads go straight to the server as part of the transaction, queued writes are only sent when the transaction
+    commits. All reads must therefore happen before the writes they depend on are queued.
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/projects.databases.documents/beginTransaction
+    """
+
+    def __init__(self, firestore: "Firestore", read_only: bool = False, readTime: str = None) -> None:
+        if readTime is not None and not read_only:
+            raise ValueError("ReadTime can only be given for read-only transactions")
+
+        self.firestore = firestore
+        self.read_only = read_only
+        self.readTime = readTime
+        self.id = None
+        self._writes = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def add(self, write: Write) -> "Transaction":
+        """
+        Queues a write to be committed with the transaction
+
+        :param write: Write to queue
+        :return: The same instance of the Transaction class, allowing calls to be chained
+        """
+
+        if self.read_only:
+            raise ValueError("Writes can't be queued in a read-only transaction")
+        if not isinstance(write, Write):
+            raise TypeError(f"Write is required to be of type Write not {type(write)}")
+        if len(self._writes) >= MAX_BATCH_WRITES:
+            raise ValueError(f"A transaction can contain at most {MAX_BATCH_WRITES} writes")
+
+        self._writes.append(write)
+        return self
+
+    def get(self, path: str, mask: list = None) -> httpx.Response:
+        """
+        Gets a document as part of the transaction, see Firestore.get for details
+
+        :param path: Document path
+        :param mask: List of document fields to request from document
+        :return: Request response form the Firebase REST API
+        """
+
+        return self.firestore.get(path=path, mask=mask, transaction=self.id)
+
+    def batch_get(self, paths: list, mask: list = None) -> httpx.Response:
+        """
+        Gets a group of documents as part of the transaction, see Firestore.batch_get for details
+
+        :param paths: List of document paths
+        :param mask: List of document fields to request from the documents
+        :return: Request response form the Firebase REST API
+        """
+
+        json_kwargs = {
+            "documents": [self.firestore.document_name(path) for path in paths],
+            "transaction": self.id
+        }
+
+        if mask is not None:
+            json_kwargs["mask"] = {"fieldPaths": mask}
+
+        return self.firestore.batch_get(json_kwargs=json_kwargs)
+
+    def list(self, collectionId: str, parent: str = None, **kwargs) -> httpx.Response:
+        """
+        Gets a list of documents from a collection as part of the transaction, see Firestore.list for details
+
+        :param collectionId: The name of the collection relative to parent to get documents from
+        :param parent: The parent resource of the collection to get documents from
+        :keyword kwargs: Further parameters of Firestore.list, except transaction and readTime
+        :return: Request response form the Firebase REST API
+        """
+
+        return self.firestore.list(collectionId=collectionId, parent=parent, transaction=self.id, **kwargs)
+
+    def runQuery(self, parent: str = None, json_kwargs: Union[dict, Query, BoundQuery] = None) -> httpx.Response:
+        """
+        Runs a query as part of the transaction, see Firestore.runQuery for details
+
+        :param parent: The parent resource of the collection to run a structured query against
+        :param json_kwargs: Structured request parameters for the request body or custom Query object
+        :return: Request response form the Firebase REST API
+        """
+
+        json_data = json_kwargs.to_json() if isinstance(json_kwargs, (Query, BoundQuery)) else json_kwargs
+        json_data = dict(json_data, transaction=self.id)
+
+        return self.firestore.runQuery(parent=parent, json_kwargs=json_data)
+
+    def _begin(self, retryTransaction: str = None) -> None:
+        if self.read_only:
+            options = {"readOnly": {"readTime": self.readTime} if self.readTime is not None else {}}
+        else:
+            options = {"readWrite": {"retryTransaction": retryTransaction} if retryTransaction is not None else {}}
+
+        self.id = self.firestore.beginTransaction(json_kwargs={"options": options}).json()["transaction"]
+
+    def _commit(self) -> httpx.Response:
+        return self.firestore.commit(json_kwargs={
+            "writes": [write.data() for write in self._writes],
+            "transaction": self.id
+        })
+
+    def _rollback(self) -> None:
+        try:
+            self.firestore.rollback(transaction=self.id)
+        except httpx.HTTPError:
+            # The transaction may already have expired or been aborted by the server
+            pass
+
+
+def run_transaction(firestore: "Firestore", fn: Callable[[Transaction], Any], max_attempts: int = 5,
+                    read_only: bool = False, readTime: str = None, initialBackoff: float = 1.0,
+                    maxBackoff: float = 60.0) -> Any:
+    """
+    Runs a function in a transaction, retrying it when the transaction is aborted by contention
+
+    See Firestore.transaction for details. Retries pass the aborted transaction as retryTransaction so the new
+    attempt keeps the priority of the old one for the locks it takes.
+
+    :param firestore: Firestore service to run the transaction with
+    :param fn: Function run in the transaction. Must be safe to run more than once.
+    :param max_attempts: The maximum number of times the function is run
+    :param read_only: If the transaction only reads documents
+    :param readTime: Optional, reads documents as they were at the given time. Only valid for read-only transactions.
+    :param initialBackoff: Seconds to wait before the first retry. Doubles with every further retry.
+    :param maxBackoff: The maximum number of seconds to wait before a retry
+    :return: The value returned by the function
+    """
+
+    if isinstance(max_attempts, bool) or not isinstance(max_attempts, int):
+        raise TypeError(f"Max_attempts is required to be of type int not {type(max_attempts)}")
+    if max_attempts <= 0:
+        raise ValueError("Max_attempts must be greater than 0")
+
+    previous = None
+
+    for attempt in range(1, max_attempts + 1):
+        with instrumentation.attempt(attempt):
+            transaction = Transaction(firestore=firestore, read_only=read_only, readTime=readTime)
+            transaction._begin(retryTransaction=previous)
+
+            try:
+                result = fn(transaction)
+
+                if read_only:
+                    transaction._rollback()
+                else:
+                    transaction._commit()
+
+                return result
+            except httpx.HTTPStatusError as exc:
+                transaction._rollback()
+
+                if attempt == max_attempts or error_status(exc.response)[0] != STATUS_CODES["ABORTED"]:
+                    raise
+
+                previous = transaction.id
+                time.sleep(min(maxBackoff, initialBackoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+            except BaseException:
+                transaction._rollback()
+                raise
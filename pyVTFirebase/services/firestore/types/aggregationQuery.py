@@ -0,0 +1,195 @@
+
+import httpx
+
+from .query import Query
+from .structuredQuery import FieldReference
+from .value import decode
+
+from typing import Any, Union
+
+
+_MAX_AGGREGATIONS = 5
+
+
+class Aggregation:
+    """
+    Defines a single aggregation to compute over the results of a query
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredAggregationQuery#Aggregation
+    """
+
+    def __init__(self, alias: str, operator: str, field: FieldReference = None, upTo: int = None):
+        self._alias = alias
+        self._operator = operator
+        self._field = field
+        self._upTo = upTo
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.data()!r})"
+
+    @property
+    def alias(self):
+        return self._alias
+
+    def data(self):
+        if self._operator == "count":
+            operation = {} if self._upTo is None else {"upTo": str(self._upTo)}
+        else:
+            operation = {"field": self._field.data()}
+
+        return {"alias": self._alias, self._operator: operation}
+
+
+class AggregationQuery(object):
+    """
+    Wraps a Query with aggregations that are computed by the server and returned in a single result
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredAggregationQuery
+    """
+
+    def __init__(self, query: Query, aggregations: tuple = ()) -> None:
+        if not isinstance(query, Query):
+            raise TypeError(f"Query is required to be of type Query not {type(query)}")
+
+        self._query = query
+        self._aggregations = aggregations
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return (
+            self._query == other._query
+            and [aggregation.data() for aggregation in self._aggregations]
+            == [aggregation.data() for aggregation in other._aggregations]
+        )
+
+    def _add(self, aggregation: Aggregation) -> "AggregationQuery":
+        if len(self._aggregations) >= _MAX_AGGREGATIONS:
+            raise ValueError(f"An aggregation query can contain at most {_MAX_AGGREGATIONS} aggregations")
+
+        for existing in self._aggregations:
+            if existing.alias == aggregation.alias:
+                raise ValueError(f"Aggregation alias {aggregation.alias!r} is already in use")
+
+        return self.__class__(query=self._query, aggregations=self._aggregations + (aggregation,))
+
+    def count(self, alias: str = "count", upTo: int = None) -> "AggregationQuery":
+        """
+        Counts the number of documents matching the query
+
+        :param alias: The name the result is returned under
+        :param upTo: Optional, the maximum number of documents to count. Stops the server from scanning further
+                     than needed when only a threshold matters.
+        :return: New instance of the AggregationQuery class
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredAggregationQuery#Count
+        """
+
+        # Type verification
+        if not isinstance(alias, str):
+            raise TypeError(f"Alias is required to be of type str not {type(alias)}")
+        if upTo is not None:
+            if isinstance(upTo, bool) or not isinstance(upTo, int):
+                raise TypeError(f"UpTo is required to be of type int not {type(upTo)}")
+            if upTo <= 0:
+                raise ValueError("UpTo must be greater than 0 if specified")
+
+        return self._add(Aggregation(alias=alias, operator="count", upTo=upTo))
+
+    def sum(self, field: str, alias: str = None) -> "AggregationQuery":
+        """
+        Sums the numeric values of a document field across the documents matching the query
+
+        :param field: The document field to sum
+        :param alias: The name the result is returned under. Defaults to "sum_<field>".
+        :return: New instance of the AggregationQuery class
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredAggregationQuery#Sum
+        """
+
+        return self._field_aggregation(operator="sum", field=field, alias=alias)
+
+    def avg(self, field: str, alias: str = None) -> "AggregationQuery":
+        """
+        Averages the numeric values of a document field across the documents matching the query
+
+        :param field: The document field to average
+        :param alias: The name the result is returned under. Defaults to "avg_<field>".
+        :return: New instance of the AggregationQuery class
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredAggregationQuery#Avg
+        """
+
+        return self._field_aggregation(operator="avg", field=field, alias=alias)
+
+    def _field_aggregation(self, operator: str, field: str, alias: str = None) -> "AggregationQuery":
+
+        # Type verification
+        if not isinstance(field, str):
+            raise TypeError(f"Field is required to be of type str not {type(field)}")
+        if alias is None:
+            alias = f"{operator}_{field}".replace(".", "_")
+        if not isinstance(alias, str):
+            raise TypeError(f"Alias is required to be of type str not {type(alias)}")
+
+        return self._add(Aggregation(alias=alias, operator=operator, field=FieldReference(field_path=field)))
+
+    def to_json(self):
+        """
+        Converts the AggregationQuery class parameters to serializable JSON for passing into httpx request to
+        the Firebase REST API
+
+        :return: Request body for the runAggregationQuery endpoint
+        """
+
+        if not self._aggregations:
+            raise ValueError("An aggregation query requires at least one aggregation")
+
+        return {
+            "structuredAggregationQuery": {
+                "structuredQuery": self._query.to_json()["structuredQuery"],
+                "aggregations": [aggregation.data() for aggregation in self._aggregations]
+            }
+        }
+
+
+class AggregationResult(object):
+    """
+    Typed results of a runAggregationQuery request, keyed by aggregation alias
+
+    Counts are returned as int, sums as int or float depending on the summed values and averages as float.
+    Sums and averages over no numeric values are returned as None.
+    """
+
+    def __init__(self, response: Union[httpx.Response, list]) -> None:
+        results = response.json() if isinstance(response, httpx.Response) else response
+
+        self.readTime = None
+        self._fields = {}
+
+        for result in results:
+            if "readTime" in result:
+                self.readTime = result["readTime"]
+            if "result" in result:
+                for alias, value in result["result"].get("aggregateFields", {}).items():
+                    self._fields[alias] = decode(value)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._fields!r})"
+
+    def __getitem__(self, alias: str) -> Any:
+        return self._fields[alias]
+
+    def __contains__(self, alias: str) -> bool:
+        return alias in self._fields
+
+    def get(self, alias: str, default: Any = None) -> Any:
+        return self._fields.get(alias, default)
+
+    def data(self):
+        return dict(self._fields)
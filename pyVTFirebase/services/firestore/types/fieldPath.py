@@ -0,0 +1,152 @@
+
+import re
+
+from typing import Iterable, List, Optional, Union
+
+
+_SIMPLE_SEGMENT = re.compile(r"^[_a-zA-Z][_a-zA-Z0-9]*$")
+
+
+def escape(segment: str) -> str:
+    """
+    Escapes a single field name for use in a field path
+
+    Field names that aren't made up of only letters, digits and underscores, or start with a digit, must be quoted
+    with backticks. Backticks and backslashes inside a quoted name are escaped with a backslash.
+
+    :param segment: Field name, Examples: "Amount", "first name", "a.b"
+    :return: The field name as it appears in a field path, Examples: "Amount", "`first name`", "`a.b`"
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredQuery#FieldReference
+    """
+
+    if not isinstance(segment, str):
+        raise TypeError(f"Field name is required to be of type str not {type(segment)}")
+    if not segment:
+        raise ValueError("Field name can't be empty")
+
+    if _SIMPLE_SEGMENT.match(segment):
+        return segment
+
+    return "`" + segment.replace("\\", "\\\\").replace("`", "\\`") + "`"
+
+
+def join(segments: Iterable[str]) -> str:
+    """
+    Builds a field path from a list of field names, escaping each of them as needed
+
+    :param segments: List of field names from the top level of the document down, Example: ["Address", "zip code"]
+    :return: The field path, Example: "Address.`zip code`"
+    """
+
+    return ".".join(escape(segment) for segment in segments)
+
+
+def split(path: str) -> List[str]:
+    """
+    Splits a field path into its unescaped field names
+
+    :param path: Field path, Example: "Address.`zip code`"
+    :return: List of field names, Example: ["Address", "zip code"]
+    """
+
+    if not isinstance(path, str):
+        raise TypeError(f"Field path is required to be of type str not {type(path)}")
+
+    segments = []
+    segment = ""
+    quoted = False
+    index = 0
+
+    while index < len(path):
+        character = path[index]
+
+        if quoted:
+            if character == "\\" and index + 1 < len(path):
+                index += 1
+                segment += path[index]
+            elif character == "`":
+                quoted = False
+            else:
+                segment += character
+        elif character == "`":
+            quoted = True
+        elif character == ".":
+            if not segment:
+                raise ValueError(f"Field path {path!r} contains an empty field name")
+            segments.append(segment)
+            segment = ""
+        else:
+            segment += character
+
+        index += 1
+
+    if quoted:
+        raise ValueError(f"Field path {path!r} contains an unterminated backtick")
+    if not segment:
+        raise ValueError(f"Field path {path!r} contains an empty field name")
+
+    segments.append(segment)
+    return segments
+
+
+def lookup(fields: dict, path: Union[str, List[str]]) -> Optional[dict]:
+    """
+    Gets the Value at a field path of a document's fields
+
+    :param fields: Fields of a document instance
+    :param path: Field path or list of its unescaped field names
+    :return: The Value or None if the field isn't set
+    """
+
+    segments = split(path) if isinstance(path, str) else path
+    value = {"mapValue": {"fields": fields}}
+
+    for segment in segments:
+        if "mapValue" not in value:
+            return None
+        value = value["mapValue"].get("fields", {}).get(segment)
+        if value is None:
+            return None
+
+    return value
+
+
+def assign(fields: dict, path: Union[str, List[str]], value: dict) -> None:
+    """
+    Sets the Value at a field path of a document's fields, creating the maps leading to it
+
+    :param fields: Fields of a document instance
+    :param path: Field path or list of its unescaped field names
+    :param value: Value to set
+    """
+
+    segments = split(path) if isinstance(path, str) else path
+
+    for segment in segments[:-1]:
+        parent = fields.get(segment)
+        if parent is None or "mapValue" not in parent:
+            parent = fields[segment] = {"mapValue": {"fields": {}}}
+        fields = parent["mapValue"].setdefault("fields", {})
+
+    fields[segments[-1]] = value
+
+
+def remove(fields: dict, path: Union[str, List[str]]) -> None:
+    """
+    Removes the Value at a field path of a document's fields if it is set
+
+    :param fields: Fields of a document instance
+    :param path: Field path or list of its unescaped field names
+    """
+
+    segments = split(path) if isinstance(path, str) else path
+
+    for segment in segments[:-1]:
+        parent = fields.get(segment)
+        if parent is None or "mapValue" not in parent:
+            return
+        fields = parent["mapValue"].get("fields", {})
+
+    fields.pop(segments[-1], None)
@@ -0,0 +1,191 @@
+
+import base64
+import datetime
+import functools
+
+from . import fieldPath
+from typing import Any, List, Tuple
+
+
+# Rank of each value type in Firestore's ordering of values of different types
+_TYPE_ORDER = {
+    "nullValue": 0,
+    "booleanValue": 1,
+    "integerValue": 2,
+    "doubleValue": 2,
+    "timestampValue": 3,
+    "stringValue": 4,
+    "bytesValue": 5,
+    "referenceValue": 6,
+    "geoPointValue": 7,
+    "arrayValue": 8,
+    "mapValue": 9
+}
+_EPOCH = datetime.datetime(1970, 1, 1)
+_INEQUALITY_OPERATORS = ("LESS_THAN", "LESS_THAN_OR_EQUAL", "GREATER_THAN", "GREATER_THAN_OR_EQUAL", "NOT_EQUAL",
+                         "NOT_IN", "IS_NOT_NULL", "IS_NOT_NAN")
+
+
+def sort_key(value: dict) -> Tuple:
+    """
+    Converts a Value message into a key that sorts like Firestore orders values
+
+    Values of different types are ordered by type: null, booleans, numbers, timestamps, strings, bytes, references,
+    geo points, arrays and maps. Integers and doubles compare as numbers, with NaN before all other numbers. Strings
+    compare by code point, references by path segment, arrays element by element and maps by their sorted keys and
+    values. Equal keys mean the values are equal for filters, so 1 and 1.0 are equal.
+
+    :param value: Value message as returned in a document's fields
+    :return: Comparable tuple
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/manage-data/data-types#value_type_ordering
+    """
+
+    value_type, content = next(iter(value.items()))
+    rank = _TYPE_ORDER.get(value_type)
+
+    if rank is None:
+        raise ValueError(f"Value type {value_type} doesn't correspond to a known type")
+
+    if value_type == "nullValue":
+        return rank,
+    elif value_type == "booleanValue":
+        return rank, content
+    elif value_type == "integerValue":
+        return rank, 1, int(content)
+    elif value_type == "doubleValue":
+        number = float(content)
+        return (rank, 0, 0) if number != number else (rank, 1, number)
+    elif value_type == "timestampValue":
+        return rank, _timestamp_key(content)
+    elif value_type == "stringValue":
+        return rank, content
+    elif value_type == "bytesValue":
+        return rank, base64.b64decode(content)
+    elif value_type == "referenceValue":
+        return rank, tuple(content.split("/"))
+    elif value_type == "geoPointValue":
+        return rank, content.get("latitude", 0.0), content.get("longitude", 0.0)
+    elif value_type == "arrayValue":
+        return rank, tuple(sort_key(element) for element in content.get("values", []))
+    else:
+        fields = content.get("fields", {})
+        return rank, tuple((key, sort_key(fields[key])) for key in sorted(fields))
+
+
+def type_rank(value: dict) -> int:
+    """
+    :param value: Value message
+    :return: The rank of the value's type in Firestore's ordering, numbers share one rank
+    """
+
+    return _TYPE_ORDER[next(iter(value))]
+
+
+@functools.total_ordering
+class Descending(object):
+    """ Inverts the ordering of a sort key """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any) -> None:
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+def document_key(document: dict, orders: List[dict]) -> Tuple:
+    """
+    Builds the key a document sorts by in the results of a query
+
+    :param document: Document as returned by the Firebase REST API
+    :param orders: The complete order by clause of the query, normally ending with __name__
+    :return: Comparable tuple with one element per order
+    """
+
+    key = []
+
+    for order in orders:
+        path = order["field"]["fieldPath"]
+
+        if path == "__name__":
+            value = {"referenceValue": document["name"]}
+        else:
+            value = fieldPath.lookup(document.get("fields", {}), path)
+
+        # Documents without an ordered field aren't returned by queries, sort them first to be safe
+        element = sort_key(value) if value is not None else (-1,)
+        key.append(Descending(element) if order.get("direction") == "DESCENDING" else element)
+
+    return tuple(key)
+
+
+def complete_order(structuredQuery: dict) -> List[dict]:
+    """
+    Makes the implicit order of a query explicit, the way the server completes it
+
+    Fields with inequality filters that aren't ordered by are added in order of their field path, then __name__ in
+    the direction of the last order.
+
+    :param structuredQuery: Structured query
+    :return: The complete order by clause
+    """
+
+    orders = list(structuredQuery.get("orderBy", []))
+    ordered = {order["field"]["fieldPath"] for order in orders}
+
+    inequalities = set()
+    filters = [structuredQuery["where"]] if "where" in structuredQuery else []
+
+    while filters:
+        where = filters.pop()
+
+        if "compositeFilter" in where:
+            filters.extend(where["compositeFilter"].get("filters", []))
+            continue
+
+        leaf = where.get("fieldFilter") or where.get("unaryFilter")
+        if leaf is not None and leaf["op"] in _INEQUALITY_OPERATORS:
+            inequalities.add(leaf["field"]["fieldPath"])
+
+    direction = orders[-1].get("direction", "ASCENDING") if orders else "ASCENDING"
+
+    for path in sorted(inequalities - ordered - {"__name__"}):
+        orders.append({"field": {"fieldPath": path}, "direction": direction})
+
+    if "__name__" not in ordered:
+        orders.append({"field": {"fieldPath": "__name__"}, "direction": direction})
+
+    return orders
+
+
+def _timestamp_key(timestamp: str) -> Tuple[int, int]:
+    """
+    Converts a RFC 3339 timestamp into seconds and nanoseconds since the epoch, keeping its full precision
+
+    :param timestamp: Timestamp string, Example: "2021-07-02T15:01:23.052142123Z"
+    :return: Tuple of seconds and nanoseconds
+    """
+
+    offset = datetime.timedelta(0)
+
+    if timestamp.endswith("Z"):
+        timestamp = timestamp[:-1]
+    elif len(timestamp) > 6 and timestamp[-6] in "+-" and timestamp[-3] == ":":
+        sign = 1 if timestamp[-6] == "+" else -1
+        offset = sign * datetime.timedelta(hours=int(timestamp[-5:-3]), minutes=int(timestamp[-2:]))
+        timestamp = timestamp[:-6]
+
+    seconds, _, fraction = timestamp.partition(".")
+    time = datetime.datetime.strptime(seconds, '%Y-%m-%dT%H:%M:%S') - offset
+    delta = time - _EPOCH
+
+    return delta.days * 86400 + delta.seconds, int(fraction[:9].ljust(9, "0")) if fraction else 0
@@ -0,0 +1,150 @@
+
+import re
+import json
+
+from .value import Value
+from typing import Any, Dict, List, Tuple
+
+
+# Placeholders are serialized as a string no real value contains, control characters are always escaped by json
+_SENTINEL = "\x00param:{name}:{key}\x00"
+_PATTERN = re.compile(rb'"\\u0000param:([A-Za-z_][A-Za-z0-9_]*):([a-z]+)\\u0000"')
+
+
+class Param(object):
+    """
+    Named placeholder for a filter or cursor value of a Query that is bound when the prepared query is run
+
+    Example:
+        query = Query().fromCollection(("Orders", False)).where("Status", "==", key="string", value=Param("status"))
+        prepared = query.prepare()
+
+        firestore.runQuery(json_kwargs=prepared.bind(status="open"))
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        """
+        :param name: Name the value is bound by, must be a valid python identifier
+        """
+
+        if not isinstance(name, str):
+            raise TypeError(f"Name is required to be of type str not {type(name)}")
+        if not name.isidentifier():
+            raise ValueError(f"Name {name!r} must be a valid identifier")
+
+        self.name = name
+
+    def __repr__(self):
+        return f"Param({self.name!r})"
+
+
+class Placeholder(object):
+    """
+    Takes the place of a Value in a query clause until the value of its parameter is bound
+    """
+
+    def __init__(self, param: Param, key: str) -> None:
+        if not isinstance(key, str):
+            raise TypeError(f"Key must be of type str not {type(key)}")
+
+        self._param = param
+        self._key = key
+
+    def __repr__(self):
+        return json.dumps(self.data())
+
+    def data(self):
+        return _SENTINEL.format(name=self._param.name, key=self._key)
+
+
+class BoundQuery(object):
+    """
+    Request body of a prepared query with its parameters bound, accepted by Firestore.runQuery like a Query
+    """
+
+    __slots__ = ("_body",)
+
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    def __repr__(self):
+        return f"BoundQuery({self._body.decode('utf-8')})"
+
+    def body(self) -> bytes:
+        """
+        :return: UTF-8 encoded JSON request body for the runQuery endpoint
+        """
+
+        return self._body
+
+    def to_json(self) -> dict:
+        """
+        :return: Request body for the runQuery endpoint
+        """
+
+        return json.loads(self._body)
+
+
+class PreparedQuery(object):
+    """
+    Serialized template of a Query with placeholders, see Query.prepare
+
+    The template is split at the placeholders once, so binding only encodes the parameter values and joins the
+    pieces. The filter and cursor objects of the query aren't rebuilt.
+    """
+
+    def __init__(self, body: bytes) -> None:
+        """
+        :param body: Serialized request body of the query, as returned by Query.body
+        """
+
+        self._parts: List[bytes] = []
+        self._slots: List[Tuple[str, str]] = []
+        self.params: Dict[str, str] = {}
+
+        position = 0
+        for match in _PATTERN.finditer(body):
+            name, key = match.group(1).decode("ascii"), match.group(2).decode("ascii")
+
+            if self.params.setdefault(name, key) != key:
+                raise ValueError(f"Parameter {name!r} is used with both key {self.params[name]} and key {key}")
+
+            self._parts.append(body[position:match.start()])
+            self._slots.append((name, key))
+            position = match.end()
+
+        self._parts.append(body[position:])
+
+    def __repr__(self):
+        return f"PreparedQuery(params={sorted(self.params)})"
+
+    def bind(self, **params: Any) -> BoundQuery:
+        """
+        Binds a value to every parameter of the query
+
+        :keyword params: The value of each parameter by name, of the type the key of its placeholder requires
+        :return: The bound query to pass to Firestore.runQuery
+
+        Example:
+            prepared.bind(status="open", after=25)
+        """
+
+        missing = self.params.keys() - params.keys()
+        if missing:
+            raise TypeError(f"Missing values for parameters: {', '.join(sorted(missing))}")
+
+        unexpected = params.keys() - self.params.keys()
+        if unexpected:
+            raise TypeError(f"Unexpected parameters: {', '.join(sorted(unexpected))}")
+
+        encoded = {name: json.dumps(Value(key=key, value=params[name]).data(), sort_keys=True, separators=(",", ":"),
+                                    ensure_ascii=False).encode("utf-8") for name, key in self.params.items()}
+
+        pieces = [self._parts[0]]
+        for (name, _), part in zip(self._slots, self._parts[1:]):
+            pieces.append(encoded[name])
+            pieces.append(part)
+
+        return BoundQuery(body=b"".join(pieces))
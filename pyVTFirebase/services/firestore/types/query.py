@@ -3,10 +3,12 @@ import json
 import math
 
 from .structuredQuery import FieldReference, Projection, CollectionSelector, Order, Direction, Cursor, FieldFilter, \
-    FieldFilterOperator, UnaryFilter, UnaryFilterOperator, Filter, StructuredQueryEncoder
+    FieldFilterOperator, UnaryFilter, UnaryFilterOperator, CompositeFilter, CompositeFilterOperator, Filter
+from . import fieldPath
 from .value import Value
+from .preparedQuery import Param, Placeholder, PreparedQuery
 
-from typing import Iterable, Tuple, Union, Any
+from typing import Iterable, Optional, Sequence, Tuple, Union, Any
 
 
 _EQ_OP: str
@@ -32,8 +34,26 @@ _COMPARISON_OPERATORS = {
 _BAD_OP_STRING = "Operator string {!r} is invalid. Valid choices are: {}."
 _BAD_OP_NAN_NULL = 'Only an equality filter ("==") can be used with None or NaN values'
 
+# Clauses of a query, by attribute name without the leading underscore and by structuredQuery key
+_CLAUSES = ("select", "from_coll", "where", "orderBy", "startAt", "endAt", "offset", "limit")
+_KEYS = ("select", "from", "where", "orderBy", "startAt", "endAt", "offset", "limit")
+
 
 class Query(object):
+    """
+    Immutable structured query built up by chaining calls, each returning a new instance
+
+    Clauses are kept as plain JSON and shared between a query and the queries derived from it, so building a query
+    only creates the clause that changed. The request body is serialized once per instance and reused, and queries
+    with the same clauses are equal and hash alike so they can be used as keys.
+
+    Example:
+        query = Query().fromCollection(("Orders", False)).where("Status", "==", key="string", value="open").limit(50)
+        firestore.runQuery(json_kwargs=query)
+    """
+
+    __slots__ = ("_select", "_from_coll", "_where", "_orderBy", "_startAt", "_endAt", "_offset", "_limit", "_json",
+                 "_body", "_hash")
 
     def __init__(
             self,
@@ -46,59 +66,113 @@ class Query(object):
             offset=None,
             limit=None
     ) -> None:
-        self._select = select
-        self._from_coll = from_coll
-        self._where = where
-        self._orderBy = orderBy
-        self._startAt = startAt
-        self._endAt = endAt
-        self._offset = offset
-        self._limit = limit
+        _set = object.__setattr__
+        _set(self, "_select", _plain(select))
+        _set(self, "_from_coll", _plain(from_coll))
+        _set(self, "_where", _plain(where))
+        _set(self, "_orderBy", _plain(orderBy))
+        _set(self, "_startAt", _plain(startAt))
+        _set(self, "_endAt", _plain(endAt))
+        _set(self, "_offset", offset)
+        _set(self, "_limit", limit)
+        _set(self, "_json", None)
+        _set(self, "_body", None)
+        _set(self, "_hash", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Query objects are immutable, use the builder methods to derive a new query")
+
+    def __reduce__(self):
+        return self.__class__, (self._select, self._from_coll, self._where, self._orderBy, self._startAt, self._endAt,
+                                self._offset, self._limit)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return (
-            self._select == other._select
-            and self._from_coll == other._from_coll
-            and self._where == other._where
-            and self._orderBy == other._orderBy
-            and self._startAt == other._startAt
-            and self._endAt == other._endAt
-            and self._offset == other._offset
-            and self._limit == other._limit
-        )
+        return self is other or self.body() == other.body()
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self.body()))
+        return self._hash
+
+    def __repr__(self):
+        return f"Query({self.body().decode('utf-8')})"
+
+    def _replace(self, **clauses) -> "Query":
+        """
+        Creates a copy of the query with some clauses replaced, sharing the others
+
+        :keyword clauses: New plain JSON values of clauses, by name without the leading underscore
+        :return: New instance of the Query class
+        """
+
+        query = object.__new__(self.__class__)
+        _set = object.__setattr__
+
+        for name in _CLAUSES:
+            _set(query, f"_{name}", clauses[name] if name in clauses else getattr(self, f"_{name}"))
+
+        _set(query, "_json", None)
+        _set(query, "_body", None)
+        _set(query, "_hash", None)
+        return query
 
     def to_json(self):
         """
         Converts the Query class parameters to serializable JSON for passing into httpx request to
         the Firebase REST API
 
-        :return:
+        The returned dicts may be modified, but the clauses inside them are shared with the query and must not be.
+
+        :return: Request body for the runQuery endpoint
         """
 
-        data = {"structuredQuery": {}}
+        if self._json is None:
+            structuredQuery = {}
+
+            for name, key in zip(_CLAUSES, _KEYS):
+                value = getattr(self, f"_{name}")
+                if value:
+                    structuredQuery[key] = value
 
-        for value in vars(self):
-            if vars(self)[value]:
-                if value == "_select":
-                    data["structuredQuery"]["select"] = vars(self)[value]
-                elif value == "_from_coll":
-                    data["structuredQuery"]["from"] = vars(self)[value]
-                elif value == "_where":
-                    data["structuredQuery"]["where"] = vars(self)[value]
-                elif value == "_orderBy":
-                    data["structuredQuery"]["orderBy"] = vars(self)[value]
-                elif value == "_startAt":
-                    data["structuredQuery"]["startAt"] = vars(self)[value]
-                elif value == "_endAt":
-                    data["structuredQuery"]["endAt"] = vars(self)[value]
-                elif value == "_offset":
-                    data["structuredQuery"]["offset"] = vars(self)[value]
-                elif value == "_limit":
-                    data["structuredQuery"]["limit"] = vars(self)[value]
+            object.__setattr__(self, "_json", structuredQuery)
 
-        return json.loads(json.dumps(data, cls=StructuredQueryEncoder))
+        return {"structuredQuery": dict(self._json)}
+
+    def body(self) -> bytes:
+        """
+        Gets the canonical serialized request body of the query, computed once per instance
+
+        Keys are sorted so queries with the same clauses produce the same bytes regardless of how they were built.
+
+        :return: UTF-8 encoded JSON request body for the runQuery endpoint
+        """
+
+        if self._body is None:
+            body = json.dumps(self.to_json(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+            object.__setattr__(self, "_body", body.encode("utf-8"))
+
+        return self._body
+
+    def prepare(self) -> PreparedQuery:
+        """
+        Compiles the query into a serialized template whose Param placeholders are bound on each run
+
+        Queries that are run many times with only their filter or cursor values changing are built and serialized
+        once, binding the values into the template is all that is left per request.
+
+        :return: New instance of the PreparedQuery class
+
+        Example:
+            prepared = (Query().fromCollection(("Orders", False))
+                        .where("Customer", "==", key="string", value=Param("customer"))
+                        .orderBy("Amount").startAt(key="int", value=Param("minimum")).prepare())
+
+            firestore.runQuery(json_kwargs=prepared.bind(customer="<CustomerID>", minimum=100))
+        """
+
+        return PreparedQuery(body=self.body())
 
     def select(self, field_paths: Iterable[str]) -> "Query":
         """
@@ -127,17 +201,7 @@ class Query(object):
             ]
         )
 
-        return self.__class__(
-            select=new_select.data(),
-            from_coll=self._from_coll,
-            where=self._where,
-            orderBy=self._orderBy,
-            startAt=self._startAt,
-            endAt=self._endAt,
-            offset=self._offset,
-            limit=self._limit
-
-        )
+        return self._replace(select=_plain(new_select.data()))
 
     def fromCollection(self, collection: Tuple[str, bool]) -> "Query":
         """
@@ -169,22 +233,15 @@ class Query(object):
 
         new_from_coll = CollectionSelector(collections=collection)
 
-        return self.__class__(
-            select=self._select,
-            from_coll=new_from_coll.data(),
-            where=self._where,
-            orderBy=self._orderBy,
-            startAt=self._startAt,
-            endAt=self._endAt,
-            offset=self._offset,
-            limit=self._limit
-        )
+        return self._replace(from_coll=_plain(new_from_coll.data()))
 
     def where(self, field: str, op: str, key: str = None,
               value: Union[None, bool, str, bytes, int, float, Tuple[float, float], dict] = None) -> "Query":
         """
         Creates a filter on a document field
 
+        Multiple calls of this function are combined with AND, use Query.whereAny for alternatives
+
         :param field: The document field to do the comparison on
         :param op: The comparative operator that compares the field parameter to the value parameter
         :param key: The type of value object to generate
@@ -220,6 +277,10 @@ class Query(object):
                     'map': Creates a mapValue object.
             value: 25
 
+            op: "in"
+            key: "array"
+            value: {"key": "string", "value": ["<CustomerID>", "<CustomerID>", ...]}
+
 
             key: "int"          key: "geo"
             value: 23           value: (64.8942944, -52.1294764)
@@ -230,37 +291,48 @@ class Query(object):
             https://firebase.google.com/docs/firestore/reference/rest/v1/Value
         """
 
-        # Type verification
-        if not isinstance(field, str):
-            raise TypeError(f"Field is required to be of type str not {type(field)}")
-        if not isinstance(op, str):
-            raise TypeError(f"Op is required to be of type str not {type(op)}")
-        if key:
-            if not isinstance(key, str):
-                raise TypeError(f"Key is required to be of type str not {type(key)}")
-
-        if value is None:
-            if op != _EQ_OP:
-                raise ValueError(_BAD_OP_NAN_NULL)
-            where = Filter(UnaryFilter(field=FieldReference(field_path=field), op=UnaryFilterOperator.IS_NULL))
-        elif _isnan(value):
-            if op != _EQ_OP:
-                raise ValueError(_BAD_OP_NAN_NULL)
-            where = Filter(UnaryFilter(field=FieldReference(field_path=field), op=UnaryFilterOperator.IS_NAN))
-        else:
-            where = Filter(FieldFilter(field=FieldReference(field_path=field), op=_field_filter_op_string(op=op),
-                                       value=Value(key=key, value=value)))
-
-        return self.__class__(
-            select=self._select,
-            from_coll=self._from_coll,
-            where=where.data(),
-            orderBy=self._orderBy,
-            startAt=self._startAt,
-            endAt=self._endAt,
-            offset=self._offset,
-            limit=self._limit
-        )
+        where = _and(where=self._where, new=_plain(_build_filter(field=field, op=op, key=key, value=value).data()))
+
+        return self._replace(where=where)
+
+    def whereAny(self, filters: Iterable[Sequence]) -> "Query":
+        """
+        Creates a group of filters of which at least one must match a document
+
+        The group is combined with the filters of earlier where calls with AND, like every where call.
+
+        :param filters: List of filters, each a tuple of the field, op, key and value parameters of Query.where. The
+                        value may be left out for filters on None.
+        :return: New instance of the Query class
+
+        Example:
+            query.where("Region", "==", key="string", value="EU").whereAny([
+                ("Status", "==", "string", "open"),
+                ("Priority", ">=", "int", 3)
+            ])
+                -> Region == "EU" AND (Status == "open" OR Priority >= 3)
+
+        Links: ->
+            https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredQuery#CompositeFilter
+        """
+
+        group = []
+
+        for arguments in filters:
+            if not isinstance(arguments, (tuple, list)):
+                raise TypeError(f"Filters are required to be of type tuple not {type(arguments)}")
+            if not 3 <= len(arguments) <= 4:
+                raise ValueError(f"Filter tuples are expected to have 3 or 4 elements, not {len(arguments)}")
+
+            group.append(_build_filter(*arguments))
+
+        if not group:
+            raise ValueError("WhereAny requires at least one filter")
+
+        new = Filter(CompositeFilter(op=CompositeFilterOperator.OR, filters=group))
+        where = _and(where=self._where, new=_plain(new.data()))
+
+        return self._replace(where=where)
 
     def orderBy(self, field: str, direction: str = "ASCENDING") -> "Query":
         """
@@ -296,21 +368,12 @@ class Query(object):
             raise ValueError(f"Direction specification not possible for {type(direction)}: {direction}")
 
         new_order = Order(field=FieldReference(field_path=field), direction=direction)
-        order = self._orderBy + new_order.data() if self._orderBy is not None else new_order.data()
-
-        return self.__class__(
-            select=self._select,
-            from_coll=self._from_coll,
-            where=self._where,
-            orderBy=order,
-            startAt=self._startAt,
-            endAt=self._endAt,
-            offset=self._offset,
-            limit=self._limit
-        )
+        order = (self._orderBy or []) + _plain(new_order.data())
 
-    def startAt(self, key: str, value: Union[None, bool, str, int, float, Tuple[float, float], dict] = None,
-                before: bool = True) -> "Query":
+        return self._replace(orderBy=order)
+
+    def startAt(self, key: str = None, value: Union[None, bool, str, int, float, Tuple[float, float], dict] = None,
+                before: bool = True, values: Iterable[Tuple[str, Any]] = None, document: dict = None) -> "Query":
         """
         Creates a cursor object that represents a starting position for the query results
 
@@ -319,6 +382,12 @@ class Query(object):
                       order by clause of a query.
         :param before: If the position is just before or just after the given value, relative to the sort order
                        defined by the query.
+        :param values: Instead of key and value, a list of tuples of key and value, one per order by clause in the
+                       same order
+        :param document: Instead of key and value, a document as returned by the Firebase REST API to position the
+                         cursor at. Its values of the order by fields are used and, unless the query is already
+                         ordered by __name__, an order by __name__ is added so documents with equal values are told
+                         apart.
         :return: New instance of the Query class
 
         Example:
@@ -340,32 +409,35 @@ class Query(object):
             value: 23           value: (64.8942944, -52.1294764)
             before: True        before: True
 
+            values: [("int", 23), ("ref", "projects/<ProjectID>/databases/(default)/documents/Orders/<OrderID>")]
+
+            document: {"name": "projects/<ProjectID>/databases/(default)/documents/Orders/<OrderID>", "fields": {...}}
+
         Links: ->
             https://firebase.google.com/docs/firestore/reference/rest/v1/Cursor
             https://firebase.google.com/docs/firestore/reference/rest/v1/Value
         """
 
-        # Type verification
-        if not isinstance(key, str):
-            raise TypeError(f"key must be of type str not {type(key)}")
-        if not isinstance(before, bool):
-            raise TypeError(f"before must be of type bool not {type(before)}")
+        new_start, order = self._cursor(key=key, value=value, before=before, values=values, document=document)
 
-        new_start = Cursor(before=before, values=Value(key=key, value=value))
-
-        return self.__class__(
-            select=self._select,
-            from_coll=self._from_coll,
-            where=self._where,
-            orderBy=self._orderBy,
-            startAt=new_start.data(),
-            endAt=self._endAt,
-            offset=self._offset,
-            limit=self._limit
-        )
+        return self._replace(startAt=new_start, orderBy=order)
 
-    def endAt(self, key: str, value: Union[None, bool, str, int, float, Tuple[float, float], dict] = None,
-              before: bool = True) -> "Query":
+    def startAfter(self, key: str = None, value: Union[None, bool, str, int, float, Tuple[float, float], dict] = None,
+                   values: Iterable[Tuple[str, Any]] = None, document: dict = None) -> "Query":
+        """
+        Starts the query results just after a position, see Query.startAt for details of the parameters
+
+        Example:
+            page = query.orderBy("Amount").limit(50)
+            next_page = page.startAfter(document=last_document_of_page)
+
+        :return: New instance of the Query class
+        """
+
+        return self.startAt(key=key, value=value, before=False, values=values, document=document)
+
+    def endAt(self, key: str = None, value: Union[None, bool, str, int, float, Tuple[float, float], dict] = None,
+              before: bool = True, values: Iterable[Tuple[str, Any]] = None, document: dict = None) -> "Query":
         """
         Creates a cursor object that represents a ending position for the query results
 
@@ -374,6 +446,12 @@ class Query(object):
                       order by clause of a query.
         :param before: If the position is just before or just after the given value, relative to the sort order
                        defined by the query.
+        :param values: Instead of key and value, a list of tuples of key and value, one per order by clause in the
+                       same order
+        :param document: Instead of key and value, a document as returned by the Firebase REST API to position the
+                         cursor at. Its values of the order by fields are used and, unless the query is already
+                         ordered by __name__, an order by __name__ is added so documents with equal values are told
+                         apart.
         :return: New instance of the Query class
 
         Example:
@@ -395,29 +473,65 @@ class Query(object):
             value: 23           value: (64.8942944, -52.1294764)
             before: True        before: True
 
+            values: [("int", 23), ("ref", "projects/<ProjectID>/databases/(default)/documents/Orders/<OrderID>")]
+
+            document: {"name": "projects/<ProjectID>/databases/(default)/documents/Orders/<OrderID>", "fields": {...}}
+
         Links: ->
             https://firebase.google.com/docs/firestore/reference/rest/v1/Cursor
             https://firebase.google.com/docs/firestore/reference/rest/v1/Value
         """
 
-        # Type verification
-        if not isinstance(key, str):
-            raise TypeError(f"key must be of type str not {type(key)}")
+        new_end, order = self._cursor(key=key, value=value, before=before, values=values, document=document)
+
+        return self._replace(endAt=new_end, orderBy=order)
+
+    def endBefore(self, key: str = None, value: Union[None, bool, str, int, float, Tuple[float, float], dict] = None,
+                  values: Iterable[Tuple[str, Any]] = None, document: dict = None) -> "Query":
+        """
+        Ends the query results just before a position, see Query.endAt for details of the parameters
+
+        :return: New instance of the Query class
+        """
+
+        return self.endAt(key=key, value=value, before=True, values=values, document=document)
+
+    def _cursor(self, key: Optional[str], value: Any, before: bool, values: Optional[Iterable[Tuple[str, Any]]],
+                document: Optional[dict]) -> Tuple[dict, Optional[list]]:
+        """
+        Builds a cursor from one of a single value, a list of values or a document
+
+        :return: Tuple of the cursor and the order by clause of the query, extended with __name__ for documents
+        """
+
         if not isinstance(before, bool):
             raise TypeError(f"before must be of type bool not {type(before)}")
+        if sum(argument is not None for argument in (key, values, document)) != 1:
+            raise ValueError("Exactly one of key, values or document is required for a cursor")
 
-        new_end = Cursor(before=before, values=Value(key=key, value=value))
-
-        return self.__class__(
-            select=self._select,
-            from_coll=self._from_coll,
-            where=self._where,
-            orderBy=self._orderBy,
-            startAt=self._startAt,
-            endAt=new_end.data(),
-            offset=self._offset,
-            limit=self._limit
-        )
+        if document is not None:
+            return _document_cursor(orderBy=self._orderBy, document=document, before=before)
+
+        if key is not None:
+            if not isinstance(key, str):
+                raise TypeError(f"key must be of type str not {type(key)}")
+            values = [(key, value)]
+
+        cursor_values = []
+        for element in values:
+            if not isinstance(element, (tuple, list)) or len(element) != 2:
+                raise TypeError(f"Cursor values are required to be tuples of key and value not {element!r}")
+            if not isinstance(element[0], str):
+                raise TypeError(f"key must be of type str not {type(element[0])}")
+            cursor_values.append(_value(key=element[0], value=element[1]))
+
+        if not cursor_values:
+            raise ValueError("A cursor requires at least one value")
+        if self._orderBy and len(cursor_values) > len(self._orderBy) + 1:
+            raise ValueError(f"Cursor has {len(cursor_values)} values but the query only orders by "
+                             f"{len(self._orderBy)} fields")
+
+        return _plain(Cursor(before=before, values=cursor_values).data()), self._orderBy
 
     def offset(self, offset: int) -> "Query":
         """
@@ -434,16 +548,7 @@ class Query(object):
         if not isinstance(offset, int):
             raise TypeError("Offset isn't of type int")
 
-        return self.__class__(
-            select=self._select,
-            from_coll=self._from_coll,
-            where=self._where,
-            orderBy=self._orderBy,
-            startAt=self._startAt,
-            endAt=self._endAt,
-            offset=offset,
-            limit=self._limit
-        )
+        return self._replace(offset=offset)
 
     def limit(self, limit: int) -> "Query":
         """
@@ -460,16 +565,126 @@ class Query(object):
         if not isinstance(limit, int):
             raise TypeError("Limit isn't of type int")
 
-        return self.__class__(
-            select=self._select,
-            from_coll=self._from_coll,
-            where=self._where,
-            orderBy=self._orderBy,
-            startAt=self._startAt,
-            endAt=self._endAt,
-            offset=self._offset,
-            limit=limit
-        )
+        return self._replace(limit=limit)
+
+
+def _build_filter(field: str, op: str, key: str = None,
+                  value: Union[None, bool, str, bytes, int, float, Tuple[float, float], dict] = None) -> Filter:
+    """
+    Builds the filter of a single comparison, see Query.where for details of the parameters
+
+    :return: A unary filter for comparisons with None or NaN, else a field filter
+    """
+
+    # Type verification
+    if not isinstance(field, str):
+        raise TypeError(f"Field is required to be of type str not {type(field)}")
+    if not isinstance(op, str):
+        raise TypeError(f"Op is required to be of type str not {type(op)}")
+    if key:
+        if not isinstance(key, str):
+            raise TypeError(f"Key is required to be of type str not {type(key)}")
+
+    if value is None:
+        if op != _EQ_OP:
+            raise ValueError(_BAD_OP_NAN_NULL)
+        return Filter(UnaryFilter(field=FieldReference(field_path=field), op=UnaryFilterOperator.IS_NULL))
+    elif _isnan(value):
+        if op != _EQ_OP:
+            raise ValueError(_BAD_OP_NAN_NULL)
+        return Filter(UnaryFilter(field=FieldReference(field_path=field), op=UnaryFilterOperator.IS_NAN))
+
+    return Filter(FieldFilter(field=FieldReference(field_path=field), op=_field_filter_op_string(op=op),
+                              value=_value(key=key, value=value)))
+
+
+def _value(key: str, value: Any) -> Union[Value, Placeholder]:
+    """
+    Creates the Value of a filter or cursor, or a placeholder for it when the value is a Param
+
+    :param key: The type of value object to generate
+    :param value: The value of the value object to generate or a Param
+    :return: Value or Placeholder object
+    """
+
+    if isinstance(value, Param):
+        return Placeholder(param=value, key=key)
+
+    return Value(key=key, value=value)
+
+
+def _document_cursor(orderBy: Optional[list], document: dict, before: bool) -> Tuple[dict, list]:
+    """
+    Positions a cursor at a document using its values of the fields a query is ordered by
+
+    :param orderBy: The order by clause of the query
+    :param document: Document as returned by the Firebase REST API
+    :param before: If the position is just before or just after the document
+    :return: Tuple of the cursor and the order by clause, ending with __name__ in the direction of the last order
+    """
+
+    if not isinstance(document, dict) or "name" not in document:
+        raise TypeError("Document is required to be a document dict with a name as returned by the Firebase REST API")
+
+    orders = list(orderBy or [])
+
+    if not orders or orders[-1]["field"]["fieldPath"] != "__name__":
+        direction = orders[-1]["direction"] if orders else Direction.ASCENDING.data()
+        orders.append(_plain(Order(field=FieldReference(field_path="__name__"), direction=direction).data())[0])
+
+    values = []
+    for order in orders:
+        path = order["field"]["fieldPath"]
+
+        if path == "__name__":
+            values.append({"referenceValue": document["name"]})
+            continue
+
+        field = fieldPath.lookup(document.get("fields", {}), path)
+        if field is None:
+            raise ValueError(f"Document {document['name']} has no value for the ordered field {path}")
+        values.append(field)
+
+    return {"values": values, "before": before}, orders
+
+
+def _and(where: Optional[dict], new: dict) -> dict:
+    """
+    Combines the filter of a query with another filter using AND
+
+    :param where: The current filter of the query or None
+    :param new: The filter to add
+    :return: The new filter alone if the query had none, else a composite AND filter of both. An existing AND
+             filter is extended rather than nested.
+    """
+
+    if not where:
+        return new
+
+    existing = where.get("compositeFilter")
+
+    if existing is not None and existing["op"] == CompositeFilterOperator.AND.data():
+        return {"compositeFilter": {"op": existing["op"], "filters": existing["filters"] + [new]}}
+
+    return {"compositeFilter": {"op": CompositeFilterOperator.AND.data(), "filters": [where, new]}}
+
+
+def _plain(value: Any) -> Any:
+    """
+    Resolves the structuredQuery and Value classes within a clause into plain JSON types
+
+    :param value: Clause, or part of one
+    :return: The clause made up of only dicts, lists and scalars
+    """
+
+    if isinstance(value, dict):
+        return {key: _plain(element) for key, element in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_plain(element) for element in value]
+    elif hasattr(value, "data"):
+        return _plain(value.data())
+
+    return value
 
 
 def _isnan(value) -> bool:
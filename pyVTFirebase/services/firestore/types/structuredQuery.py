@@ -3,7 +3,7 @@ import json
 import enum
 
 from json import JSONEncoder
-from typing import Any, Tuple, Union
+from typing import Any, List, Tuple, Union
 from .value import Value
 
 
@@ -119,15 +119,15 @@ class Cursor:
         https://firebase.google.com/docs/firestore/reference/rest/v1/Cursor
     """
 
-    def __init__(self, values: Value, before: bool):
-        self._values = values
+    def __init__(self, values: Union[Value, List[Value]], before: bool):
+        self._values = values if isinstance(values, list) else [values]
         self._before = before
 
     def __repr__(self):
-        return json.dumps({"values": [self._values], "before": self._before})
+        return json.dumps({"values": self._values, "before": self._before}, cls=StructuredQueryEncoder)
 
     def data(self):
-        return {"values": [self._values], "before": self._before}
+        return {"values": self._values, "before": self._before}
 
 
 class FieldFilterOperator(enum.Enum):
@@ -235,6 +235,49 @@ class UnaryFilter:
         return {"op": self.op, "field": self.field}
 
 
+class CompositeFilterOperator(enum.Enum):
+    """
+    Defines a composite filter operator
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredQuery#Operator
+    """
+
+    OPERATOR_UNSPECIFIED = "OPERATOR_UNSPECIFIED"
+    AND = "AND"
+    OR = "OR"
+
+    def data(self):
+        if self is self.AND:
+            return "AND"
+        elif self is self.OR:
+            return "OR"
+        elif self is self.OPERATOR_UNSPECIFIED:
+            return "OPERATOR_UNSPECIFIED"
+
+
+class CompositeFilter:
+    """
+    Defines a filter that merges multiple other filters using the given operator
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredQuery#CompositeFilter
+    """
+
+    def __init__(self, op: CompositeFilterOperator, filters: list):
+        if not filters:
+            raise ValueError("CompositeFilter requires at least one filter")
+
+        self.op = op
+        self.filters = filters
+
+    def __repr__(self):
+        return json.dumps({"op": self.op, "filters": self.filters}, cls=StructuredQueryEncoder)
+
+    def data(self):
+        return {"op": self.op, "filters": self.filters}
+
+
 class Filter:
     """
     Defines a filter on a query result set
@@ -243,20 +286,19 @@ class Filter:
         https://firebase.google.com/docs/firestore/reference/rest/v1/StructuredQuery#Filter
     """
 
-    def __init__(self, filter_type: Union[FieldFilter, UnaryFilter]):
+    def __init__(self, filter_type: Union[FieldFilter, UnaryFilter, CompositeFilter]):
         self.filter_type = filter_type
 
     def __repr__(self):
-        if isinstance(self.filter_type, FieldFilter):
-            return json.dumps({"fieldFilter": self.filter_type})
-        elif isinstance(self.filter_type, UnaryFilter):
-            return json.dumps({"unaryFilter": self.filter_type})
+        return json.dumps(self.data(), cls=StructuredQueryEncoder)
 
     def data(self):
         if isinstance(self.filter_type, FieldFilter):
             return {"fieldFilter": self.filter_type}
         elif isinstance(self.filter_type, UnaryFilter):
             return {"unaryFilter": self.filter_type}
+        elif isinstance(self.filter_type, CompositeFilter):
+            return {"compositeFilter": self.filter_type}
 
 
 class StructuredQueryEncoder(JSONEncoder):
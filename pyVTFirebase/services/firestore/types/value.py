@@ -1,8 +1,10 @@
 
 import json
+import math
+import base64
 import datetime
 
-from typing import Union, Tuple
+from typing import Any, List, Union, Tuple
 
 
 class Value:
@@ -67,22 +69,34 @@ class Value:
                 else:
                     raise TypeError(f"Key geo requires parameter value to be of type tuple not {type(value)}")
             elif key == "array":
-                if isinstance(value, dict):
+                if isinstance(value, (dict, list)):
 
                     def raiseError():
                         raise KeyError(
                             "Value for key array can only contain 2 elements with the key names 'key' and 'value'")
 
-                    if len(value.keys()) != 2:
-                        raiseError()
-
-                    for keys in value.keys():
-                        if keys not in ["key", "value"]:
+                    def check(checking: dict):
+                        if not isinstance(checking, dict) or len(checking.keys()) != 2:
                             raiseError()
 
+                        for keys in checking.keys():
+                            if keys not in ["key", "value"]:
+                                raiseError()
+
+                    # A list of key and value dicts, or one key with a list of values of that type
+                    if isinstance(value, list):
+                        for element in value:
+                            check(checking=element)
+                        return ArrayValue(value=[Value(key=element["key"], value=element["value"]) for element in value])
+
+                    check(checking=value)
+
+                    if isinstance(value["value"], list):
+                        return ArrayValue(value=[Value(key=value["key"], value=element) for element in value["value"]])
+
                     return ArrayValue(value=Value(key=value["key"], value=value["value"]))
                 else:
-                    raise TypeError(f"Key array requires parameter value to be of type dict not {type(value)}")
+                    raise TypeError(f"Key array requires parameter value to be of type dict or list not {type(value)}")
             elif key == "map":
                 if isinstance(value, dict):
 
@@ -306,14 +320,14 @@ class ArrayValue:
         https://firebase.google.com/docs/firestore/reference/rest/v1/ArrayValue
     """
 
-    def __init__(self, value: Value):
-        self._value = value
+    def __init__(self, value: Union[Value, List[Value]]):
+        self._values = value if isinstance(value, list) else [value]
 
     def __repr__(self):
-        return json.dumps({"arrayValue": {"values": [self._value.data()]}})
+        return json.dumps(self.data())
 
     def data(self):
-        return {"arrayValue": {"values": [self._value.data()]}}
+        return {"arrayValue": {"values": [value.data() for value in self._values]}}
 
 
 class MapValue:
@@ -333,3 +347,150 @@ class MapValue:
 
     def data(self):
         return {"mapValue": {"fields": {self._key: self._value.data()}}}
+
+
+class Reference(str):
+    """
+    The full resource name of a referenced document, as decoded from a referenceValue
+
+    Compares equal to the plain name, while encode turns it back into a referenceValue instead of a stringValue.
+
+    Example:
+        encode(decode({"referenceValue": "projects/<ProjectID>/databases/(default)/documents/Users/<UserID>"}))
+            -> {"referenceValue": "projects/<ProjectID>/databases/(default)/documents/Users/<UserID>"}
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"Reference({str.__repr__(self)})"
+
+
+def decode(value: dict) -> Any:
+    """
+    Converts a Value message returned from the Firebase REST API into its native python equivalent
+
+    :param value: Value message as returned in a document's fields or a query result
+    :return: The native python value of the message
+
+    Conversions:
+        nullValue -> None
+        booleanValue -> bool
+        integerValue -> int
+        doubleValue -> float
+        timestampValue -> datetime.datetime (UTC)
+        stringValue -> str
+        bytesValue -> bytes
+        referenceValue -> Reference, a str
+        geoPointValue -> Tuple[float, float]
+        arrayValue -> list
+        mapValue -> dict
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Value
+    """
+
+    if not isinstance(value, dict) or len(value) != 1:
+        raise ValueError(f"Value message must be a dict with a single value type not {value!r}")
+
+    value_type, content = next(iter(value.items()))
+
+    if value_type == "nullValue":
+        return None
+    elif value_type == "booleanValue":
+        return content
+    elif value_type == "integerValue":
+        return int(content)
+    elif value_type == "doubleValue":
+        return float(content)
+    elif value_type == "timestampValue":
+        return _parse_timestamp(content)
+    elif value_type == "stringValue":
+        return content
+    elif value_type == "bytesValue":
+        return base64.b64decode(content)
+    elif value_type == "referenceValue":
+        return Reference(content)
+    elif value_type == "geoPointValue":
+        # Whole coordinates arrive as JSON integers
+        return float(content.get("latitude", 0.0)), float(content.get("longitude", 0.0))
+    elif value_type == "arrayValue":
+        return [decode(element) for element in content.get("values", [])]
+    elif value_type == "mapValue":
+        return {key: decode(element) for key, element in content.get("fields", {}).items()}
+    else:
+        raise ValueError(f"Value type {value_type} doesn't correspond to a known type")
+
+
+def encode(value: Any) -> dict:
+    """
+    Converts a native python value into a Value message for the Firebase REST API, the inverse of decode
+
+    :param value: The native python value
+    :return: Value message
+
+    Conversions:
+        None -> nullValue
+        bool -> booleanValue
+        int -> integerValue
+        float -> doubleValue
+        datetime.datetime -> timestampValue (naive datetimes are taken to be UTC)
+        Reference -> referenceValue
+        str -> stringValue
+        bytes -> bytesValue
+        Tuple[float, float] -> geoPointValue
+        list -> arrayValue
+        dict -> mapValue
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Value
+    """
+
+    if value is None:
+        return NullValue().data()
+    elif isinstance(value, bool):
+        return BooleanValue(boolean=value).data()
+    elif isinstance(value, int):
+        return {"integerValue": str(value)}
+    elif isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return {"doubleValue": str(value).replace("nan", "NaN").replace("inf", "Infinity")}
+        return DoubleValue(double=value).data()
+    elif isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return TimestampValue(timestamp=value.strftime('%Y-%m-%dT%H:%M:%S.%fZ')).data()
+    elif isinstance(value, Reference):
+        return ReferenceValue(reference=str(value)).data()
+    elif isinstance(value, str):
+        return StringValue(string=value).data()
+    elif isinstance(value, bytes):
+        return {"bytesValue": base64.b64encode(value).decode("ascii")}
+    elif isinstance(value, tuple):
+        return GeoPointValue(geo=value).data()
+    elif isinstance(value, list):
+        return {"arrayValue": {"values": [encode(element) for element in value]}}
+    elif isinstance(value, dict):
+        for key in value:
+            if not isinstance(key, str):
+                raise TypeError(f"Map keys are required to be of type str not {type(key)}")
+        return {"mapValue": {"fields": {key: encode(element) for key, element in value.items()}}}
+    else:
+        raise TypeError(f"Value of type {type(value)} can't be converted to a Value message")
+
+
+def _parse_timestamp(timestamp: str) -> datetime.datetime:
+    """
+    Parses a RFC 3339 "Zulu" timestamp, truncating nanosecond precision to microseconds
+
+    :param timestamp: Timestamp string, Examples: "2021-07-02T15:01:23Z", "2021-07-02T15:01:23.052142000Z"
+    :return: Timezone aware datetime in UTC
+    """
+
+    seconds, _, fraction = timestamp.rstrip("Z").partition(".")
+    time = datetime.datetime.strptime(seconds, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=datetime.timezone.utc)
+
+    if fraction:
+        time += datetime.timedelta(microseconds=int(fraction[:6].ljust(6, "0")))
+
+    return time
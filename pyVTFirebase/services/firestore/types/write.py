@@ -1,181 +1,365 @@
+
+import json
 import enum
-import datetime
 
-from typing import Union
+from .value import Value
+from typing import Iterable, List, Union
 
 
 class DocumentMask(object):
+    """
+    Defines a set of field paths on a document
 
-    def __init__(self, fields: list):
-        """
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/DocumentMask
+    """
 
+    def __init__(self, fields: Iterable[str]):
+        """
         :param fields: List of field paths.
         """
 
-        self.fieldPaths = fields
+        self.fieldPaths = list(fields)
+
+        for field in self.fieldPaths:
+            if not isinstance(field, str):
+                raise TypeError(f"Field path is required to be of type str not {type(field)}")
 
     def __repr__(self):
-        return {
-            "fieldPaths": self.fieldPaths
-        }
+        return json.dumps(self.data())
+
+    def data(self):
+        return {"fieldPaths": self.fieldPaths}
 
 
 class ServerValue(enum.Enum):
+    """
+    Defines a value that is calculated by the server
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Write#ServerValue
+    """
+
     SERVER_VALUE_UNSPECIFIED = "SERVER_VALUE_UNSPECIFIED"
     REQUEST_TIME = "REQUEST_TIME"
 
+    def data(self):
+        return self.value
+
 
-class Timestamp:
+class Precondition:
+    """
+    Defines a precondition on a document, used for conditional operations
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Precondition
+    """
+
+    def __init__(self, condition: Union[bool, str]):
+        """
+        :param condition: conditional check to execute operation
+
+            options: exists -> bool : When set to TRUE, the target document must exist. When set to False, the target
+                                      document must not exist.
+                     updateTime -> String (Timestamp format) : When set, the target document must exist and have been
+                                                               last updated at that time.
+        """
 
-    def __init__(self):
+        if not isinstance(condition, (bool, str)):
+            raise TypeError(f"Condition is required to be of type bool or str not {type(condition)}")
 
-        def currentTime() -> str:
-            time = datetime.datetime.now(datetime.timezone.utc)
-            time.isoformat()
+        self.condition_type = condition
 
-            return time.strftime('%Y-%m-%dT%H:%M:%SZ')
+    def __repr__(self):
+        return json.dumps(self.data())
 
-        self.time = currentTime()
+    def data(self):
+        if isinstance(self.condition_type, bool):
+            return {"exists": self.condition_type}
+        else:
+            return {"updateTime": self.condition_type}
 
 
-class LatLng:
+class FieldTransform(object):
     """
-    An object that represents a latitude/longitude pair. This is expressed as a pair of doubles to represent degrees
-    latitude and degrees longitude. Unless specified otherwise, this must conform to the WGS84 standard. Values must
-    be within normalized ranges.
+    Defines a transformation of a field of the document
 
-    WGS84 Standards: https://www.unoosa.org/pdf/icg/2012/template/WGS_84.pdf
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Write#FieldTransform
     """
 
-    def __init__(self, latitude: float, longitude: float):
-        """
-        Initializes the LatLng class
+    _TRANSFORMS = ("setToServerValue", "increment", "maximum", "minimum", "appendMissingElements",
+                   "removeAllFromArray")
 
-        :param latitude: The latitude in degrees. Must be in the range [-90.0, +90.0].
-        :param longitude: The longitude in degrees. Must be in the range [-180.0, +180.0]
+    def __init__(self, field: str, transform: str, value: Union[ServerValue, Value, List[Value]]):
+        """
+        :param field: The path of the document field to transform
+        :param transform: The transformation to apply to the field
+
+            options: setToServerValue -> ServerValue : Sets the field to the given server value
+                     increment -> Value : Adds the given integer or double value to the field's current value
+                     maximum -> Value : Sets the field to the maximum of its current value and the given value
+                     minimum -> Value : Sets the field to the minimum of its current value and the given value
+                     appendMissingElements -> List[Value] : Appends the given elements that aren't already present
+                                                            to the field's array
+                     removeAllFromArray -> List[Value] : Removes all of the given elements from the field's array
+        :param value: The value used by the transformation
         """
 
-        self.latitude = latitude
-        self.longitude = longitude
+        if not isinstance(field, str):
+            raise TypeError(f"Field is required to be of type str not {type(field)}")
+
+        if transform == "setToServerValue":
+            if not isinstance(value, ServerValue):
+                raise TypeError(f"Transform {transform} requires a value of type ServerValue not {type(value)}")
+        elif transform in ("increment", "maximum", "minimum"):
+            if not isinstance(value, Value):
+                raise TypeError(f"Transform {transform} requires a value of type Value not {type(value)}")
+            if not ({"integerValue", "doubleValue"} & value.data().keys()):
+                raise ValueError(f"Transform {transform} requires an integer or double value not {value!r}")
+        elif transform in ("appendMissingElements", "removeAllFromArray"):
+            value = list(value)
+            for element in value:
+                if not isinstance(element, Value):
+                    raise TypeError(f"Transform {transform} requires elements of type Value not {type(element)}")
+        else:
+            raise ValueError(f"Transform {transform} doesn't correspond to a known transform. Must be one of "
+                             f"{list(self._TRANSFORMS)}")
+
+        self.fieldPath = field
+        self.transform = transform
+        self.value = value
 
     def __repr__(self):
-        return {
-            "latitude": self.latitude,
-            "longitude": self.longitude
-        }
+        return json.dumps(self.data())
+
+    def data(self):
+        if self.transform in ("appendMissingElements", "removeAllFromArray"):
+            value = {"values": [element.data() for element in self.value]}
+        else:
+            value = self.value.data()
 
+        return {"fieldPath": self.fieldPath, self.transform: value}
 
-class Value:
 
-    def __init__(self, value: Union[None, bool, str, float, Timestamp, bytes, LatLng, ArrayValue, MapValue]):
-        self.value_type = value
+class Transforms(object):
+    """
+    Builds a list of field transformations that are applied by the server
 
+    Transforms can be attached to a create, set or update write to be applied after it, or sent on their own as a
+    transform write. Each call returns a new instance, the transformations are applied in the order they are added.
 
-class MapValue:
+    Example:
+        Transforms().increment("Views", 1).serverTimestamp("LastViewed").arrayUnion("Tags", [Value("string", "new")])
 
-    def __init__(self, key: str, value: Value):
-        self.key = key
-        self.value = value
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Write#FieldTransform
+    """
+
+    def __init__(self, fieldTransforms: Iterable[FieldTransform] = ()) -> None:
+        self.fieldTransforms = tuple(fieldTransforms)
+
+    def __len__(self) -> int:
+        return len(self.fieldTransforms)
 
     def __repr__(self):
-        return {
-            "fields": {
-                self.key: {
-                    self.value
-                }
-            }
-        }
+        return json.dumps(self.data())
 
+    def _add(self, field: str, transform: str, value: Union[ServerValue, Value, List[Value]]) -> "Transforms":
+        return self.__class__(self.fieldTransforms + (FieldTransform(field=field, transform=transform, value=value),))
 
-class ArrayValue:
+    def serverTimestamp(self, field: str) -> "Transforms":
+        """
+        Sets a field to the time at which the server processes the request
 
-    def __init__(self, values: Value):
-        self.values = values
+        :param field: The path of the document field to set
+        :return: New instance of the Transforms class
+        """
 
-    def __repr__(self):
-        return {
-            "values": [
-                {
-                    self.values
-                }
-            ]
-        }
+        return self._add(field=field, transform="setToServerValue", value=ServerValue.REQUEST_TIME)
 
+    def increment(self, field: str, value: Union[int, float]) -> "Transforms":
+        """
+        Adds a number to a field. A field that isn't a number is set to the given value.
 
-class FieldTransform(object):
-    """ A transformation of a field of the document """
+        :param field: The path of the document field to increment
+        :param value: The integer or float to add, negative to decrement
+        :return: New instance of the Transforms class
+        """
 
-    def __init__(self, field: str):
+        return self._add(field=field, transform="increment", value=_number(value))
+
+    def maximum(self, field: str, value: Union[int, float]) -> "Transforms":
         """
+        Sets a field to the maximum of its current value and a number
 
-        :param field: The document field
+        :param field: The path of the document field to set
+        :param value: The integer or float to compare the field's value to
+        :return: New instance of the Transforms class
         """
 
-        self.fieldPath = field
-        self.transform_type: Union[ServerValue, Value, ArrayValue]
+        return self._add(field=field, transform="maximum", value=_number(value))
+
+    def minimum(self, field: str, value: Union[int, float]) -> "Transforms":
+        """
+        Sets a field to the minimum of its current value and a number
 
+        :param field: The path of the document field to set
+        :param value: The integer or float to compare the field's value to
+        :return: New instance of the Transforms class
+        """
 
-class Precondition:
-    """ A precondition on a document, used for conditional operations """
+        return self._add(field=field, transform="minimum", value=_number(value))
 
-    def __init__(self, condition: Union[bool, str]):
+    def arrayUnion(self, field: str, values: Iterable[Value]) -> "Transforms":
         """
+        Appends the given elements that aren't already present to an array field
 
-        :param condition: conditional check to execute operation
+        :param field: The path of the array field
+        :param values: List of Value elements to append
+        :return: New instance of the Transforms class
+        """
 
-            options: exists -> bool : When set to TRUE, the target document must exist. When set to False, the target
-                                      document must not exist.
-                     updateTime -> String (Timestamp format) : When set, the target document must exist and have been
-                                                               last updated at that time.
+        return self._add(field=field, transform="appendMissingElements", value=list(values))
+
+    def arrayRemove(self, field: str, values: Iterable[Value]) -> "Transforms":
         """
+        Removes all of the given elements from an array field
 
-        self.condition_type = condition
+        :param field: The path of the array field
+        :param values: List of Value elements to remove
+        :return: New instance of the Transforms class
+        """
 
-    def __repr__(self):
-        if type(self.condition_type) is bool:
-            return {
-                "exists": self.condition_type
-            }
-        else:
-            return {
-                "updateTime": self.condition_type
-            }
+        return self._add(field=field, transform="removeAllFromArray", value=list(values))
+
+    def data(self):
+        return [transform.data() for transform in self.fieldTransforms]
+
+
+def _number(value: Union[int, float]) -> Value:
+    """
+    Converts the operand of a numeric transform to an integer or double Value
+
+    :param value: Integer or float operand
+    :return: The equivalent Value
+    """
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"Value is required to be of type int or float not {type(value)}")
+
+    return Value(key="int", value=value) if isinstance(value, int) else Value(key="double", value=value)
 
 
 class DocumentTransform(object):
-    """ A transformation of a document """
+    """
+    Defines a transformation of a document
+
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Write#DocumentTransform
+    """
+
+    def __init__(self, document: str, fieldTransforms: Iterable[FieldTransform]):
+        """
+        :param document: The full resource name of the document to transform
+        :param fieldTransforms: List of transformations to apply to the fields of the document, in order
+        """
 
-    def __init__(self, document: str, fieldTransforms: FieldTransform):
         self.document = document
-        self.fieldTransforms = fieldTransforms
+        self.fieldTransforms = list(fieldTransforms)
+
+        for transform in self.fieldTransforms:
+            if not isinstance(transform, FieldTransform):
+                raise TypeError(f"Field transform is required to be of type FieldTransform not {type(transform)}")
 
     def __repr__(self):
+        return json.dumps(self.data())
+
+    def data(self):
         return {
             "document": self.document,
-            "fieldTransforms": [
-                {
-                    self.fieldTransforms
-                }
-            ]
+            "fieldTransforms": [transform.data() for transform in self.fieldTransforms]
         }
 
 
 class Write(object):
+    """
+    Defines a write on a document
 
-    def __init__(self, fields: DocumentMask = None, transforms: FieldTransform = None, precondition: Precondition = None):
-        self.updateMask = fields
-        self.updateTransforms = transforms
-        self.currentDocument = precondition
-        # self.operation: Union[Document, str, DocumentTransform]
-        self.update = None
-        self.delete = ""
-        self.transform = None
+    Exactly one of update, delete or transform must be given.
 
-    def __repr__(self):
-        writes = {
-            "writes": [
-                {
+    Links: ->
+        https://firebase.google.com/docs/firestore/reference/rest/v1/Write
+    """
 
+    def __init__(self, update: dict = None, delete: str = None, transform: DocumentTransform = None,
+                 updateMask: DocumentMask = None, updateTransforms: Iterable[FieldTransform] = None,
+                 currentDocument: Precondition = None):
+        """
+        :param update: A document instance to write, including its full resource name
+        :param delete: The full resource name of a document to delete
+        :param transform: A transformation to apply to a document
+        :param updateMask: Optional, the fields to update. Only valid with update. Fields in the mask that aren't in
+                           the document are deleted from the document on the server.
+        :param updateTransforms: Optional, transformations to apply to the document after the update. Only valid with
+                                 update.
+        :param currentDocument: Optional, a precondition on the document. The write will fail if it isn't met.
+
+        Example:
+            update ->
+                // Document instance
+                {
+                    "name": "projects/<ProjectID>/databases/(default)/documents/Accounts/...",
+                    "fields": {
+                        string: {
+                            object (Value)
+                        },
+                        ...
+                    }
                 }
-            ]
-        }
+        """
+
+        operations = [operation for operation in (update, delete, transform) if operation is not None]
+        if len(operations) != 1:
+            raise ValueError("Exactly one of update, delete or transform must be given for a write")
+
+        if update is not None:
+            if not isinstance(update, dict) or "name" not in update:
+                raise ValueError("Update must be a document instance of type dict with a name")
+        if delete is not None and not isinstance(delete, str):
+            raise TypeError(f"Delete is required to be of type str not {type(delete)}")
+        if transform is not None and not isinstance(transform, DocumentTransform):
+            raise TypeError(f"Transform is required to be of type DocumentTransform not {type(transform)}")
+        if update is None and (updateMask is not None or updateTransforms is not None):
+            raise ValueError("UpdateMask and updateTransforms can only be given with update")
+        if updateMask is not None and not isinstance(updateMask, DocumentMask):
+            raise TypeError(f"UpdateMask is required to be of type DocumentMask not {type(updateMask)}")
+        if currentDocument is not None and not isinstance(currentDocument, Precondition):
+            raise TypeError(f"CurrentDocument is required to be of type Precondition not {type(currentDocument)}")
+
+        self.update = update
+        self.delete = delete
+        self.transform = transform
+        self.updateMask = updateMask
+        self.updateTransforms = list(updateTransforms) if updateTransforms is not None else None
+        self.currentDocument = currentDocument
+
+    def __repr__(self):
+        return json.dumps(self.data())
+
+    def data(self):
+        if self.update is not None:
+            data = {"update": self.update}
+        elif self.delete is not None:
+            data = {"delete": self.delete}
+        else:
+            data = {"transform": self.transform.data()}
+
+        if self.updateMask is not None:
+            data["updateMask"] = self.updateMask.data()
+        if self.updateTransforms:
+            data["updateTransforms"] = [transform.data() for transform in self.updateTransforms]
+        if self.currentDocument is not None:
+            data["currentDocument"] = self.currentDocument.data()
+
+        return data
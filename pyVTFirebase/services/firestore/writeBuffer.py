@@ -0,0 +1,203 @@
+
+import copy
+import threading
+
+import httpx
+
+from pyVTFirebase.services.helpers import validate_json
+from pyVTFirebase.services.firestore.batch import MAX_BATCH_WRITES
+from pyVTFirebase.services.firestore.types import fieldPath
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from pyVTFirebase.services.firestore.firestore import Firestore
+
+
+class _PendingPatch(object):
+    """ The merged state of the patches buffered for one document """
+
+    __slots__ = ("updateMask", "fields")
+
+    def __init__(self) -> None:
+        self.updateMask = []
+        self.fields = {}
+
+    def merge(self, updateMask: Optional[List[str]], fields: dict) -> None:
+        if updateMask is None:
+            # A patch without a mask replaces the whole document, earlier patches no longer matter
+            self.updateMask = None
+            self.fields = copy.deepcopy(fields)
+            return
+
+        for path in updateMask:
+            segments = fieldPath.split(path)
+            value = fieldPath.lookup(fields, segments)
+
+            if value is None:
+                fieldPath.remove(self.fields, segments)
+            else:
+                fieldPath.assign(self.fields, segments, copy.deepcopy(value))
+
+            if self.updateMask is not None:
+                self._mask(path=path, segments=segments)
+
+    def _mask(self, path: str, segments: List[str]) -> None:
+        masked = [fieldPath.split(existing) for existing in self.updateMask]
+
+        # Overlapping field paths aren't allowed in one mask, an ancestor already writes all of its descendants
+        if any(existing == segments[:len(existing)] for existing in masked):
+            return
+
+        self.updateMask = [existing for existing, split in zip(self.updateMask, masked)
+                           if split[:len(segments)] != segments]
+        self.updateMask.append(path)
+
+
+class WriteBuffer(object):
+    """
+    Collects patches of documents over a short window and writes each document once with batched commits
+
+    Patches to the same document are merged before they are sent: their field maps and update masks are combined
+    and a later patch wins for every field it masks, including fields it deletes by masking without a value. A
+    patch without an update mask replaces the whole document and discards what was buffered for it before.
+
+    The buffer is flushed every flushInterval seconds by a background thread, and by the patching thread once
+    maxDocuments documents are buffered. Errors of background flushes are passed to on_error, those of explicit
+    flushes are raised. Documents a failed flush didn't write stay buffered for the next flush.
+
+    Example:
+        with WriteBuffer(firestore, flushInterval=0.5) as buffer:
+            buffer.patch("Devices/<DeviceID>", updateMask=["Battery"], json_kwargs={"fields": {...}})
+            buffer.patch("Devices/<DeviceID>", updateMask=["Signal"], json_kwargs={"fields": {...}})
+    """
+
+    def __init__(self, firestore: "Firestore", flushInterval: float = 1.0, maxDocuments: int = MAX_BATCH_WRITES,
+                 on_error: Callable[[Exception], None] = None) -> None:
+        """
+        :param firestore: Firestore service used to commit the writes
+        :param flushInterval: Seconds between background flushes. No background thread is started when None.
+        :param maxDocuments: The number of buffered documents that triggers a flush
+        :param on_error: Optional, called with the exception of a failed background flush
+        """
+
+        if isinstance(maxDocuments, bool) or not isinstance(maxDocuments, int):
+            raise TypeError(f"MaxDocuments is required to be of type int not {type(maxDocuments)}")
+        if maxDocuments <= 0:
+            raise ValueError("MaxDocuments must be greater than 0")
+
+        self.firestore = firestore
+        self.flushInterval = flushInterval
+        self.maxDocuments = maxDocuments
+        self.on_error = on_error
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._closed = threading.Event()
+        self._thread = None
+
+        if flushInterval is not None:
+            self._thread = threading.Thread(target=self._run, name="WriteBuffer", daemon=True)
+            self._thread.start()
+
+    def __enter__(self) -> "WriteBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def patch(self, path: str, updateMask: list = None, json_kwargs: dict = None) -> None:
+        """
+        Buffers an update of a document, see Firestore.patch for details
+
+        :param path: Document path
+        :param updateMask: Optional, list of document fields to update. Fields referenced in the mask, but not present
+                           in the input document, are deleted from the document on the server.
+        :param json_kwargs: Document instance with the fields to write
+        """
+
+        if self._closed.is_set():
+            raise RuntimeError("Cannot buffer a patch once the WriteBuffer has been closed")
+
+        fields = validate_json(json_kwargs if json_kwargs is not None else {}).get("fields", {})
+        name = self.firestore.document_name(path)
+
+        with self._lock:
+            self._pending.setdefault(name, _PendingPatch()).merge(
+                updateMask=list(updateMask) if updateMask is not None else None, fields=fields)
+            full = len(self._pending) >= self.maxDocuments
+
+        if full:
+            self.flush()
+
+    def flush(self) -> List[httpx.Response]:
+        """
+        Writes every buffered document with one write per document, in commits of up to 500 writes
+
+        If a commit fails, the documents it and the later commits would have written are put back into the buffer,
+        under any patches buffered since, to be written by the next flush. The error is then raised.
+
+        :return: List of the commit responses
+        """
+
+        responses = []
+
+        # Flushes run one at a time so the writes of a document are committed in the order they were buffered
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+
+            items = list(pending.items())
+
+            for start in range(0, len(items), MAX_BATCH_WRITES):
+                batch = self.firestore.batch()
+
+                for name, merged in items[start:start + MAX_BATCH_WRITES]:
+                    batch.update(path=name, updateMask=merged.updateMask, json_kwargs={"fields": merged.fields})
+
+                try:
+                    responses.append(batch.commit())
+                except Exception:
+                    self._restore(items[start:])
+                    raise
+
+        return responses
+
+    def _restore(self, items: List[tuple]) -> None:
+        """ Puts the merged patches of a failed flush back into the buffer, ahead of the patches buffered since """
+
+        with self._lock:
+            pending = dict(items)
+
+            for name, newer in self._pending.items():
+                if name in pending:
+                    pending[name].merge(updateMask=newer.updateMask, fields=newer.fields)
+                else:
+                    pending[name] = newer
+
+            self._pending = pending
+
+    def close(self) -> None:
+        """
+        Stops the background flushes and writes everything still buffered
+        """
+
+        self._closed.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._closed.wait(self.flushInterval):
+            try:
+                self.flush()
+            except Exception as exc:
+                if self.on_error is not None:
+                    self.on_error(exc)
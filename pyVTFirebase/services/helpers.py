@@ -7,18 +7,17 @@ from typing import Union
 
 def build_url(*args, delimiter: str = None) -> str:
 
-    url = ""
+    parts = []
 
-    for _i, _sub in enumerate(args):
+    for _sub in args:
         if _sub is not None:
             if isinstance(_sub, str):
-                if _i != len(args) - 1:
-                    url += _sub + "/"
-                else:
-                    url += _sub
+                parts.append(_sub)
             else:
                 raise ValueError("Argument is not of type string")
 
+    url = "/".join(parts)
+
     if delimiter:
         url += f":{delimiter}"
 
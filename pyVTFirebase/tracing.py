@@ -0,0 +1,253 @@
+
+import abc
+import contextvars
+
+from typing import Any, MutableMapping, Optional
+
+
+# The tracer set with set_tracer and the span of the code running in the current context
+_tracer: Optional["Tracer"] = None
+_current: contextvars.ContextVar = contextvars.ContextVar("pyVTFirebase_span", default=None)
+
+
+class Span(abc.ABC):
+    """
+    A timed operation of a trace, created by a Tracer
+    """
+
+    @abc.abstractmethod
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    @abc.abstractmethod
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    @abc.abstractmethod
+    def end(self) -> None:
+        pass
+
+
+class Tracer(abc.ABC):
+    """
+    Creates the spans of Auth and Firestore operations and propagates their context to the Firebase REST API
+
+    Implement start_span and inject to connect a tracing system, or use OpenTelemetryTracer. No spans are created
+    until a tracer is set with set_tracer.
+
+    Spans are opened for every service method sending a request, named after it, Example: "Firestore.runQuery", with
+    attributes for the collection, status and bytes, and the number of documents of responses up to
+    instrumentation.MAX_COUNTED_BYTES. Retries, pages of exports and syncs and the chunks of bulk writes, batched
+    loads, reference resolution and split queries are child spans.
+    """
+
+    @abc.abstractmethod
+    def start_span(self, name: str, parent: Optional[Span]) -> Span:
+        """
+        :param name: Name of the span
+        :param parent: The span of the operation the new span is part of, None if the tracing system should use
+                       its own current span
+        :return: The started span
+        """
+
+    @abc.abstractmethod
+    def inject(self, span: Span, headers: MutableMapping[str, str]) -> None:
+        """
+        Adds the headers propagating the context of a span to an outgoing request
+
+        :param span: The span of the operation sending the request
+        :param headers: The headers of the request
+        """
+
+
+class NoOpSpan(Span):
+    """ Span that records nothing """
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+class NoOpTracer(Tracer):
+    """
+    Tracer creating spans that record nothing, for measuring the cost of tracing or disabling it in place
+    """
+
+    _span = NoOpSpan()
+
+    def start_span(self, name: str, parent: Optional[Span]) -> Span:
+        return self._span
+
+    def inject(self, span: Span, headers: MutableMapping[str, str]) -> None:
+        pass
+
+
+class OpenTelemetrySpan(Span):
+    """ Adapts an OpenTelemetry span """
+
+    def __init__(self, span) -> None:
+        self.span = span
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.span.set_attribute(key, value)
+
+    def record_exception(self, exception: BaseException) -> None:
+        from opentelemetry.trace import Status, StatusCode
+
+        self.span.record_exception(exception)
+        self.span.set_status(Status(StatusCode.ERROR, str(exception)))
+
+    def end(self) -> None:
+        self.span.end()
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Creates spans with OpenTelemetry and propagates their context with its configured propagators, W3C trace
+    context by default
+
+    Spans without a parent span of this package are children of the current OpenTelemetry span, so the operations
+    are nested inside the spans of the application calling them.
+
+    Example:
+        set_tracer(OpenTelemetryTracer())
+
+    Links: ->
+        https://opentelemetry-python.readthedocs.io/en/latest/api/trace.html
+    """
+
+    def __init__(self, tracer=None) -> None:
+        """
+        :param tracer: Optional, the opentelemetry.trace.Tracer to create the spans with. Defaults to the tracer named
+                       "pyVTFirebase" of the global tracer provider.
+        """
+
+        try:
+            from opentelemetry import propagate, trace
+        except ImportError as exc:
+            raise ImportError("OpenTelemetryTracer requires the opentelemetry-api package, install it with "
+                              "pip install opentelemetry-api") from exc
+
+        self._trace = trace
+        self._propagate = propagate
+        self.tracer = tracer if tracer is not None else trace.get_tracer("pyVTFirebase")
+
+    def start_span(self, name: str, parent: Optional[Span]) -> Span:
+        context = self._trace.set_span_in_context(parent.span) if isinstance(parent, OpenTelemetrySpan) else None
+        return OpenTelemetrySpan(self.tracer.start_span(name, context=context))
+
+    def inject(self, span: Span, headers: MutableMapping[str, str]) -> None:
+        if isinstance(span, OpenTelemetrySpan):
+            self._propagate.inject(headers, context=self._trace.set_span_in_context(span.span))
+
+
+class _Scope(object):
+    """ Context manager opening a span as the current span of the block and ending it after """
+
+    __slots__ = ("name", "parent", "attributes", "span", "token")
+
+    def __init__(self, name: str, parent: Optional[Span], attributes: dict) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = _tracer.start_span(self.name, self.parent if self.parent is not None else _current.get())
+        for key, value in self.attributes.items():
+            if value is not None:
+                self.span.set_attribute(key, value)
+
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        _current.reset(self.token)
+
+        if exc_val is not None:
+            self.span.record_exception(exc_val)
+        self.span.end()
+
+
+class _NoScope(object):
+    """ Context manager used while no tracer is set """
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+_NO_SCOPE = _NoScope()
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """
+    Sets the tracer creating the spans of every Auth and Firestore operation
+
+    :param tracer: The tracer, or None to stop tracing
+    """
+
+    global _tracer
+
+    if tracer is not None and not isinstance(tracer, Tracer):
+        raise TypeError(f"Tracer is required to be of type Tracer not {type(tracer)}")
+
+    _tracer = tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    :return: The tracer set with set_tracer, None while tracing is off
+    """
+
+    return _tracer
+
+
+def current() -> Optional[Span]:
+    """
+    :return: The span of the operation running in the current context, to be passed as the parent of spans opened on
+             other threads
+    """
+
+    return _current.get()
+
+
+def span(name: str, parent: Span = None, **attributes: Any):
+    """
+    Opens a span for the duration of a with block, doing nothing while no tracer is set
+
+    :param name: Name of the span
+    :param parent: Optional, the parent span. Defaults to the current span of the context.
+    :keyword attributes: Attributes to set on the span, None values are left out
+    :return: Context manager yielding the span, or None while no tracer is set
+
+    Example:
+        with tracing.span("Exporter.page", documents=len(documents)) as page:
+            ...
+    """
+
+    if _tracer is None:
+        return _NO_SCOPE
+
+    return _Scope(name=name, parent=parent, attributes=attributes)
+
+
+def inject(headers: MutableMapping[str, str]) -> None:
+    """
+    Adds the headers propagating the current span to an outgoing request, if a tracer is set
+
+    :param headers: The headers of the request
+    """
+
+    if _tracer is not None:
+        active = _current.get()
+        if active is not None:
+            _tracer.inject(active, headers)